@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""Benchmarks of THERMOCALC output parsing and result storage.
+
+Benchmarks use recorded outputs in examples/outputs and synthetic scale-ups
+created by repeating calculated blocks 10 and 100 times. Timings are
+expressed relative to fixed calibration workload measured in the same run,
+so baselines are comparable across machines. Relative timings are compared
+with stored baselines and regressions exceeding threshold are reported.
+With --check option, regressions make the script fail.
+
+Usage::
+
+    $ python benchmarks/bench_parser.py            # compare with baselines
+    $ python benchmarks/bench_parser.py --check    # fail on regressions
+    $ python benchmarks/bench_parser.py --save     # store new baselines
+    $ python benchmarks/bench_parser.py -k x100 -t 0.5
+
+"""
+# author: Ondrej Lexa
+# website: petrol.natur.cuni.cz/~ondro
+
+import sys
+import io
+import json
+import pickle
+import argparse
+import contextlib
+import timeit
+from pathlib import Path
+
+BENCHDIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHDIR.parent))
+
+from pypsbuilder.psclasses import TCAPI, TCResult, TCResultSet, iter_blocks
+
+OUTPUTS = BENCHDIR.parent / 'examples' / 'outputs'
+BASELINES = BENCHDIR / 'baselines.json'
+BLOCK_START = '-' * 68
+IC_SEPARATOR = '\n' + '=' * 59 + '\n\n'
+
+
+def load_outputs(names):
+    """Return list of (log, ic) texts of recorded outputs."""
+    outputs = []
+    for name in names:
+        with (OUTPUTS / '{}-log.txt'.format(name)).open('r', encoding='mac-roman') as f:
+            log = f.read()
+        with (OUTPUTS / '{}-ic.txt'.format(name)).open('r', encoding='mac-roman') as f:
+            ic = f.read()
+        outputs.append((log, ic))
+    return outputs
+
+
+def scale_output(log, ic, factor):
+    """Return (log, ic) texts with calculated blocks repeated factor times."""
+    head, body = log.split(BLOCK_START, maxsplit=1)
+    header, *blocks = ic.split(IC_SEPARATOR)
+    log = head + (BLOCK_START + body) * factor
+    ic = header + ''.join(IC_SEPARATOR + block for block in blocks * factor)
+    return log, ic
+
+
+def make_cases():
+    """Return dictionary of named lists of (log, ic) outputs."""
+    inv = load_outputs(['inv1', 'inv2', 'inv3'])
+    uni = load_outputs(['uni1', 'uni2', 'uni3'])
+    return {'inv': inv,
+            'uni': uni,
+            'uni_x10': [scale_output(log, ic, 10) for log, ic in uni],
+            'uni_x100': [scale_output(log, ic, 100) for log, ic in uni]}
+
+
+def make_benchmarks(tc, cases):
+    """Return dictionary of benchmark names and callables."""
+    benchmarks = {}
+    for case, outputs in cases.items():
+        blocks = [list(iter_blocks(io.StringIO(log), io.StringIO(ic))) for log, ic in outputs]
+        rlists = [[TCResult.from_block(block, ptguess) for block, ptguess in bl] for bl in blocks]
+        rsets = [TCResultSet(rlist) for rlist in rlists]
+        pickled = [pickle.dumps(rs) for rs in rsets]
+
+        def parse_eager(outputs=outputs):
+            for log, ic in outputs:
+                tc.parse_logfile_new(output=log, resic=ic, lazy=False)
+
+        def parse_lazy(outputs=outputs):
+            for log, ic in outputs:
+                status, res, _ = tc.parse_logfile_new(output=log, resic=ic, lazy=True)
+                res[res.phases.pop()]
+
+        def from_block(blocks=blocks):
+            for bl in blocks:
+                [TCResult.from_block(block, ptguess) for block, ptguess in bl]
+
+        def resultset(rlists=rlists):
+            for rlist in rlists:
+                TCResultSet(rlist)
+
+        def slicing(rsets=rsets):
+            for rs in rsets:
+                rs[1:-1]
+                rs[list(range(0, len(rs), 2))]
+                for res in rs:
+                    res.phases
+
+        def pickle_dumps(rsets=rsets):
+            for rs in rsets:
+                pickle.dumps(rs)
+
+        def pickle_loads(pickled=pickled):
+            for data in pickled:
+                pickle.loads(data)
+
+        for func in [parse_eager, parse_lazy, from_block, resultset, slicing, pickle_dumps, pickle_loads]:
+            benchmarks['{}.{}'.format(func.__name__, case)] = func
+    return benchmarks
+
+
+def measure(func, repeat=5):
+    """Return the best time of single call in seconds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def calibration():
+    """Fixed workload of text splitting and float conversion used as unit of time."""
+    text = '\n'.join(' '.join('{:10.5f}'.format((r * 31 + c) / 7) for c in range(12)) for r in range(200))
+    for row in text.split('\n'):
+        [float(v) for v in row.split()]
+
+
+def arguments(description):
+    """Return parser of common command line arguments."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-k', '--filter', type=str, default='',
+                        help='run only benchmarks containing string')
+    parser.add_argument('-t', '--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown against baseline')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of repeats of timing')
+    parser.add_argument('--save', action='store_true',
+                        help='store timings as new baselines')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with error when regressions are found')
+    parser.add_argument('--baselines', type=str, default=str(BASELINES),
+                        help='baselines file')
+    return parser
+
+
+def run(benchmarks, args):
+    """Time benchmarks, compare them with baselines and report regressions.
+
+    Baselines store timings relative to `calibration` workload.
+    """
+    baselines = {}
+    baselines_file = Path(args.baselines)
+    if baselines_file.exists():
+        with baselines_file.open('r') as f:
+            baselines = json.load(f)
+
+    unit = measure(calibration, repeat=args.repeat)
+    timings = {}
+    regressions = []
+    print('Calibration unit {:.3f} ms'.format(1000 * unit))
+    print('{:<28}{:>12}{:>12}{:>12}{:>9}'.format('benchmark', 'time [ms]', 'relative', 'baseline', 'ratio'))
+    for name, func in benchmarks.items():
+        if args.filter not in name:
+            continue
+        elapsed = measure(func, repeat=args.repeat)
+        timings[name] = elapsed / unit
+        if name in baselines:
+            ratio = timings[name] / baselines[name]
+            flag = ''
+            if ratio > 1 + args.threshold:
+                regressions.append(name)
+                flag = ' !'
+            print('{:<28}{:>12.3f}{:>12.3f}{:>12.3f}{:>9.2f}{}'.format(name, 1000 * elapsed, timings[name], baselines[name], ratio, flag))
+        else:
+            print('{:<28}{:>12.3f}{:>12.3f}{:>12}{:>9}'.format(name, 1000 * elapsed, timings[name], '-', '-'))
+
+    if args.save:
+        baselines.update(timings)
+        with baselines_file.open('w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('Baselines stored in {}'.format(baselines_file))
+    elif regressions:
+        print('Regressions above {:g}% threshold: {}'.format(100 * args.threshold, ', '.join(regressions)))
+        if args.check:
+            sys.exit(1)
+
+
+def main():
+    args = arguments('Benchmark THERMOCALC output parsing').parse_args()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tc = TCAPI(OUTPUTS)
+    run(make_benchmarks(tc, make_cases()), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""End-to-end benchmarks of THERMOCALC calculations.
+
+Benchmarks run whole pipeline of scriptfile update, THERMOCALC execution
+and parsing using stand-in THERMOCALC executable from test suite on copy of
+examples/avgpelite project, so they do not need licensed THERMOCALC.
+Latency of stand-in could be set to mimic real calculations.
+
+Usage::
+
+    $ python benchmarks/bench_pipeline.py
+    $ python benchmarks/bench_pipeline.py --latency 0.05 -k pool
+
+"""
+# author: Ondrej Lexa
+# website: petrol.natur.cuni.cz/~ondro
+
+import io
+import os
+import tempfile
+import contextlib
+from pathlib import Path
+
+from bench_parser import arguments, run, OUTPUTS
+
+from pypsbuilder import TCAPI, TCWorkerPool
+from pypsbuilder.tests.conftest import make_stub_workdir
+
+PHASES = {'g', 'bi', 'mu', 'sph', 'pa'}
+
+
+def make_benchmarks(tc, pool):
+    """Return dictionary of benchmark names and callables."""
+    jobs = [(PHASES, 6 + 0.25 * ix, 500 + 5 * ix, None, None) for ix in range(16)]
+
+    def calc_pt():
+        for ix in range(8):
+            tc.calc_pt(PHASES, {'pa', 'g'}, trange=(400 + ix, 700), prange=(7, 16))
+            tc.parse_logfile()
+
+    def calc_t():
+        tc.calc_t(PHASES, {'pa'}, steps=50)
+        tc.parse_logfile()
+
+    def assemblages_serial():
+        list(tc.calc_assemblages(jobs))
+
+    def assemblages_pool():
+        list(tc.calc_assemblages(jobs, pool=pool))
+
+    return {'pipeline.calc_pt': calc_pt,
+            'pipeline.calc_t': calc_t,
+            'pipeline.assemblages': assemblages_serial,
+            'pipeline.assemblages_pool': assemblages_pool}
+
+
+def main():
+    parser = arguments('Benchmark THERMOCALC calculations with stand-in executable')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='latency of stand-in THERMOCALC in seconds')
+    parser.add_argument('--jobs', type=int, default=4,
+                        help='number of workers of pool')
+    args = parser.parse_args()
+    os.environ['PSBSTUB_LATENCY'] = str(args.latency)
+    os.environ['PSBSTUB_TEMPLATES'] = str(OUTPUTS)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            tc = TCAPI(make_stub_workdir(Path(tmpdir) / 'avgpelite'))
+        with TCWorkerPool(tc, jobs=args.jobs) as pool:
+            run(make_benchmarks(tc, pool), args)
+        print(tc.stats)
+
+
+if __name__ == "__main__":
+    main()
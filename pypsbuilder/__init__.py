@@ -3,6 +3,9 @@
 from pypsbuilder.psexplorer import PTPS, TXPS, PXPS
 from pypsbuilder.psclasses import (
     TCAPI,
+    TCWorkerPool,
+    TCCache,
+    TCStats,
     InvPoint,
     UniLine,
     PTsection,
@@ -20,6 +23,9 @@ __all__ = (
     "TXPS",
     "PXPS",
     "TCAPI",
+    "TCWorkerPool",
+    "TCCache",
+    "TCStats",
 )
 
 __version__ = "2.2.2"
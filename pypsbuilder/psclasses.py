@@ -20,11 +20,26 @@ import gzip
 import subprocess
 import itertools
 import re
+import copy
+import shutil
+import tempfile
+import queue
+import threading
+import hashlib
+import json
+import time
+import csv
+import io
+import asyncio
+import weakref
 from pathlib import Path
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
 from shapely.geometry import LineString, Point
 from shapely.ops import polygonize, linemerge, unary_union
 
@@ -46,6 +61,123 @@ class TCError(Exception):
     pass
 
 
+class ScriptFile:
+    """In-memory model of THERMOCALC scriptfile.
+
+    Scriptfile is parsed into static text and blocks delimited by
+    pypsbuilder tags, e.g. ``%{PSBGUESS-BEGIN}`` and ``%{PSBGUESS-END}``.
+    Blocks could be modified in memory and file is rewritten only when
+    content of some block actually changed. Writing is atomic, i.e. new
+    content is written to temporary file, which replace the scriptfile
+    (or its target, when scriptfile is symlink) keeping its permissions.
+    When scriptfile is modified by other program, it is parsed again.
+
+    Attributes:
+        path (pathlib.Path): Path to scriptfile.
+        encoding (str): Encoding of scriptfile.
+        tags (tuple): Names of recognized blocks.
+
+    """
+    tags = ('GUESS', 'DOGMIN', 'BULK')
+
+    def __init__(self, path, encoding='mac-roman'):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.reload()
+
+    def __repr__(self):
+        return 'Scriptfile {} blocks: {}'.format(self.path.name, ' '.join(self.blocks))
+
+    def _stat(self):
+        st = self.path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self):
+        """Parse scriptfile from disk."""
+        with self.path.open('r', encoding=self.encoding) as f:
+            lines = f.readlines()
+        self.stat = self._stat()
+        self.dirty = False
+        # locate tagged blocks (first begin tag and following end tag)
+        spans = []
+        for tag in self.tags:
+            gsb = [ix for ix, ln in enumerate(lines) if ln.startswith('%{{PSB{}-BEGIN}}'.format(tag))]
+            if gsb:
+                gse = [ix for ix, ln in enumerate(lines[gsb[0]:], gsb[0]) if ln.startswith('%{{PSB{}-END}}'.format(tag))]
+                if gse:
+                    spans.append((gsb[0], gse[0], tag))
+        # parts are lists of static lines or block names
+        self.parts = []
+        self.blocks = OrderedDict()
+        last = 0
+        for begin, end, tag in sorted(spans):
+            if begin >= last:
+                self.parts.append(lines[last:begin + 1])
+                self.parts.append(tag)
+                self.blocks[tag] = lines[begin + 1:end]
+                last = end
+        self.parts.append(lines[last:])
+
+    def check(self):
+        """Reload scriptfile when it was modified on disk by other program."""
+        if not self.dirty and self._stat() != self.stat:
+            self.reload()
+
+    def get_block(self, tag):
+        """Return list of lines of block.
+
+        Args:
+            tag (str): name of block, e.g. 'GUESS', 'DOGMIN' or 'BULK'
+
+        Returns:
+            list: lines of block including newline characters. Empty list
+            when block is not present.
+        """
+        self.check()
+        return list(self.blocks.get(tag, []))
+
+    def set_block(self, tag, lines):
+        """Replace lines of block. Nothing is done when block is not present.
+
+        Args:
+            tag (str): name of block, e.g. 'GUESS', 'DOGMIN' or 'BULK'
+            lines (list): lines of block including newline characters
+
+        Returns:
+            bool: True when content was changed
+        """
+        self.check()
+        if tag in self.blocks and self.blocks[tag] != lines:
+            self.blocks[tag] = list(lines)
+            self.dirty = True
+            return True
+        return False
+
+    def text(self):
+        """str: Full content of scriptfile."""
+        return ''.join(ln for part in self.parts for ln in (self.blocks[part] if isinstance(part, str) else part))
+
+    def sync(self):
+        """Write scriptfile to disk when modified.
+
+        Returns:
+            bool: True when scriptfile was written
+        """
+        if self.dirty:
+            # symlinked scriptfile is replaced at its target
+            target = self.path.resolve()
+            tmp = target.with_name('.{}.{}.tmp'.format(target.name, threading.get_ident()))
+            with tmp.open('w', encoding=self.encoding) as f:
+                f.write(self.text())
+            if target.exists():
+                shutil.copymode(str(target), str(tmp))
+            os.replace(str(tmp), str(target))
+            self.stat = self._stat()
+            self.dirty = False
+            return True
+        return False
+
+
 class TCAPI(object):
     """THERMOCALC working directory API.
 
@@ -65,6 +197,11 @@ class TCAPI(object):
         phases (list): List of names of available phases.
         TCenc (str): Encoding used for THERMOCALC output text files.
             Default 'mac-roman'.
+        lazy (bool): When True, sections of THERMOCALC results are parsed
+            only when first accessed. Default True.
+        csv (bool): When True, THERMOCALC csv output is used as primary
+            source of results when written by last run and consistent with
+            log and ic outputs. Default False.
 
     Raises:
         InitError: An error occurred during initialization of working dir.
@@ -75,6 +212,15 @@ class TCAPI(object):
     def __init__(self, workdir, tcexe=None, drexe=None):
         self.workdir = Path(workdir).resolve()
         self.TCenc = 'mac-roman'
+        self.lazy = True
+        self.csv = False
+        self.cache = None
+        self.stats = TCStats()
+        self._script = None
+        self._script_time = 0
+        self._calltype = 'runtc'
+        self._asem = None
+        self._csvstamp = None
         try:
             errinfo = 'Initialize project error!'
             self.tcexe = None
@@ -268,7 +414,7 @@ class TCAPI(object):
                 raise ScriptfileError('There are not {PSBBULK-BEGIN} and {PSBBULK-END} tags in your scriptfile.')
 
             # TC
-            self.tcout = self.runtc('\nkill\n\n')
+            self.tcout = self.probe()
             if 'BOMBED' in self.tcout:
                 raise TCError(self.tcout.split('BOMBED')[1].split('\n')[0])
             else:
@@ -377,6 +523,13 @@ class TCAPI(object):
             tx (bool): True for T-X and P-X calculations. Default False.
             output (str): When not None, used as content of logfile. Default None.
             resic (str): When not None, used as content of icfile. Default None.
+            lazy (bool): When True, results are parsed lazily. Default is
+                TCAPI.lazy attribute.
+            csv (bool): When True, csv output is used when written by last
+                run and consistent with log and ic outputs. Default is
+                TCAPI.csv attribute.
+            calltype (str): Name of call used to account timing statistics.
+                Default is type of last THERMOCALC call.
 
         Returns:
             status (str): Result of parsing. 'ok', 'nir' (nothing in range) or 'bombed'.
@@ -395,57 +548,73 @@ class TCAPI(object):
                 >>> tc = TCAPI('pat/to/dir')
                 >>> status, variance, pts, res, output = tc.parse_logfile()
         """
+        calltype = kwargs.pop('calltype', self._calltype)
+        start = time.perf_counter()
+        # read times of this call only, concurrent calls do not interfere
+        reads = []
         if self.tcnewversion:
-            return self.parse_logfile_new(**kwargs)
+            parsed = self.parse_logfile_new(reads=reads, **kwargs)
         else:
-            return self.parse_logfile_old(output=kwargs.get('output', None))
+            parsed = self.parse_logfile_old(output=kwargs.get('output', None))
+        elapsed = time.perf_counter() - start
+        self.stats.add_time(calltype, 'read', sum(reads))
+        self.stats.add_time(calltype, 'parse', elapsed - sum(reads))
+        self.stats.add_outcome(calltype, parsed[0])
+        return parsed
+
+    def _read(self, path, reads=None):
+        """Read THERMOCALC output file and append read time to reads list."""
+        start = time.perf_counter()
+        with path.open('r', encoding=self.TCenc) as f:
+            content = f.read()
+        if reads is not None:
+            reads.append(time.perf_counter() - start)
+        return content
 
     def parse_logfile_new(self, **kwargs):
         output = kwargs.get('output', None)
         resic = kwargs.get('resic', None)
         if output is None:
-            with self.logfile.open('r', encoding=self.TCenc) as f:
-                output = f.read()
-        lines = [ln for ln in output.splitlines() if ln != '']
+            output = self._read(self.logfile, kwargs.get('reads', None))
         results = None
-        do_parse = True
-        if resic is None:
-            if not self.icfile.exists():
-                if [ix for ix, ln in enumerate(lines) if 'BOMBED' in ln]:
-                    status = 'bombed'
-                else:
-                    status = 'nir'
-                do_parse = False
+        usecsv = resic is None and kwargs.get('csv', self.csv) and self.csvfile_fresh()
+        if resic is None and not self.icfile.exists() and not usecsv:
+            if 'BOMBED' in output:
+                status = 'bombed'
             else:
-                with self.icfile.open('r', encoding=self.TCenc) as f:
-                    resic = f.read()
-        if do_parse:
-            lines = [ln for ln in output.splitlines() if ln != '']
-            # parse ptguesses
-            bstarts = [ix for ix, ln in enumerate(lines) if ln.startswith('--------------------------------------------------------------------')]
-            bstarts.append(len(lines))
-            ptguesses = []
-            corrects = []
-            for bs, be in zip(bstarts[:-1], bstarts[1:]):
-                block = lines[bs:be]
-                if block[2].startswith('#'):
-                    corrects.append(False)
-                else:
-                    corrects.append(True)
-                xyz = [ix for ix, ln in enumerate(block) if ln.startswith('xyzguess')]
-                gixs = [ix for ix, ln in enumerate(block) if ln.startswith('ptguess')][0] - 3
-                gixe = xyz[-1] + 2
-                ptguesses.append(block[gixs:gixe])
-            # parse icfile
-            blocks = resic.split('\n===========================================================\n\n')[1:]
-            # done
-            if len(blocks) > 0:
-                rlist = [TCResult.from_block(block, ptguess) for block, ptguess, correct in zip(blocks, ptguesses, corrects) if correct]
-                if len(rlist) > 0:
-                    status = 'ok'
-                    results = TCResultSet(rlist)
-                else:
-                    status = 'nir'
+                status = 'nir'
+        else:
+            logblocks = list(iter_logblocks(io.StringIO(output)))
+            table = None
+            if usecsv:
+                with self.csvfile.open('r', encoding=self.TCenc, newline='') as csvstream:
+                    names, rows = read_csvtable(csvstream)
+                if len(rows) == len(logblocks):
+                    table = names, [row for row, (correct, _) in zip(rows, logblocks) if correct]
+                    if resic is None and not self.icfile.exists():
+                        # without ic, csv is checked against ptguesses in log
+                        heads = [(ptguess.p, ptguess.T, ptguess.phases) for correct, ptguess in logblocks if correct]
+                        if not csv_consistent(*table, heads):
+                            table = None
+            if resic is not None:
+                icblocks = list(iter_icblocks(io.StringIO(resic)))
+            elif self.icfile.exists():
+                with self.icfile.open('r', encoding=self.TCenc) as icstream:
+                    icblocks = list(iter_icblocks(icstream))
+            else:
+                icblocks = None
+            if icblocks is not None:
+                blocks = [(block, ptguess) for (correct, ptguess), block in zip(logblocks, icblocks) if correct]
+                if blocks:
+                    results = TCResultSet.from_blocks(*zip(*blocks), lazy=kwargs.get('lazy', self.lazy), table=table)
+            elif table is not None:
+                ptguesses = [ptguess for correct, ptguess in logblocks if correct]
+                if ptguesses:
+                    results = TCResultSet.from_table(*table, ptguesses)
+            if results is not None:
+                status = 'ok'
+            elif 'BOMBED' in output:
+                status = 'bombed'
             else:
                 status = 'nir'
         return status, results, output
@@ -657,8 +826,7 @@ class TCAPI(object):
         # res[0]['data']['g']['MnO']
         output = kwargs.get('output', None)
         if output is None:
-            with self.logfile.open('r', encoding=self.TCenc) as f:
-                output = f.read()
+            output = self._read(self.logfile)
         lines = [''.join([c for c in ln if ord(c) < 128]) for ln in output.splitlines() if ln != '']
         pts = []
         res = []
@@ -734,8 +902,8 @@ class TCAPI(object):
         This methodcould be used to read or update ptguess or dogmin settings.
 
         Args:
-            guesses (list): List of lines defining ptguesses. If None guesses
-                are not modified. Default None.
+            guesses (list): List of lines defining ptguesses or TCGuess. If
+                None guesses are not modified. Default None.
             get_old_guesses (bool): When True method returns existing ptguess
                 before possible modification. Default False.
             dogmin (str): Argument of dogmin script. Could be 'no' or 'yes' or
@@ -758,51 +926,43 @@ class TCAPI(object):
         xsteps = kwargs.get('xsteps', 20)
         p = kwargs.get('p', None)
         T = kwargs.get('T', None)
-        with self.scriptfile.open('r', encoding=self.TCenc) as f:
-            sc = f.readlines()
-        changed = False
-        gsb = [ix for ix, ln in enumerate(sc) if ln.startswith('%{PSBGUESS-BEGIN}')]
-        gse = [ix for ix, ln in enumerate(sc) if ln.startswith('%{PSBGUESS-END}')]
+        start = time.perf_counter()
+        sc = self.script
         if get_old_guesses:
-            if gsb and gse:
-                old_guesses = [ln.strip() for ln in sc[gsb[0] + 1:gse[0]]]
+            old_guesses = [ln.strip() for ln in sc.get_block('GUESS')]
         if guesses is not None:
-            if gsb and gse:
-                sc = sc[:gsb[0] + 1] + [gln + '\n' for gln in guesses] + sc[gse[0]:]
-                changed = True
+            sc.set_block('GUESS', [gln + '\n' for gln in guesses])
         if dogmin is not None:
-            dgb = [ix for ix, ln in enumerate(sc) if ln.startswith('%{PSBDOGMIN-BEGIN}')]
-            dge = [ix for ix, ln in enumerate(sc) if ln.startswith('%{PSBDOGMIN-END}')]
             dglines = []
             dglines.append('dogmin {}\n'.format(dogmin))
             if which is not None:
                 dglines.append('which {}\n'.format(' '.join(which)))
                 dglines.append('setPwindow {} {}\n'.format(p, p))
                 dglines.append('setTwindow {} {}\n'.format(T, T))
-            if dgb and dge:
-                sc = sc[:dgb[0] + 1] + dglines + sc[dge[0]:]
-                changed = True
+            sc.set_block('DOGMIN', dglines)
         if bulk is not None:
-            bub = [ix for ix, ln in enumerate(sc) if ln.startswith('%{PSBBULK-BEGIN}')]
-            bue = [ix for ix, ln in enumerate(sc) if ln.startswith('%{PSBBULK-END}')]
             bulines = []
             if len(bulk) == 2:
                 bulines.append('setbulk yes {} % x={:g}\n'.format(' '.join(bulk[0]), xvals[0]))
                 bulines.append('setbulk yes {} {:d} % x={:g}\n'.format(' '.join(bulk[1]), xsteps, xvals[1]))
             else:
                 bulines.append('setbulk yes {}\n'.format(' '.join(bulk[0])))
-            if bub and bue:
-                sc = sc[:bub[0] + 1] + bulines + sc[bue[0]:]
-                changed = True
-        if changed:
-            with self.scriptfile.open('w', encoding=self.TCenc) as f:
-                for ln in sc:
-                    f.write(ln)
+            sc.set_block('BULK', bulines)
+        sc.sync()
+        # accounted to following THERMOCALC call
+        self._script_time += time.perf_counter() - start
         if get_old_guesses:
             return old_guesses
         else:
             return None
 
+    @property
+    def script(self):
+        """ScriptFile: In-memory model of scriptfile."""
+        if self._script is None or self._script.path != self.scriptfile:
+            self._script = ScriptFile(self.scriptfile, encoding=self.TCenc)
+        return self._script
+
     def interpolate_bulk(self, x):
         if len(self.bulk) == 2:
             new_bulk = []
@@ -851,12 +1011,16 @@ class TCAPI(object):
             tuple: (tcout, ans) standard output and input for THERMOCALC run.
             Input ans could be used to reproduce calculation.
         """
+        ans = self._ans_calc_t(phases, out, **kwargs)
+        tcout = self.runtc(ans, calltype='calc_t')
+        return tcout, ans
+
+    def _ans_calc_t(self, phases, out, **kwargs):
         prange, trange, steps, prec = self.parse_kwargs(**kwargs)
         step = (prange[1] - prange[0]) / steps
         tmpl = '{}\n\n{}\ny\n{:.{prec}f} {:.{prec}f}\n{:.{prec}f} {:.{prec}f}\n{:g}\nn\n\nkill\n\n'
         ans = tmpl.format(' '.join(phases), ' '.join(out), *prange, *trange, step, prec=prec)
-        tcout = self.runtc(ans)
-        return tcout, ans
+        return ans
 
     def calc_p(self, phases, out, **kwargs):
         """Method to run THERMOCALC to find univariant line using Calc P at T strategy.
@@ -872,12 +1036,16 @@ class TCAPI(object):
             tuple: (tcout, ans) standard output and input for THERMOCALC run.
             Input ans could be used to reproduce calculation.
         """
+        ans = self._ans_calc_p(phases, out, **kwargs)
+        tcout = self.runtc(ans, calltype='calc_p')
+        return tcout, ans
+
+    def _ans_calc_p(self, phases, out, **kwargs):
         prange, trange, steps, prec = self.parse_kwargs(**kwargs)
         step = (trange[1] - trange[0]) / steps
         tmpl = '{}\n\n{}\nn\n{:.{prec}f} {:.{prec}f}\n{:.{prec}f} {:.{prec}f}\n{:g}\nn\n\nkill\n\n'
         ans = tmpl.format(' '.join(phases), ' '.join(out), *trange, *prange, step, prec=prec)
-        tcout = self.runtc(ans)
-        return tcout, ans
+        return ans
 
     def calc_pt(self, phases, out, **kwargs):
         """Method to run THERMOCALC to find invariant point.
@@ -893,11 +1061,15 @@ class TCAPI(object):
             tuple: (tcout, ans) standard output and input for THERMOCALC run.
             Input ans could be used to reproduce calculation.
         """
+        ans = self._ans_calc_pt(phases, out, **kwargs)
+        tcout = self.runtc(ans, calltype='calc_pt')
+        return tcout, ans
+
+    def _ans_calc_pt(self, phases, out, **kwargs):
         prange, trange, steps, prec = self.parse_kwargs(**kwargs)
         tmpl = '{}\n\n{}\n{:.{prec}f} {:.{prec}f} {:.{prec}f} {:.{prec}f}\nn\n\nkill\n\n'
         ans = tmpl.format(' '.join(phases), ' '.join(out), *trange, *prange, prec=prec)
-        tcout = self.runtc(ans)
-        return tcout, ans
+        return ans
 
     def calc_tx(self, phases, out, **kwargs):
         """Method to run THERMOCALC for T-X pseudosection calculations.
@@ -913,6 +1085,11 @@ class TCAPI(object):
             tuple: (tcout, ans) standard output and input for THERMOCALC run.
             Input ans could be used to reproduce calculation.
         """
+        ans = self._ans_calc_tx(phases, out, **kwargs)
+        tcout = self.runtc(ans, calltype='calc_tx')
+        return tcout, ans
+
+    def _ans_calc_tx(self, phases, out, **kwargs):
         prange, trange, steps, prec = self.parse_kwargs(**kwargs)
         if len(out) > 1:
             tmpl = '{}\n\n{}\n{:.{prec}f} {:.{prec}f} {:.{prec}f} {:.{prec}f}\nn\n\nkill\n\n'
@@ -920,8 +1097,7 @@ class TCAPI(object):
         else:
             tmpl = '{}\n\n{}\ny\n\n{:.{prec}f} {:.{prec}f}\nn\nkill\n\n'
             ans = tmpl.format(' '.join(phases), ' '.join(out), *trange, prec=prec)
-        tcout = self.runtc(ans)
-        return tcout, ans
+        return ans
 
     def calc_px(self, phases, out, **kwargs):
         """Method to run THERMOCALC for P-X pseudosection calculations.
@@ -937,6 +1113,11 @@ class TCAPI(object):
             tuple: (tcout, ans) standard output and input for THERMOCALC run.
             Input ans could be used to reproduce calculation.
         """
+        ans = self._ans_calc_px(phases, out, **kwargs)
+        tcout = self.runtc(ans, calltype='calc_px')
+        return tcout, ans
+
+    def _ans_calc_px(self, phases, out, **kwargs):
         prange, trange, steps, prec = self.parse_kwargs(**kwargs)
         if len(out) > 1:
             tmpl = '{}\n\n{}\n{:.{prec}f} {:.{prec}f} {:.{prec}f} {:.{prec}f}\nn\n\nkill\n\n'
@@ -944,8 +1125,7 @@ class TCAPI(object):
         else:
             tmpl = '{}\n\n{}\nn\n\n{:.{prec}f} {:.{prec}f}\nn\nkill\n\n'
             ans = tmpl.format(' '.join(phases), ' '.join(out), *prange, prec=prec)
-        tcout = self.runtc(ans)
-        return tcout, ans
+        return ans
 
     def calc_assemblage(self, phases, p, t):
         """Method to run THERMOCALC to calculate compositions of stable assemblage.
@@ -959,10 +1139,81 @@ class TCAPI(object):
             tuple: (tcout, ans) standard output and input for THERMOCALC run.
             Input ans could be used to reproduce calculation.
         """
+        ans = self._ans_calc_assemblage(phases, p, t)
+        tcout = self.runtc(ans, calltype='calc_assemblage')
+        return tcout, ans
+
+    def _ans_calc_assemblage(self, phases, p, t):
         tmpl = '{}\n\n\n{}\n{}\nkill\n\n'
         ans = tmpl.format(' '.join(phases), p, t)
-        tcout = self.runtc(ans)
-        return tcout, ans
+        return ans
+
+    def calc_assemblages(self, jobs, pool=None):
+        """Calculate compositions of stable assemblages for many points.
+
+        Each job is calculated using `calc_assemblage` and parsed. When pool is
+        provided, jobs are distributed over its workers and results are
+        yielded in order of completion. Note that when guesses or bulk are
+        None, the worker uses whatever is actually in its scriptfile.
+
+        Args:
+            jobs (iterable): Iterable of tuples (phases, p, T, guesses, bulk).
+                The guesses (list of ptguess lines) and bulk (see
+                `update_scriptfile`) are optional and could be None.
+            pool (TCWorkerPool): Pool of workers. When None, jobs are
+                calculated serially in this working directory. Default None
+
+        Yields:
+            tuple: (job, status, result), where status is 'ok', 'nir' or
+            'bombed' and result is TCResult or None.
+
+        Example:
+            >>> jobs = [(phases, p, 550, None, None) for p in np.linspace(5, 10, 11)]
+            >>> for job, status, res in tc.calc_assemblages(jobs, pool=pool):
+            ...     print(job[1], status)
+        """
+        if pool is None:
+            for job in jobs:
+                yield (job,) + self.calc_job(job)
+        else:
+            pending = {}
+            jobs = iter(jobs)
+            exhausted = False
+            while True:
+                # keep all workers busy, but do not consume all jobs at once
+                while not exhausted and len(pending) < 2 * pool.jobs:
+                    try:
+                        job = next(jobs)
+                    except StopIteration:
+                        exhausted = True
+                    else:
+                        pending[pool.submit(TCAPI.calc_job, job)] = job
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = pending.pop(future)
+                    yield (job,) + future.result()
+
+    def calc_job(self, job):
+        """Calculate single job of `calc_assemblages`.
+
+        Args:
+            job (tuple): (phases, p, T, guesses, bulk). Guesses and bulk are
+                optional.
+
+        Returns:
+            tuple: (status, result), where result is TCResult or None
+        """
+        phases, p, T, guesses, bulk = (tuple(job) + (None, None))[:5]
+        if guesses is not None or bulk is not None:
+            self.update_scriptfile(guesses=guesses, bulk=bulk)
+        self.calc_assemblage(phases, p, T)
+        status, res, output = self.parse_logfile()
+        if res is not None:
+            return status, res[0]
+        else:
+            return status, None
 
     def dogmin(self, variance):
         """Run THERMOCALC dogmin session.
@@ -975,7 +1226,8 @@ class TCAPI(object):
         """
         tmpl = '{}\nn\n\n'
         ans = tmpl.format(variance)
-        tcout = self.runtc(ans)
+        tcout = self.runtc(ans, calltype='dogmin')
+        self.stats.add_outcome('dogmin', 'bombed' if 'BOMBED' in tcout else 'ok')
         return tcout
 
     def calc_variance(self, phases):
@@ -995,27 +1247,274 @@ class TCAPI(object):
                 break
         return variance
 
-    def runtc(self, instr):
+    def runtc(self, instr, calltype='runtc'):
         """Low-level method to actually run THERMOCALC.
 
         Args:
             instr (str): String to be passed to standard input for session.
+            calltype (str): Name of call used to account timing statistics.
+                Default 'runtc'
+
+        Returns:
+            str: THERMOCALC standard output
+
+        Note:
+            When cache is enabled (see `use_cache`) and identical run is
+            already cached, THERMOCALC is not executed and stored outputs
+            are restored in working directory.
+        """
+        key, tcout = self._run_prepare(instr, calltype)
+        if tcout is not None:
+            return tcout
+        start = time.perf_counter()
+        p = subprocess.Popen(str(self.tcexe), cwd=str(self.workdir), startupinfo=self._startupinfo(), **popen_kw)
+        spawned = time.perf_counter()
+        output, err = p.communicate(input=instr.encode(self.TCenc))
+        self.stats.add_time(calltype, 'spawn', spawned - start)
+        self.stats.add_time(calltype, 'compute', time.perf_counter() - spawned)
+        if err is not None:
+            print(err.decode('utf-8'))
+        sys.stdout.flush()
+        tcout = output.decode(self.TCenc)
+        self._run_finish(key, calltype, tcout)
+        return tcout
+
+    async def arun(self, instr, calltype='runtc'):
+        """Asynchronous version of `runtc`.
+
+        THERMOCALC is executed as asyncio subprocess, so event loop is not
+        blocked. Number of concurrently running THERMOCALC processes in this
+        working directory is limited by semaphore to one, as they share
+        scriptfile and output files. Note that outputs could be overwritten
+        by concurrent call as soon as semaphore is released, so use `acalc_t`
+        and similar methods to get parsed results. To run calculations
+        concurrently use `TCWorkerPool.acall`.
+
+        Args:
+            instr (str): String to be passed to standard input for session.
+            calltype (str): Name of call used to account timing statistics.
+                Default 'runtc'
 
         Returns:
             str: THERMOCALC standard output
         """
+        async with self.semaphore():
+            return await self._aexec(instr, calltype)
+
+    async def _aexec(self, instr, calltype):
+        key, tcout = self._run_prepare(instr, calltype)
+        if tcout is not None:
+            return tcout
+        start = time.perf_counter()
+        kw = dict(popen_kw, startupinfo=self._startupinfo()) if sys.platform.startswith('win') else popen_kw
+        p = await asyncio.create_subprocess_exec(str(self.tcexe), cwd=str(self.workdir), **kw)
+        spawned = time.perf_counter()
+        output, err = await p.communicate(input=instr.encode(self.TCenc))
+        self.stats.add_time(calltype, 'spawn', spawned - start)
+        self.stats.add_time(calltype, 'compute', time.perf_counter() - spawned)
+        if err is not None:
+            print(err.decode('utf-8'))
+        tcout = output.decode(self.TCenc)
+        self._run_finish(key, calltype, tcout)
+        return tcout
+
+    def semaphore(self):
+        """asyncio.Semaphore: Semaphore guarding working directory in running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._asem is None or self._asem[0] is not loop:
+            self._asem = (loop, asyncio.Semaphore(1))
+        return self._asem[1]
+
+    def _startupinfo(self):
         if sys.platform.startswith('win'):
             startupinfo = subprocess.STARTUPINFO()
             startupinfo.dwFlags = 1
             startupinfo.wShowWindow = 0
         else:
             startupinfo = None
-        p = subprocess.Popen(str(self.tcexe), cwd=str(self.workdir), startupinfo=startupinfo, **popen_kw)
-        output, err = p.communicate(input=instr.encode(self.TCenc))
-        if err is not None:
-            print(err.decode('utf-8'))
-        sys.stdout.flush()
-        return output.decode(self.TCenc)
+        return startupinfo
+
+    def csvfile_fresh(self):
+        """Check whether csv file was written by last THERMOCALC run.
+
+        csv output is optional, so file left from earlier runs or created by
+        user is not removed, but ignored.
+        """
+        return self._csvfile_stamp() not in (None, self._csvstamp)
+
+    def _csvfile_stamp(self):
+        try:
+            st = self.csvfile.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _run_prepare(self, instr, calltype):
+        """Account call and lookup cache. Returns cache key and cached output."""
+        self._csvstamp = self._csvfile_stamp()
+        self._calltype = calltype
+        self.stats.add_call(calltype)
+        self.stats.add_time(calltype, 'scriptfile', self._script_time)
+        self._script_time = 0
+        key, tcout = None, None
+        if self.cache is not None:
+            start = time.perf_counter()
+            key = self.cache.key(self, instr)
+            tcout = self.cache.restore(self, key)
+            self.stats.add_time(calltype, 'cache', time.perf_counter() - start)
+            if tcout is not None:
+                self.stats.add_cached(calltype)
+        return key, tcout
+
+    def _run_finish(self, key, calltype, tcout):
+        """Store finished run in cache."""
+        if self.cache is not None:
+            start = time.perf_counter()
+            self.cache.store(self, key, tcout)
+            self.stats.add_time(calltype, 'cache', time.perf_counter() - start)
+
+    async def _acalc(self, ans, calltype):
+        """Run THERMOCALC and parse outputs while holding working directory semaphore."""
+        async with self.semaphore():
+            await self._aexec(ans, calltype)
+            status, res, output = self.parse_logfile(calltype=calltype)
+        return status, res, output, ans
+
+    async def acalc_t(self, phases, out, **kwargs):
+        """Asynchronous version of `calc_t`.
+
+        Outputs are parsed before working directory is released, so
+        concurrent calculations could not overwrite them.
+
+        Returns:
+            tuple: (status, res, output, ans), i.e. result of `parse_logfile`
+            and input ans for THERMOCALC run.
+        """
+        ans = self._ans_calc_t(phases, out, **kwargs)
+        return await self._acalc(ans, 'calc_t')
+
+    async def acalc_p(self, phases, out, **kwargs):
+        """Asynchronous version of `calc_p`. See `acalc_t`."""
+        ans = self._ans_calc_p(phases, out, **kwargs)
+        return await self._acalc(ans, 'calc_p')
+
+    async def acalc_pt(self, phases, out, **kwargs):
+        """Asynchronous version of `calc_pt`. See `acalc_t`."""
+        ans = self._ans_calc_pt(phases, out, **kwargs)
+        return await self._acalc(ans, 'calc_pt')
+
+    async def acalc_tx(self, phases, out, **kwargs):
+        """Asynchronous version of `calc_tx`. See `acalc_t`."""
+        ans = self._ans_calc_tx(phases, out, **kwargs)
+        return await self._acalc(ans, 'calc_tx')
+
+    async def acalc_px(self, phases, out, **kwargs):
+        """Asynchronous version of `calc_px`. See `acalc_t`."""
+        ans = self._ans_calc_px(phases, out, **kwargs)
+        return await self._acalc(ans, 'calc_px')
+
+    async def acalc_assemblage(self, phases, p, t):
+        """Asynchronous version of `calc_assemblage`. See `acalc_t`."""
+        ans = self._ans_calc_assemblage(phases, p, t)
+        return await self._acalc(ans, 'calc_assemblage')
+
+    async def acalc_job(self, job):
+        """Asynchronous version of `calc_job`.
+
+        Scriptfile update, calculation and parsing are done while holding
+        working directory semaphore, so concurrent jobs do not interfere.
+        """
+        phases, p, T, guesses, bulk = (tuple(job) + (None, None))[:5]
+        async with self.semaphore():
+            if guesses is not None or bulk is not None:
+                self.update_scriptfile(guesses=guesses, bulk=bulk)
+            ans = self._ans_calc_assemblage(phases, p, T)
+            await self._aexec(ans, 'calc_assemblage')
+            status, res, output = self.parse_logfile(calltype='calc_assemblage')
+        if res is not None:
+            return status, res[0]
+        else:
+            return status, None
+
+    @property
+    def probefile(self):
+        """pathlib.Path: Path to file storing result of initial THERMOCALC run."""
+        return self.workdir.joinpath('.psbprobe.json')
+
+    def probe_signature(self):
+        """Return signature of working directory setup.
+
+        Signature is calculated from size and modification time of THERMOCALC
+        executable, content of tc-prefs file, a-x file and scriptfile. Blocks
+        maintained by pypsbuilder (ptguesses, dogmin and bulk) are excluded,
+        as they do not influence initial THERMOCALC run.
+
+        Returns:
+            str: hexadecimal digest
+        """
+        st = self.tcexe.stat()
+        h = hashlib.sha1('{} {} {}'.format(self.tcexe.name, st.st_size, st.st_mtime_ns).encode())
+        for path in [self.prefsfile, self.axfile]:
+            with path.open('rb') as f:
+                h.update(f.read())
+        sc = ScriptFile(self.scriptfile, encoding=self.TCenc)
+        for part in sc.parts:
+            if not isinstance(part, str):
+                h.update(''.join(part).encode(self.TCenc))
+        return h.hexdigest()
+
+    def probe(self, cached=True):
+        """Run THERMOCALC to get its version, dataset and available phases.
+
+        The output is stored in working directory and reused while setup
+        of working directory (see `probe_signature`) is not changed, so
+        THERMOCALC is not executed at all.
+
+        Args:
+            cached (bool): When False THERMOCALC is always executed.
+                Default True
+
+        Returns:
+            str: THERMOCALC standard output
+        """
+        signature = self.probe_signature()
+        if cached and self.probefile.exists():
+            try:
+                with self.probefile.open('r', encoding='utf-8') as f:
+                    probe = json.load(f)
+                if probe['signature'] == signature:
+                    return probe['tcout']
+            except (OSError, ValueError, KeyError):
+                pass
+        tcout = self.runtc('\nkill\n\n', calltype='probe')
+        if 'BOMBED' not in tcout:
+            try:
+                with self.probefile.open('w', encoding='utf-8') as f:
+                    json.dump(dict(signature=signature, tcout=tcout), f)
+            except OSError:
+                pass
+        return tcout
+
+    def use_cache(self, cachedir=None, maxsize=512):
+        """Enable or disable on-disk cache of THERMOCALC runs.
+
+        Args:
+            cachedir (str, Path): Cache directory. When None `.psbcache`
+                in working directory is used. Default None
+            maxsize (float): Maximum size of cache in MB. When exceeded, least
+                recently used runs are evicted. When 0, cache is disabled.
+                Default 512.
+
+        Returns:
+            TCCache: cache instance or None when disabled
+        """
+        if maxsize > 0:
+            if cachedir is None:
+                cachedir = self.workdir / '.psbcache'
+            self.cache = TCCache(cachedir, maxsize=maxsize)
+        else:
+            self.cache = None
+        return self.cache
 
     def rundr(self):
         """Method to run drawpd."""
@@ -1035,180 +1534,1770 @@ class TCAPI(object):
             print('No drawpd executable identified in working directory.')
             return False
 
+    def clone(self, workdir):
+        """Create private copy of working directory and return its TCAPI.
 
-class TCResult():
+        The tc-prefs file, scriptfile, a-x file and dataset are copied to
+        new directory. THERMOCALC executable is symlinked when possible,
+        otherwise copied. Initial THERMOCALC check is not repeated.
 
-    def __init__(self, T, p, variance=0, step=1, data={}, ptguess=['']):
-        self.data = data
-        self.ptguess = ptguess
-        self.T = T
-        self.p = p
-        self.variance = variance
-        self.step = step
+        Args:
+            workdir (str, Path): Path to new working directory. It is created
+                when not exists.
 
-    @classmethod
-    def from_block(cls, block, ptguess):
-        info, ax, sf, bulk, rbi, mode, factor, td, sys, *mems, pems = block.split('\n\n')
-        if 'var = 2; seen' in info:
-            # no step in bulk
-            info, ax, sf, rbi, mode, factor, td, sys, *mems, pems = block.split('\n\n')
-            bulk = '\n'.join(rbi.split('\n')[:3])
-            rbi = '\n'.join(rbi.split('\n')[3:])
-        # heading
-        data = {phase: {} for phase in info.split('{')[0].split()}
-        p, T = (float(v.strip()) for v in info.split('{')[1].split('}')[0].split(','))
-        variance = int(info.split('var = ')[1].split(' ')[0].replace(';', ''))
-        # a-x variables
-        for head, vals in zip(ax.split('\n')[::2], ax.split('\n')[1::2]):
-            phase, *names = head.split()
-            data[phase].update({name.replace('({})'.format(phase), ''): float(val) for name, val in zip(names, vals.split())})
-        # site fractions
-        for head, vals in zip(sf.split('\n')[1::2], sf.split('\n')[2::2]): # skip site fractions row
-            phase, *names = head.split()
-            data[phase].update({name: float(val) for name, val in zip(names, vals.split())})
-        # bulk composition
-        bulk_vals = {}
-        oxhead, vals = bulk.split('\n')[1:]
-        for ox, val in zip(oxhead.split(), vals.split()[1:]): # skip oxide compositions row
-            bulk_vals[ox] = float(val)
-        data['bulk'] = bulk_vals
-        step = float(vals.split()[-1]) - 1 # steps should starts with 0
-        # rbi
-        for row in rbi.split('\n'):
-            phase, *vals = row.split()
-            data[phase].update({ox: float(val) for ox, val in zip(oxhead.split(), vals)})
-        # modes
-        head, vals = mode.split('\n')
-        phases = head.split()[1:]
-        for phase, val in zip(phases, vals.split()[-len(phases):]):
-            data[phase].update({'mode': float(val)})
-        # factors
-        head, vals = factor.split('\n')
-        phases = head.split()[1:]
-        for phase, val in zip(phases, vals.split()[-len(phases):]):
-            data[phase].update({'factor': float(val)})
-        # thermodynamic state
-        head, *rows = td.split('\n')
-        for row in rows:
-            phase, *vals = row.split()
-            data[phase].update({name: float(val) for name, val in zip(head.split(), vals)})
-        # bulk thermodynamics
-        sys = {}
-        for name, val in zip(head.split(), row.split()[1:]):
-            sys[name] = float(val)
-        data['sys'] = sys
-        # model end-members
-        if len(mems) > 0:
-            _, mem0 = mems[0].split('\n', maxsplit=1)
-            head = ['ideal', 'gamma', 'activity', 'prop', 'mu', 'RTlna']
-            mems[0] = mem0
-            for mem in mems:
-                ems = mem.split('\n')
-                phase, ems0 = ems[0].split(maxsplit=1)
-                ems[0] = ems0
-                for row in ems:
-                    em, *vals = row.split()
-                    phase_em = '{}({})'.format(phase, em)
-                    data[phase_em] = {name: float(val) for name, val in zip(head, vals)}
-        # pure end-members
-        for row in pems.split('\n')[:-1]:
-            pem, val = row.split()
-            data[pem].update({'mu': float(val)})
-        # Finally
-        return cls(T, p, variance=variance, step=step, data=data, ptguess=ptguess)
+        Returns:
+            TCAPI: instance using new working directory
+        """
+        assert self.OK, 'Only initialized working directory could be cloned.'
+        workdir = Path(workdir).resolve()
+        workdir.mkdir(parents=True, exist_ok=True)
+        for src in [self.prefsfile, self.scriptfile, self.axfile, self.datasetfile]:
+            if src.exists():
+                shutil.copy2(str(src), str(workdir / src.name))
+        tcexe = workdir / self.tcexe.name
+        if not tcexe.exists():
+            try:
+                os.symlink(str(self.tcexe), str(tcexe))
+            except (OSError, NotImplementedError):
+                shutil.copy2(str(self.tcexe), str(tcexe))
+        tc = copy.copy(self)
+        tc.workdir = workdir
+        tc.tcexe = tcexe
+        tc.drexe = None
+        tc._script = None
+        tc._asem = None
+        tc._csvstamp = None
+        return tc
+
+
+class TCStats:
+    """Timing statistics and outcomes of THERMOCALC calls.
+
+    Statistics are collected separately for each type of call, e.g.
+    'calc_t', 'calc_pt' or 'calc_assemblage'. Time spent in individual
+    stages of call is accumulated in seconds. Scriptfile updates are
+    accounted to the following call. Statistics could be shared by
+    several TCAPI instances (e.g. workers of TCWorkerPool) and it is
+    thread-safe.
 
-    def __repr__(self):
-        return 'p:{:g} T:{:g} V:{} Phases: {}'.format(self.p, self.T, self.variance, ' '.join(self.phases))
+    Attributes:
+        stages (tuple): Stages of THERMOCALC call. 'scriptfile' - update of
+            scriptfile, 'cache' - cache lookup and storage, 'spawn' - start
+            of THERMOCALC process, 'compute' - THERMOCALC run, 'read' - reading
+            of output files and 'parse' - parsing of outputs.
+        outcomes (tuple): Possible outcomes of parsing.
+        calls (OrderedDict): Statistics for each type of call
+
+    Example:
+        >>> tc.stats
+        call               count   ok  nir bombed cached  scriptfile ...
+        calc_assemblage     2500 2437   63      0      0       1.246 ...
+        >>> tc.stats.to_csv('stats.csv')
 
-    def __getitem__(self, key):
-        if isinstance(key, str):
-            if key not in self.phases:
-                raise IndexError('The index (%d) do not exists.'.format(key))
-            return self.data[key]
-        else:
-            raise TypeError('Invalid argument type.')
+    """
+    stages = ('scriptfile', 'cache', 'spawn', 'compute', 'read', 'parse')
+    outcomes = ('ok', 'nir', 'bombed')
 
-    @property
-    def phases(self):
-        return set(self.data.keys())
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = OrderedDict()
 
-    def rename_phase(self, old, new):
-        self.data[new] = self.data.pop(old)
-        for ix, ln in enumerate(self.ptguess):
-            self.ptguess[ix] = ln.replace('({})'.format(old), '({})'.format(new))
+    def __repr__(self):
+        cols = ['count'] + list(self.outcomes) + ['cached'] + list(self.stages) + ['total']
+        head = '{:<16}'.format('call') + ''.join('{:>11}'.format(col) for col in cols)
+        rows = [head]
+        for row in self.table():
+            vals = ['{:>11d}'.format(row[col]) if isinstance(row[col], int) else '{:>11.3f}'.format(row[col]) for col in cols]
+            rows.append('{:<16}'.format(row['call']) + ''.join(vals))
+        return '\n'.join(rows)
+
+    def _get(self, calltype):
+        if calltype not in self.calls:
+            dt = OrderedDict((k, 0) for k in ('count',) + self.outcomes + ('cached',))
+            dt.update((stage, 0.0) for stage in self.stages)
+            self.calls[calltype] = dt
+        return self.calls[calltype]
+
+    def add_call(self, calltype):
+        """Count new call of given type."""
+        with self._lock:
+            self._get(calltype)['count'] += 1
+
+    def add_cached(self, calltype):
+        """Count call restored from cache."""
+        with self._lock:
+            self._get(calltype)['cached'] += 1
+
+    def add_time(self, calltype, stage, seconds):
+        """Accumulate time spent in stage of call."""
+        with self._lock:
+            self._get(calltype)[stage] += seconds
+
+    def add_outcome(self, calltype, status):
+        """Count outcome ('ok', 'nir' or 'bombed') of call."""
+        if status in self.outcomes:
+            with self._lock:
+                self._get(calltype)[status] += 1
+
+    def reset(self):
+        """Clear all statistics."""
+        with self._lock:
+            self.calls.clear()
+
+    def table(self):
+        """Return statistics as list of dicts, one for each call type.
+
+        Besides counts and accumulated times, each row contains
+        'total' time and outcome rates, e.g. 'ok_rate'.
+        """
+        rows = []
+        with self._lock:
+            for calltype, dt in self.calls.items():
+                row = OrderedDict(call=calltype)
+                row.update(dt)
+                row['total'] = sum(dt[stage] for stage in self.stages)
+                row['mean'] = row['total'] / dt['count'] if dt['count'] > 0 else 0.0
+                nout = sum(dt[outcome] for outcome in self.outcomes)
+                for outcome in self.outcomes:
+                    row[outcome + '_rate'] = dt[outcome] / nout if nout > 0 else 0.0
+                rows.append(row)
+        return rows
+
+    def to_json(self, filename=None):
+        """Export statistics to JSON.
 
+        Args:
+            filename (str, Path): When not None, JSON is written to file.
 
-class TCResultSet:
+        Returns:
+            str: JSON string
+        """
+        txt = json.dumps(self.table(), indent=2)
+        if filename is not None:
+            with Path(filename).open('w', encoding='utf-8') as f:
+                f.write(txt)
+        return txt
 
-    def __init__(self, results):
-        self.results = results
-        self.x = np.array([res.T for res in results])
-        self.y = np.array([res.p for res in results])
-        self.steps = np.array([res.step for res in results])
+    def to_csv(self, filename=None):
+        """Export statistics to CSV.
 
-    def __repr__(self):
-        return '{} results'.format(len(self.results))
+        Args:
+            filename (str, Path): When not None, CSV is written to file.
 
-    def __len__(self):
-        return len(self.results)
+        Returns:
+            str: CSV string
+        """
+        rows = self.table()
+        buf = io.StringIO()
+        if rows:
+            writer = csv.DictWriter(buf, fieldnames=list(rows[0].keys()), lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(rows)
+        txt = buf.getvalue()
+        if filename is not None:
+            with Path(filename).open('w', encoding='utf-8', newline='') as f:
+                f.write(txt)
+        return txt
+
+
+class TCCache:
+    """Content-addressed on-disk cache of THERMOCALC runs.
+
+    Cache key is hash of standard input, scriptfile (including guesses, dogmin
+    and bulk blocks), a-x file, dataset, tc-prefs file and THERMOCALC
+    executable. Standard output together with log, ic and csv files are
+    stored, so parsing of restored run gives same results as real one.
+    Cache could be shared by several TCAPI instances (e.g. workers of
+    TCWorkerPool) and it is thread-safe.
 
-    def __getitem__(self, key):
-        if isinstance(key, slice):
-            #Get the start, stop, and step from the slice
-            return TCResultSet(self.results[key])
-        elif isinstance(key, int) :
-            if key < 0 : #Handle negative indices
-                key += len(self.results)
-            if key < 0 or key >= len(self.results):
-                raise IndexError('The index (%d) is out of range.'.format(key))
-            return self.results[key]
-        elif isinstance(key, list) :
-            return TCResultSet([self.results[ix] for ix in key])
-        else:
-            raise TypeError('Invalid argument type.')
+    Attributes:
+        cachedir (pathlib.Path): Path to cache directory
+        maxsize (float): Maximum size of cache in MB
+        hits (int): Number of runs restored from cache
+        misses (int): Number of runs not found in cache
 
-    @property
-    def variance(self):
-        return self.results[0].variance
+    """
+    def __init__(self, cachedir, maxsize=512):
+        self.cachedir = Path(cachedir).resolve()
+        self.cachedir.mkdir(parents=True, exist_ok=True)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._digests = {}
+        # least recently used entries first
+        self._entries = OrderedDict()
+        for entry in sorted(self.cachedir.glob('*.tcrun'), key=lambda e: e.stat().st_mtime):
+            self._entries[entry.stem] = entry.stat().st_size
+
+    def __repr__(self):
+        return 'TCCache {} runs {:.1f}/{:g} MB hits/misses {}/{}'.format(len(self._entries), self.size / 2**20,
+                                                                        self.maxsize, self.hits, self.misses)
 
     @property
-    def phases(self):
-        return self.results[0].phases
+    def size(self):
+        """int: Actual size of cache in bytes."""
+        return sum(self._entries.values())
 
-    def ptguess(self, ix):
+    def _file_digest(self, path):
+        # digests of large rarely changed files are reused until stat changes
         try:
-            return self.results[ix].ptguess
-        except Exception as e:
-            return None
+            st = path.stat()
+        except OSError:
+            return b''
+        sig = (str(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(sig, None)
+        if digest is None:
+            with path.open('rb') as f:
+                digest = hashlib.sha1(f.read()).digest()
+            with self._lock:
+                self._digests[sig] = digest
+        return digest
+
+    def key(self, tc, instr):
+        """Return cache key of THERMOCALC run.
 
-    def rename_phase(self, old, new):
-        for r in self.results:
-            r.rename_phase(old, new)
+        Args:
+            tc (TCAPI): THERMOCALC working directory API
+            instr (str): String to be passed to standard input
 
-    def insert(self, ix, result):
-        self.results.insert(ix, result)
-        self.x = np.insert(self.x, ix, result.T)
-        self.y = np.insert(self.y, ix, result.p)
-        self.steps = np.insert(self.steps, ix, result.step)
+        Returns:
+            str: hexadecimal digest
+        """
+        h = hashlib.sha1(instr.encode(tc.TCenc))
+        with tc.scriptfile.open('rb') as f:
+            h.update(f.read())
+        for path in [tc.axfile, tc.datasetfile, tc.prefsfile, tc.tcexe]:
+            h.update(self._file_digest(path))
+        return h.hexdigest()
 
+    def restore(self, tc, key):
+        """Restore cached outputs in working directory.
 
-class Dogmin:
-    def __init__(self, **kwargs):
-        assert 'output' in kwargs, 'Dogmin output must be provided'
-        assert 'resic' in kwargs, 'ic file content must be provided'
-        self.id = kwargs.get('id', 0)
-        self._output = kwargs.get('output')
-        self.resic = kwargs.get('resic')
-        self.x = kwargs.get('x', None)
-        self.y = kwargs.get('y', None)
+        Corrupted entry is removed from cache.
 
-    @property
-    def output(self):
-        return self._output.split('##########################################################\n')[-1]
+        Args:
+            tc (TCAPI): THERMOCALC working directory API
+            key (str): cache key
 
-    @property
-    def phases(self):
-        return set(self.output.split('phases: ')[1].split('(gmin')[0].split())
+        Returns:
+            str: THERMOCALC standard output or None when run is not cached
+        """
+        entry = self.cachedir / (key + '.tcrun')
+        try:
+            with gzip.open(str(entry), 'rb') as stream:
+                data = pickle.load(stream)
+            tcout, files = data['tcout'], data['files']
+            os.utime(str(entry))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError):
+            # corrupted entry is dropped, so run is cached again
+            with self._lock:
+                self.misses += 1
+                self._entries.pop(key, None)
+            try:
+                entry.unlink()
+            except OSError:
+                pass
+            return None
+        for name, content in files.items():
+            path = tc.workdir / name
+            if content is None:
+                # csv file is ignored unless rewritten by run
+                if path.exists() and path != tc.csvfile:
+                    path.unlink()
+            else:
+                with path.open('wb') as f:
+                    f.write(content)
+        with self._lock:
+            self.hits += 1
+            self._entries[key] = self._entries.pop(key, entry.stat().st_size)
+        return tcout
+
+    def store(self, tc, key, tcout):
+        """Store outputs of finished THERMOCALC run.
+
+        Args:
+            tc (TCAPI): THERMOCALC working directory API
+            key (str): cache key
+            tcout (str): THERMOCALC standard output
+        """
+        files = {}
+        for path in [tc.logfile, tc.icfile, tc.csvfile]:
+            if path.exists():
+                with path.open('rb') as f:
+                    files[path.name] = f.read()
+            else:
+                files[path.name] = None
+        entry = self.cachedir / (key + '.tcrun')
+        tmp = self.cachedir / '{}.{}.tmp'.format(key, threading.get_ident())
+        with gzip.open(str(tmp), 'wb') as stream:
+            pickle.dump(dict(tcout=tcout, files=files), stream)
+        os.replace(str(tmp), str(entry))
+        with self._lock:
+            self._entries[key] = entry.stat().st_size
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        size = self.size
+        while size > self.maxsize * 2**20 and len(self._entries) > 1:
+            key, esize = self._entries.popitem(last=False)
+            try:
+                (self.cachedir / (key + '.tcrun')).unlink()
+            except OSError:
+                pass
+            size -= esize
+
+    def clear(self):
+        """Remove all cached runs."""
+        with self._lock:
+            for key in self._entries:
+                try:
+                    (self.cachedir / (key + '.tcrun')).unlink()
+                except OSError:
+                    pass
+            self._entries.clear()
+
+
+class TCWorkerPool:
+    """Pool of THERMOCALC workers running in isolated working directories.
+
+    Each worker is a clone of provided TCAPI using its own sandbox directory,
+    so scriptfile updates and THERMOCALC outputs of concurrent calculations
+    do not interfere. Sandboxes are created when pool is created, so later
+    changes of original scriptfile are not propagated to workers.
+
+    Attributes:
+        tc (TCAPI): Original THERMOCALC working directory API.
+        jobs (int): Number of workers.
+        basedir (pathlib.Path): Directory holding all sandboxes.
+        workers (list): List of TCAPI instances of individual workers.
+
+    Example:
+        Calculate assemblages concurrently::
+
+            >>> def calc(tc, phases, p, t):
+            ...     tc.calc_assemblage(phases, p, t)
+            ...     return tc.parse_logfile()
+            >>> with TCWorkerPool(tc, jobs=4) as pool:
+            ...     futures = [pool.submit(calc, phases, p, t) for p, t in pts]
+
+    """
+    def __init__(self, tc, jobs=None, basedir=None):
+        self.tc = tc
+        self.jobs = jobs if jobs else os.cpu_count()
+        self.basedir = Path(tempfile.mkdtemp(prefix='psbworkers-', dir=basedir))
+        try:
+            self.workers = [tc.clone(self.basedir / 'worker{:03d}'.format(ix)) for ix in range(self.jobs)]
+        except BaseException:
+            shutil.rmtree(str(self.basedir), ignore_errors=True)
+            raise
+        self._idle = queue.Queue()
+        for worker in self.workers:
+            self._idle.put(worker)
+        self._executor = ThreadPoolExecutor(max_workers=self.jobs)
+        self._aidle = list(self.workers)
+        self._asem = None
+
+    def __repr__(self):
+        return 'THERMOCALC worker pool with {} workers in {}'.format(self.jobs, self.basedir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _call(self, func, args, kwargs):
+        tc = self._idle.get()
+        try:
+            return func(tc, *args, **kwargs)
+        finally:
+            self._idle.put(tc)
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule function to be executed on first idle worker.
+
+        Args:
+            func (callable): Function called as ``func(tc, *args, **kwargs)``,
+                where tc is TCAPI instance of the worker.
+
+        Returns:
+            concurrent.futures.Future: future of function result
+        """
+        return self._executor.submit(self._call, func, args, kwargs)
+
+    def map(self, func, *iterables):
+        """Parallel version of map. Results are returned in order of arguments.
+
+        Args:
+            func (callable): Function called as ``func(tc, *args)``, where tc
+                is TCAPI instance of the worker.
+        """
+        futures = [self.submit(func, *args) for args in zip(*iterables)]
+        for future in futures:
+            yield future.result()
+
+    def semaphore(self):
+        """asyncio.Semaphore: Semaphore limiting number of running coroutines to number of workers."""
+        loop = asyncio.get_running_loop()
+        if self._asem is None or self._asem[0] is not loop:
+            self._asem = (loop, asyncio.Semaphore(self.jobs))
+        return self._asem[1]
+
+    async def acall(self, func, *args, **kwargs):
+        """Asynchronous version of `submit`.
+
+        Note that synchronous and asynchronous calls should not be mixed
+        on the same pool.
+
+        Args:
+            func (coroutine function): Function called as
+                ``await func(tc, *args, **kwargs)``, where tc is TCAPI
+                instance of idle worker.
+
+        Returns:
+            result of function
+
+        Example:
+            >>> async def calc(tc, phases, p, t):
+            ...     status, res, output, ans = await tc.acalc_assemblage(phases, p, t)
+            ...     return res
+            >>> results = await asyncio.gather(*[pool.acall(calc, phases, p, t) for p, t in pts])
+        """
+        async with self.semaphore():
+            tc = self._aidle.pop()
+            try:
+                return await func(tc, *args, **kwargs)
+            finally:
+                self._aidle.append(tc)
+
+    async def acalc_job(self, job):
+        """Calculate job of `TCAPI.calc_assemblages` on idle worker.
+
+        Returns:
+            tuple: (status, result), where result is TCResult or None
+        """
+        return await self.acall(TCAPI.acalc_job, job)
+
+    def close(self):
+        """Wait for running calculations and remove all sandboxes."""
+        self._executor.shutdown(wait=True)
+        shutil.rmtree(str(self.basedir), ignore_errors=True)
+
+
+def iter_logblocks(logstream):
+    """Single-pass parser of calculation blocks in THERMOCALC log.
+
+    Args:
+        logstream (iterable): Lines of THERMOCALC log, e.g. open file.
+
+    Yields:
+        tuple: (correct, ptguess) for each calculated block. The correct is
+        False for blocks marked by THERMOCALC as incorrect and ptguess is
+        TCGuess.
+    """
+    block_start = '-' * 68
+    nlines = None
+    for ln in logstream:
+        ln = ln.rstrip('\r\n')
+        if ln == '':
+            continue
+        if ln.startswith(block_start):
+            if nlines is not None:
+                yield correct, TCGuess.from_lines(ptguess)
+            nlines, correct = 0, True
+            last = deque(maxlen=3)
+            ptguess, capture = [], False
+        elif nlines is not None:
+            if nlines == 1 and ln.startswith('#'):
+                correct = False
+            if capture:
+                ptguess.append(ln)
+                if ln.startswith('xyzguess'):
+                    xyz = True
+                elif xyz:
+                    capture = False
+            elif not ptguess and ln.startswith('ptguess'):
+                ptguess = list(last) + [ln]
+                capture, xyz = True, False
+            last.append(ln)
+            nlines += 1
+    if nlines is not None:
+        yield correct, TCGuess.from_lines(ptguess)
+
+
+def iter_icblocks(icstream):
+    """Single-pass parser of calculation blocks in THERMOCALC ic file.
+
+    Args:
+        icstream (iterable): Lines of THERMOCALC ic file including newlines,
+            e.g. open file.
+
+    Yields:
+        str: text of calculated block
+    """
+    separator = '=' * 59 + '\n'
+    block, pending = None, False
+    for ln in icstream:
+        if pending:
+            pending = False
+            if ln == '\n':
+                if block is not None:
+                    # strip newline before separator
+                    block[-1] = block[-1][:-1]
+                    yield ''.join(block)
+                block = []
+                continue
+            elif block is not None:
+                block.append(separator)
+        if ln == separator:
+            pending = True
+        elif block is not None:
+            block.append(ln)
+    if block is not None:
+        if pending:
+            block.append(separator)
+        yield ''.join(block)
+
+
+def iter_blocks(logstream, icstream):
+    """Incrementally pair THERMOCALC ic blocks with ptguesses from log.
+
+    Args:
+        logstream (iterable): Lines of THERMOCALC log
+        icstream (iterable): Lines of THERMOCALC ic file
+
+    Yields:
+        tuple: (block, ptguess) of correct calculations
+    """
+    for (correct, ptguess), block in zip(iter_logblocks(logstream), iter_icblocks(icstream)):
+        if correct:
+            yield block, ptguess
+
+
+def iter_results(logstream, icstream):
+    """Incrementally parse THERMOCALC results from log and ic streams.
+
+    Both streams are read only once and results are yielded as soon as
+    blocks are complete, so memory usage is bounded by single block.
+
+    Args:
+        logstream (iterable): Lines of THERMOCALC log
+        icstream (iterable): Lines of THERMOCALC ic file
+
+    Yields:
+        TCResult: results of correct calculations
+    """
+    for block, ptguess in iter_blocks(logstream, icstream):
+        yield TCResult.from_block(block, ptguess)
+
+
+icsections = ('ax', 'sf', 'bulk', 'rbi', 'mode', 'factor', 'td', 'mems', 'pems')
+"""tuple: Names of data sections of THERMOCALC ic block in parsing order."""
+
+
+def split_icblock(block):
+    """Split THERMOCALC ic block to heading values and raw sections.
+
+    Args:
+        block (str): Block of THERMOCALC ic file
+
+    Returns:
+        tuple: (p, T, variance, step, keys, sections), where keys is list
+        of all phases and end-members in block and sections is dictionary
+        of raw data sections.
+    """
+    info, ax, sf, bulk, rbi, mode, factor, td, sys, *mems, pems = block.split('\n\n')
+    if 'var = 2; seen' in info:
+        # no step in bulk
+        info, ax, sf, rbi, mode, factor, td, sys, *mems, pems = block.split('\n\n')
+        bulk = '\n'.join(rbi.split('\n')[:3])
+        rbi = '\n'.join(rbi.split('\n')[3:])
+    # heading
+    keys = info.split('{')[0].split() + ['bulk', 'sys']
+    p, T = (float(v.strip()) for v in info.split('{')[1].split('}')[0].split(','))
+    variance = int(info.split('var = ')[1].split(' ')[0].replace(';', ''))
+    step = float(bulk.split('\n')[2].split()[-1]) - 1 # steps should starts with 0
+    # model end-members names
+    if len(mems) > 0:
+        mems[0] = mems[0].split('\n', maxsplit=1)[1]
+        for mem in mems:
+            ems = mem.split('\n')
+            phase, ems[0] = ems[0].split(maxsplit=1)
+            keys.extend('{}({})'.format(phase, row.split(maxsplit=1)[0]) for row in ems)
+    sections = dict(ax=ax, sf=sf, bulk=bulk, rbi=rbi, mode=mode, factor=factor,
+                    td=td, mems=mems, pems=pems)
+    return p, T, variance, step, keys, sections
+
+
+def parse_icsection(name, sections):
+    """Parse single data section of THERMOCALC ic block.
+
+    Args:
+        name (str): Name of section. One of `icsections`.
+        sections (dict): Raw sections returned by `split_icblock`
+
+    Returns:
+        dict: Dictionary of phases and dictionaries of variables and values
+    """
+    data = {}
+    if name == 'ax':
+        # a-x variables
+        ax = sections['ax'].split('\n')
+        for head, vals in zip(ax[::2], ax[1::2]):
+            phase, *names = head.split()
+            data[phase] = {name.replace('({})'.format(phase), ''): float(val) for name, val in zip(names, vals.split())}
+    elif name == 'sf':
+        # site fractions
+        sf = sections['sf'].split('\n')
+        for head, vals in zip(sf[1::2], sf[2::2]): # skip site fractions row
+            phase, *names = head.split()
+            data[phase] = {name: float(val) for name, val in zip(names, vals.split())}
+    elif name == 'bulk':
+        # bulk composition
+        oxhead, vals = sections['bulk'].split('\n')[1:]
+        data['bulk'] = {ox: float(val) for ox, val in zip(oxhead.split(), vals.split()[1:])} # skip oxide compositions row
+    elif name == 'rbi':
+        oxhead = sections['bulk'].split('\n')[1].split()
+        for row in sections['rbi'].split('\n'):
+            phase, *vals = row.split()
+            data[phase] = {ox: float(val) for ox, val in zip(oxhead, vals)}
+    elif name in ['mode', 'factor']:
+        # modes and factors
+        head, vals = sections[name].split('\n')
+        phases = head.split()[1:]
+        for phase, val in zip(phases, vals.split()[-len(phases):]):
+            data[phase] = {name: float(val)}
+    elif name == 'td':
+        # thermodynamic state
+        head, *rows = sections['td'].split('\n')
+        for row in rows:
+            phase, *vals = row.split()
+            data[phase] = {name: float(val) for name, val in zip(head.split(), vals)}
+        # bulk thermodynamics
+        data['sys'] = {name: float(val) for name, val in zip(head.split(), row.split()[1:])}
+    elif name == 'mems':
+        # model end-members
+        head = ['ideal', 'gamma', 'activity', 'prop', 'mu', 'RTlna']
+        for mem in sections['mems']:
+            ems = mem.split('\n')
+            phase, ems[0] = ems[0].split(maxsplit=1)
+            for row in ems:
+                em, *vals = row.split()
+                data['{}({})'.format(phase, em)] = {name: float(val) for name, val in zip(head, vals)}
+    elif name == 'pems':
+        # pure end-members
+        for row in sections['pems'].split('\n')[:-1]:
+            pem, val = row.split()
+            data[pem] = {'mu': float(val)}
+    return data
+
+
+csvheadings = {'P(kbar)': 'p', 'P': 'p', 'T(°C)': 'T', 'T(C)': 'T', 'T': 'T',
+               'var': 'variance', 'variance': 'variance', 'step': 'step'}
+"""dict: Names of heading columns of THERMOCALC csv output."""
+
+
+def read_csvtable(csvstream):
+    """Read table of results from THERMOCALC csv output.
+
+    Each row of values contains single calculated result. Rows starting with
+    non-numeric value are considered to be header with names of columns and
+    only values of the last header names are read.
+
+    Args:
+        csvstream (iterable): Lines of csv file, e.g. open file.
+
+    Returns:
+        tuple: (names, rows), where names is list of column names and rows is
+        list of lists of values. Missing values are nan.
+    """
+    names, rows = [], []
+    for row in csv.reader(csvstream):
+        row = [v.strip() for v in row]
+        if not any(row):
+            continue
+        try:
+            float(row[0])
+        except ValueError:
+            if row != names:
+                names, rows = row, []
+        else:
+            rows.append([float(v) if v else np.nan for v in row[:len(names)]] + [np.nan] * (len(names) - len(row)))
+    return names, rows
+
+
+def csv_consistent(names, rows, heads, ptol=0.1, Ttol=1.0):
+    """Check that csv table describes the same results as log or ic output.
+
+    Pressure and temperature of each row must match the heading values and
+    all phases found in row must be listed in heading. When table has no
+    pressure or temperature column, it is considered inconsistent.
+
+    Args:
+        names (list): List of column names
+        rows (list): List of lists of values
+        heads (list): List of (p, T, phases) tuples of corresponding results.
+            When phases is None, they are not checked.
+        ptol (float): Pressure tolerance. Default 0.1
+        Ttol (float): Temperature tolerance. Default 1.0
+
+    Returns:
+        bool: True when table is consistent with headings
+    """
+    headings, index = csv_index(names)
+    if len(rows) != len(heads) or 'p' not in headings or 'T' not in headings:
+        return False
+    for row, (p, T, phases) in zip(rows, heads):
+        if not (abs(row[headings['p']] - p) <= ptol and abs(row[headings['T']] - T) <= Ttol):
+            return False
+        if phases is not None:
+            found = {phase for phase, vix in index.items() if not all(np.isnan(row[col]) for col in vix.values())}
+            if not found.issubset(phases):
+                return False
+    return True
+
+
+def csv_index(names):
+    """Map csv column names to heading keys and (phase, variable) pairs.
+
+    Heading columns are listed in `csvheadings`. Other column names are
+    expected as var(phase), e.g. 'x(g)' or 'mode(g)', or as 'var phase',
+    e.g. 'mode g'. Columns with other names are ignored.
+
+    Args:
+        names (list): List of column names
+
+    Returns:
+        tuple: (headings, index), where headings is dictionary of heading
+        keys and column indexes and index is dictionary of phases and
+        dictionaries of variables and column indexes.
+    """
+    headings, index = {}, OrderedDict()
+    for col, name in enumerate(names):
+        if name in csvheadings:
+            headings[csvheadings[name]] = col
+            continue
+        m = re.fullmatch(r'([^\s(]+)\((\S+)\)', name) or re.fullmatch(r'(\S+)\s+(\S+)', name)
+        if m:
+            var, phase = m.groups()
+            index.setdefault(phase, OrderedDict())[var] = col
+    return headings, index
+
+
+class TCSchema:
+    """Shared description of THERMOCALC variables stored in flat array.
+
+    Schemas are interned, so all results with same phases and variables
+    share single instance with interned names. Use `TCSchema.get` to
+    obtain schema.
+
+    Attributes:
+        index (OrderedDict): Dictionary of phases and dictionaries of
+            variables and positions in array of values.
+        key (tuple): Hashable representation of index
+    """
+    __slots__ = ('index', 'key', '__weakref__')
+    _registry = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, index):
+        """Get shared schema for index.
+
+        Args:
+            index (dict): Dictionary of phases and dictionaries of variables
+                and positions in array of values.
+        """
+        return cls.from_key(tuple((phase, tuple(vix.items())) for phase, vix in index.items()))
+
+    @classmethod
+    def from_key(cls, key):
+        with cls._lock:
+            schema = cls._registry.get(key)
+            if schema is None:
+                schema = cls.__new__(cls)
+                schema.index = OrderedDict((sys.intern(phase), OrderedDict((sys.intern(var), pos) for var, pos in vix))
+                                           for phase, vix in key)
+                schema.key = tuple((phase, tuple(vix.items())) for phase, vix in schema.index.items())
+                cls._registry[key] = schema
+        return schema
+
+    def __reduce__(self):
+        return (TCSchema.from_key, (self.key,))
+
+    def __repr__(self):
+        return 'TCSchema: {}'.format(' '.join(self.index))
+
+    def subset(self, phases):
+        """Get schema restricted to phases."""
+        return TCSchema.get(OrderedDict((phase, vix) for phase, vix in self.index.items() if phase in phases))
+
+    def renamed(self, old, new):
+        """Get schema with phase old renamed to new."""
+        return TCSchema.get(OrderedDict((new if phase == old else phase, vix) for phase, vix in self.index.items()))
+
+
+def format_guess(value):
+    """Format guess value as short as possible without loss of precision."""
+    text = '{:g}'.format(value)
+    return text if float(text) == value else repr(value)
+
+
+class TCGuessLayout:
+    """Shared layout of ptguess lines.
+
+    Layout describes all lines of ptguess except numeric values, i.e.
+    comments, names of variables and their ranges. Layouts are interned, so
+    all ptguesses of same assemblage share single instance. Use
+    `TCGuessLayout.get` to obtain layout.
+
+    Attributes:
+        items (tuple): Tuple of (kind, text, suffix) for each line. The kind
+            is 'text' for verbatim lines, 'at' for comment with P and T,
+            'ptguess' for ptguess line and 'xyz' for xyzguess line.
+        names (tuple): Names of xyzguess variables
+    """
+    __slots__ = ('items', 'names', '__weakref__')
+    _registry = weakref.WeakValueDictionary()
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, items):
+        """Get shared layout for items.
+
+        Args:
+            items (iterable): Iterable of (kind, text, suffix) tuples
+        """
+        items = tuple(items)
+        with cls._lock:
+            layout = cls._registry.get(items)
+            if layout is None:
+                layout = cls.__new__(cls)
+                layout.items = tuple((kind, sys.intern(text), sys.intern(suffix)) for kind, text, suffix in items)
+                layout.names = tuple(text for kind, text, suffix in layout.items if kind == 'xyz')
+                cls._registry[items] = layout
+        return layout
+
+    def __reduce__(self):
+        return (TCGuessLayout.get, (self.items,))
+
+    def __repr__(self):
+        return 'TCGuessLayout: {}'.format(' '.join(self.names))
+
+    def renamed(self, old, new):
+        """Get layout with phase old renamed to new in variable names."""
+        old, new = '({})'.format(old), '({})'.format(new)
+        return TCGuessLayout.get((kind, text.replace(old, new), suffix.replace(old, new))
+                                 for kind, text, suffix in self.items)
+
+
+class TCGuess(Sequence):
+    """Structured THERMOCALC ptguess.
+
+    Pressure, temperature and values of xyzguess variables are stored as
+    floats, while the rest of ptguess lines is kept in shared
+    `TCGuessLayout`. Lines are rendered only when needed, e.g. when written
+    to scriptfile. TCGuess behaves as read-only list of lines.
+
+    Args:
+        p (float): Pressure
+        T (float): Temperature
+        layout (TCGuessLayout): Layout of ptguess lines
+        values (numpy.ndarray): Values of xyzguess variables
+
+    Attributes:
+        p (float): Pressure
+        T (float): Temperature
+        layout (TCGuessLayout): Layout of ptguess lines
+        values (numpy.ndarray): Values of xyzguess variables
+    """
+    __slots__ = ('p', 'T', 'layout', 'values')
+
+    def __init__(self, p, T, layout, values):
+        self.p = p
+        self.T = T
+        self.layout = layout
+        self.values = np.asarray(values, dtype=float)
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Create TCGuess from list of ptguess lines.
+
+        Lines not recognized as ptguess or xyzguess lines are kept verbatim.
+
+        Args:
+            lines (list): List of ptguess lines
+        """
+        p, T = np.nan, np.nan
+        items, values = [], []
+        for ln in lines:
+            if ln.startswith('xyzguess'):
+                kw = ln.split(maxsplit=3)
+                try:
+                    values.append(float(kw[2]))
+                except (IndexError, ValueError):
+                    items.append(('text', ln, ''))
+                else:
+                    items.append(('xyz', kw[1], '  ' + kw[3] if len(kw) > 3 else ''))
+            elif ln.startswith('ptguess'):
+                kw = ln.split(maxsplit=3)
+                try:
+                    p, T = float(kw[1]), float(kw[2])
+                except (IndexError, ValueError):
+                    items.append(('text', ln, ''))
+                else:
+                    items.append(('ptguess', '', kw[3] if len(kw) > 3 else ''))
+            elif ln.startswith('% at P = ') and ', for:' in ln:
+                items.append(('at', '', ln.split(', ', maxsplit=2)[2]))
+            else:
+                items.append(('text', ln, ''))
+        return cls(p, T, TCGuessLayout.get(items), values)
+
+    @property
+    def names(self):
+        """tuple: Names of xyzguess variables"""
+        return self.layout.names
+
+    @property
+    def phases(self):
+        """list: Phases listed in comment line of ptguess or None when not present"""
+        for kind, text, suffix in self.layout.items:
+            if kind == 'at' and suffix.startswith('for:'):
+                return suffix[4:].split(' with ')[0].split()
+        return None
+
+    def lines(self):
+        """Render ptguess lines.
+
+        Returns:
+            list: List of ptguess lines
+        """
+        lines = []
+        values = iter(self.values)
+        for kind, text, suffix in self.layout.items:
+            if kind == 'xyz':
+                lines.append('xyzguess {:<10}{:>12}{}'.format(text, format_guess(next(values)), suffix))
+            elif kind == 'ptguess':
+                lines.append(' '.join(['ptguess', format_guess(self.p), format_guess(self.T)] + ([suffix] if suffix else [])))
+            elif kind == 'at':
+                lines.append('% at P = {}, T = {}, {}'.format(format_guess(self.p), format_guess(self.T), suffix))
+            else:
+                lines.append(text)
+        return lines
+
+    def __len__(self):
+        return len(self.layout.items)
+
+    def __getitem__(self, key):
+        return self.lines()[key]
+
+    def __iter__(self):
+        return iter(self.lines())
+
+    def __eq__(self, other):
+        if isinstance(other, TCGuess):
+            return (self.layout is other.layout and self.p == other.p and self.T == other.T and
+                    np.array_equal(self.values, other.values))
+        if isinstance(other, list):
+            return self.lines() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return 'TCGuess p:{:g} T:{:g} {}'.format(self.p, self.T, ' '.join(self.names))
+
+    def __getstate__(self):
+        return (self.p, self.T, self.layout, self.values)
+
+    def __setstate__(self, state):
+        self.p, self.T, self.layout, self.values = state
+
+    def renamed(self, old, new):
+        """Get TCGuess with phase old renamed to new."""
+        return TCGuess(self.p, self.T, self.layout.renamed(old, new), self.values)
+
+
+def as_guess(ptguess):
+    """Convert list of ptguess lines to TCGuess. Other values are returned."""
+    if isinstance(ptguess, list):
+        return TCGuess.from_lines(ptguess)
+    return ptguess
+
+
+class GuessLibrary:
+    """Library of ptguesses of successful calculations.
+
+    Ptguesses are stored for each assemblage together with x and y
+    coordinates of calculation. Nearest solutions are searched using
+    KD-tree of each assemblage, so lookup is O(log n). New ptguess could be
+    interpolated from k nearest solutions of same assemblage either by
+    inverse distance weighting or by linear least-squares fit. Solution
+    added at already stored coordinates of assemblage replaces old one.
+
+    Args:
+        k (int): Number of nearest solutions used. Default 4.
+        method (str): Interpolation method 'idw' or 'linear'. Linear
+            interpolation needs at least three non-collinear solutions,
+            otherwise 'idw' is used. Default 'idw'.
+        power (float): Power of inverse distance weighting. Default 2.
+        scale (tuple): Scale of x and y coordinates used to calculate
+            distances, e.g. ranges of section. Default (1, 1).
+
+    Library of section (see `SectionBase.guesses`) stores solutions of all
+    invariant points also under key 'inv' and solutions of univariant lines
+    also under key ('uni', id), so seeds are found by `inv` and `uni`
+    using the same distance as interpolation.
+
+    Attributes:
+        points (dict): Dictionary of assemblage keys and lists of
+            (x, y, TCGuess) tuples.
+    """
+    def __init__(self, k=4, method='idw', power=2, scale=(1, 1)):
+        assert method in ['idw', 'linear'], 'Method must be idw or linear.'
+        self.k = k
+        self.method = method
+        self.power = power
+        self.scale = scale
+        self.points = {}
+        self._trees = {}
+        self._coords = {}
+
+    def __repr__(self):
+        return 'GuessLibrary ({}) with {} solutions of {} assemblages'.format(self.method, len(self), len(self.points))
+
+    def __len__(self):
+        return sum(len(pts) for pts in self.points.values())
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_trees'], state['_coords'] = {}, {}
+        return state
+
+    def update(self, other):
+        """Add all solutions of other library."""
+        for key, pts in other.points.items():
+            for x, y, ptguess in pts:
+                self.add(key, x, y, ptguess)
+
+    def add(self, key, x, y, ptguess):
+        """Add ptguess of successful calculation.
+
+        Args:
+            key (frozenset): Assemblage key
+            x (float): x coord
+            y (float): y coord
+            ptguess (TCGuess): ptguess of solution
+        """
+        if isinstance(ptguess, TCGuess):
+            x, y = float(x), float(y)
+            pts = self.points.setdefault(key, [])
+            coords = self._coords.get(key)
+            if coords is None:
+                coords = self._coords[key] = {(px, py): pos for pos, (px, py, _) in enumerate(pts)}
+            pos = coords.get((x, y))
+            if pos is None:
+                coords[(x, y)] = len(pts)
+                pts.append((x, y, ptguess))
+            else:
+                pts[pos] = (x, y, ptguess)
+
+    def add_results(self, key, x, y, results, used=slice(None)):
+        """Add ptguesses of all results.
+
+        Args:
+            key (frozenset): Assemblage key
+            x (numpy.ndarray): x coords of results
+            y (numpy.ndarray): y coords of results
+            results (TCResultSet): results
+            used (slice): slice of results to add. Default all.
+        """
+        for ix in range(len(results))[used]:
+            self.add(key, x[ix], y[ix], results.ptguess(ix))
+
+    def _index(self, key):
+        pts = self.points[key]
+        self._trees[key] = (cKDTree([(px / self.scale[0], py / self.scale[1]) for px, py, _ in pts]), len(pts))
+        return self._trees[key]
+
+    def build(self):
+        """Index all stored solutions.
+
+        Lookups in fully indexed library do not modify it, so it could be
+        shared by concurrent readers until next solution is added.
+        """
+        for key, pts in self.points.items():
+            if pts and self._trees.get(key, (None, 0))[1] < len(pts):
+                self._index(key)
+
+    def _query(self, key, x, y, k):
+        """Return list of (distance, position) of k nearest points of assemblage."""
+        pts = self.points.get(key, [])
+        tree, ntree = self._trees.get(key, (None, 0))
+        if len(pts) - ntree > max(32, np.sqrt(ntree)):
+            # rebuild tree when too many points are not indexed
+            tree, ntree = self._index(key)
+        found = []
+        if tree is not None:
+            d, ix = tree.query((x / self.scale[0], y / self.scale[1]), k=min(k, ntree))
+            found.extend(zip(np.atleast_1d(d), np.atleast_1d(ix)))
+        found.extend((np.hypot((px - x) / self.scale[0], (py - y) / self.scale[1]), pos)
+                     for pos, (px, py, _) in enumerate(pts[ntree:], ntree))
+        found.sort()
+        return found[:k]
+
+    def nearest(self, key, x, y):
+        """Return k nearest solutions of assemblage sharing layout of the nearest one.
+
+        Args:
+            key (frozenset): Assemblage key
+            x (float): x coord
+            y (float): y coord
+
+        Returns:
+            list: List of (distance, x, y, ptguess) sorted by distance
+        """
+        pts = self.points.get(key, [])
+        found = [(d,) + pts[pos] for d, pos in self._query(key, x, y, 2 * self.k)]
+        if found:
+            layout = found[0][3].layout
+            found = [f for f in found if f[3].layout is layout][:self.k]
+        return found
+
+    def closest(self, x, y, keys=None):
+        """Return ptguess of closest solution of any of assemblages.
+
+        Args:
+            x (float): x coord
+            y (float): y coord
+            keys (iterable): Assemblage keys to search. Default all.
+
+        Returns:
+            TCGuess: ptguess of closest solution or None if there is no
+            solution.
+        """
+        best = None
+        for key in (self.points if keys is None else keys):
+            found = self._query(key, x, y, 1)
+            if found and (best is None or found[0][0] < best[0]):
+                best = (found[0][0], self.points[key][found[0][1]][2])
+        return None if best is None else best[1]
+
+    def inv(self, x, y):
+        """Return ptguess of closest invariant point or None."""
+        return self.closest(x, y, ['inv'])
+
+    def uni(self, ids, x, y):
+        """Return ptguess of closest used vertex of univariant lines or None.
+
+        Args:
+            ids (iterable): Ids of univariant lines, e.g. bounding the field
+            x (float): x coord
+            y (float): y coord
+        """
+        return self.closest(x, y, [('uni', id) for id in ids])
+
+    def guess(self, key, x, y):
+        """Interpolate ptguess for given point.
+
+        Args:
+            key (frozenset): Assemblage key
+            x (float): x coord
+            y (float): y coord
+
+        Returns:
+            TCGuess: Interpolated ptguess or None when no solution of
+            assemblage is available.
+        """
+        near = self.nearest(key, x, y)
+        if not near:
+            return None
+        dist = np.array([n[0] for n in near])
+        vals = np.array([np.concatenate(([g.p, g.T], g.values)) for _, _, _, g in near])
+        est = None
+        if dist[0] == 0:
+            est = vals[0]
+        elif self.method == 'linear' and len(near) > 2:
+            A = np.array([(1, (px - x) / self.scale[0], (py - y) / self.scale[1]) for _, px, py, _ in near])
+            coef, _, rank, _ = np.linalg.lstsq(A, vals, rcond=None)
+            if rank == 3:
+                est = coef[0]
+        if est is None:
+            w = 1 / dist**self.power
+            est = w @ vals / w.sum()
+        # keep values within declared ranges or within 0-1 when neighbours are
+        layout = near[0][3].layout
+        values = est[2:]
+        xyz = [suffix.split() for kind, _, suffix in layout.items if kind == 'xyz']
+        for ix, rng in enumerate(xyz):
+            if rng[:1] == ['range'] and len(rng) == 3:
+                values[ix] = np.clip(values[ix], float(rng[1]), float(rng[2]))
+            elif vals[:, 2 + ix].min() >= 0 and vals[:, 2 + ix].max() <= 1:
+                values[ix] = np.clip(values[ix], 0, 1)
+        est = [float('{:.6g}'.format(v)) for v in est]
+        return TCGuess(est[0], est[1], layout, est[2:])
+
+
+class TCResult():
+    """Class to store single THERMOCALC result.
+
+    Values of all variables are stored in flat float array described by
+    shared TCSchema. Results obtained from lazily parsed TCResultSet keep
+    reference to it until stored.
+
+    Attributes:
+        T (float): Temperature
+        p (float): Pressure
+        variance (int): Variance
+        step (float): Step of calculation
+        ptguess (TCGuess): Structured ptguess
+        schema (TCSchema): Schema of values
+        values (numpy.ndarray): Flat array of values
+    """
+    __slots__ = ('T', 'p', 'variance', 'step', 'ptguess', 'schema', 'values', '_data')
+
+    def __init__(self, T, p, variance=0, step=1, data={}, ptguess=['']):
+        self.data = data
+        self.ptguess = as_guess(ptguess)
+        self.T = T
+        self.p = p
+        self.variance = variance
+        self.step = step
+
+    @classmethod
+    def from_values(cls, T, p, variance, step, schema, values, ptguess):
+        res = cls.__new__(cls)
+        res.T, res.p, res.variance, res.step, res.ptguess = T, p, variance, step, ptguess
+        res.schema, res.values, res._data = schema, values, None
+        return res
+
+    @classmethod
+    def from_block(cls, block, ptguess):
+        p, T, variance, step, keys, sections = split_icblock(block)
+        data = {phase: {} for phase in keys}
+        for name in icsections:
+            for phase, vals in parse_icsection(name, sections).items():
+                data[phase].update(vals)
+        return cls(T, p, variance=variance, step=step, data=data, ptguess=ptguess)
+
+    @property
+    def data(self):
+        """dict: Dictionary of phases and mappings of variables and values"""
+        if self._data is not None:
+            return self._data
+        return {phase: TCPhaseData(vix, self.values) for phase, vix in self.schema.index.items()}
+
+    @data.setter
+    def data(self, data):
+        if any(isinstance(vals, TCLazyPhaseData) for vals in data.values()):
+            self.schema, self.values, self._data = None, None, data
+        else:
+            index = TCResultSet.merge_index(OrderedDict(), [data])
+            values = np.full(TCResultSet.index_size(index), np.nan)
+            TCResultSet._fill(index, values[:, np.newaxis], 0, data)
+            self.schema, self.values, self._data = TCSchema.get(index), values, None
+
+    def compact(self):
+        """Parse lazy data and store them in flat array."""
+        if self._data is not None:
+            self.data = {phase: dict(vals) for phase, vals in self._data.items()}
+
+    def __getstate__(self):
+        self.compact()
+        return (self.T, self.p, self.variance, self.step, self.ptguess, self.schema, self.values)
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):  # compatibility with 2.2.1
+            self.__init__(state['T'], state['p'], variance=state['variance'], step=state['step'],
+                          data=state['data'], ptguess=state['ptguess'])
+        else:
+            self.T, self.p, self.variance, self.step, self.ptguess, self.schema, self.values = state
+            self.ptguess = as_guess(self.ptguess)
+            self._data = None
+
+    def __repr__(self):
+        return 'p:{:g} T:{:g} V:{} Phases: {}'.format(self.p, self.T, self.variance, ' '.join(self.phases))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self.phases:
+                raise IndexError('The index ({}) do not exists.'.format(key))
+            if self._data is not None:
+                return self._data[key]
+            return TCPhaseData(self.schema.index[key], self.values)
+        else:
+            raise TypeError('Invalid argument type.')
+
+    @property
+    def phases(self):
+        if self._data is not None:
+            return set(self._data.keys())
+        return set(self.schema.index.keys())
+
+    def rename_phase(self, old, new):
+        self.compact()
+        self.schema = self.schema.renamed(old, new)
+        self.ptguess = self.ptguess.renamed(old, new)
+
+
+class TCPhaseData(Mapping):
+    """Mapping of phase variables to values stored in shared array.
+
+    Values are taken from rows of array, so for single result they are
+    floats, while for TCResultSet they are arrays with values of variable
+    for all results. No data are copied.
+
+    Args:
+        index (dict): Dictionary of variable names and row indexes
+        values (numpy.ndarray): Array of values
+    """
+    __slots__ = ('index', 'values')
+
+    def __init__(self, index, values):
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, key):
+        return self.values[self.index[key]]
+
+    def __setitem__(self, key, value):
+        self.values[self.index[key]] = value
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TCLazyPhaseData(Mapping):
+    """Mapping of phase variables to values of lazily parsed TCResultSet.
+
+    Only section of THERMOCALC results containing requested variable is
+    parsed on first access.
+
+    Args:
+        results (TCResultSet): Result set holding data
+        phase (str): Name of phase
+        col (int or slice): Index of result(s)
+    """
+    __slots__ = ('results', 'phase', 'col')
+
+    def __init__(self, results, phase, col):
+        self.results = results
+        self.phase = phase
+        self.col = col
+
+    def __getitem__(self, key):
+        return self.results.column(self.phase, key)[self.col]
+
+    def __setitem__(self, key, value):
+        self.results.values[self.results.index[self.phase][key], self.col] = value
+
+    def __iter__(self):
+        return iter(self.results.index[self.phase])
+
+    def __len__(self):
+        return len(self.results.index[self.phase])
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TCResultSet:
+    """Class to store THERMOCALC results in columnar form.
+
+    All variables of all results are stored in single 2D array with
+    one row for each (phase, variable) pair and one column for each result.
+    Slicing returns TCResultSet sharing data with original one, indexing by
+    integer returns TCResult and indexing by phase name returns mapping of
+    variables to arrays of values, e.g. ``res['g']['mode']``.
+
+    When created lazily from THERMOCALC ic blocks, only heading values are
+    parsed and raw sections are kept. Section containing requested variable
+    is parsed for all results on first access and full data are assembled
+    when `index`, `values` or `mask` are needed.
+
+    Args:
+        results (list): List of TCResult
+
+    Attributes:
+        index (OrderedDict): Dictionary of phases and dictionaries of
+            variables and row indexes to values.
+        values (numpy.ndarray): 2D array of values
+        mask (numpy.ndarray): 2D bool array indicating phases present in
+            individual results.
+        x (numpy.ndarray): Array of temperatures
+        y (numpy.ndarray): Array of pressures
+        steps (numpy.ndarray): Array of steps
+        variances (numpy.ndarray): Array of variances
+        ptguesses (numpy.ndarray): Object array of TCGuess ptguesses
+    """
+    def __init__(self, results):
+        if results and all(res._data is None and res.schema is results[0].schema for res in results):
+            # results sharing schema are stacked directly
+            self._schema = results[0].schema
+            self._values = np.column_stack([res.values for res in results])
+            self._mask = np.ones((len(self._schema.index), len(results)), dtype=bool)
+            self._raw, self._keys, self._tables = None, None, {}
+        else:
+            self._set_data([res.data for res in results])
+        ptguesses = np.empty(len(results), dtype=object)
+        for ix, res in enumerate(results):
+            ptguesses[ix] = res.ptguess
+        self._set(np.array([res.T for res in results], dtype=float),
+                  np.array([res.p for res in results], dtype=float),
+                  np.array([res.step for res in results], dtype=float),
+                  np.array([res.variance for res in results], dtype=int),
+                  ptguesses)
+
+    @classmethod
+    def from_blocks(cls, blocks, ptguesses, lazy=False, table=None):
+        """Create TCResultSet from THERMOCALC ic blocks.
+
+        Args:
+            blocks (list): List of ic blocks
+            ptguesses (list): List of corresponding ptguesses
+            lazy (bool): When True, data sections are parsed on first access.
+                Default False.
+            table (tuple): Table (names, rows) of csv output for the same
+                results. When provided and consistent with ic blocks,
+                variables found in table are not parsed from ic blocks.
+                Default None.
+        """
+        if not lazy and table is None:
+            return cls([TCResult.from_block(block, ptguess) for block, ptguess in zip(blocks, ptguesses)])
+        rs = cls.__new__(cls)
+        heads = [split_icblock(block) for block in blocks]
+        rs._raw = np.empty(len(heads), dtype=object)
+        rs._keys = np.empty(len(heads), dtype=object)
+        rs._tables = {}
+        for ix, (p, T, variance, step, keys, sections) in enumerate(heads):
+            rs._raw[ix] = sections
+            rs._keys[ix] = keys
+        arr = np.empty(len(ptguesses), dtype=object)
+        for ix, ptguess in enumerate(ptguesses):
+            arr[ix] = ptguess
+        rs._set(np.array([head[1] for head in heads], dtype=float),
+                np.array([head[0] for head in heads], dtype=float),
+                np.array([head[3] for head in heads], dtype=float),
+                np.array([head[2] for head in heads], dtype=int),
+                arr)
+        if table is not None and not csv_consistent(*table, [(head[0], head[1], head[4]) for head in heads]):
+            # csv does not match ic, e.g. left from other calculation
+            table = None
+        if table is not None:
+            names, rows = table
+            headings, index = csv_index(names)
+            rs._tables['csv'] = index, np.array(rows, dtype=float).reshape(len(rows), len(names)).T
+        if not lazy:
+            rs._materialize()
+        return rs
+
+    @classmethod
+    def from_table(cls, names, rows, ptguesses):
+        """Create TCResultSet from table of THERMOCALC csv output.
+
+        Args:
+            names (list): List of column names
+            rows (list): List of lists of values
+            ptguesses (list): List of corresponding ptguesses
+        """
+        headings, index = csv_index(names)
+        values = np.array(rows, dtype=float).reshape(len(rows), len(names)).T
+        rs = cls.__new__(cls)
+        rs._tables = {'csv': (index, values)}
+        rs._raw = np.empty(len(rows), dtype=object)
+        rs._keys = np.empty(len(rows), dtype=object)
+        for ix in range(len(rows)):
+            rs._raw[ix] = {}
+            rs._keys[ix] = [phase for phase, vix in index.items()
+                            if not np.isnan(values[list(vix.values()), ix]).all()]
+        nan = np.full(len(rows), np.nan)
+        arr = np.empty(len(ptguesses), dtype=object)
+        for ix, ptguess in enumerate(ptguesses):
+            arr[ix] = ptguess
+        rs._set(values[headings['T']] if 'T' in headings else nan,
+                values[headings['p']] if 'p' in headings else nan,
+                values[headings['step']] if 'step' in headings else np.zeros(len(rows)),
+                values[headings['variance']].astype(int) if 'variance' in headings else np.zeros(len(rows), dtype=int),
+                arr)
+        rs._materialize()
+        return rs
+
+    def _set(self, x, y, steps, variances, ptguesses):
+        self.x = x
+        self.y = y
+        self.steps = steps
+        self.variances = variances
+        self.ptguesses = ptguesses
+
+    def _set_data(self, datas, index=None):
+        if index is None:
+            index = self.merge_index(OrderedDict(), datas)
+        values = np.full((self.index_size(index), len(datas)), np.nan)
+        mask = np.zeros((len(index), len(datas)), dtype=bool)
+        for col, data in enumerate(datas):
+            self._fill(index, values, col, data, mask)
+        self._schema, self._values, self._mask = TCSchema.get(index), values, mask
+        self._raw, self._keys, self._tables = None, None, {}
+
+    @staticmethod
+    def merge_index(index, datas):
+        """Add variables of data missing in index. Return index"""
+        for data in datas:
+            for phase, vals in data.items():
+                if phase not in index:
+                    index[phase] = OrderedDict()
+                vix = index[phase]
+                for var in vals:
+                    if var not in vix:
+                        vix[var] = None
+        row = 0
+        for vix in index.values():
+            for var in vix:
+                vix[var] = row
+                row += 1
+        return index
+
+    @staticmethod
+    def index_size(index):
+        return sum(len(vix) for vix in index.values())
+
+    @staticmethod
+    def _fill(index, values, col, data, mask=None):
+        for pix, (phase, vix) in enumerate(index.items()):
+            if phase in data:
+                if mask is not None:
+                    mask[pix, col] = True
+                for var, val in data[phase].items():
+                    values[vix[var], col] = val
+
+    @property
+    def lazy(self):
+        """bool: True when not all data are parsed"""
+        return self._raw is not None
+
+    def _materialize(self):
+        if self.lazy:
+            index = OrderedDict()
+            for keys in self._keys:
+                for phase in keys:
+                    if phase not in index:
+                        index[phase] = OrderedDict()
+            tables = [self._table(name) for name in icsections]
+            if 'csv' in self._tables:
+                tables.insert(0, self._tables['csv'])
+            for tindex, _ in tables:
+                for phase, vix in tindex.items():
+                    index.setdefault(phase, OrderedDict()).update((var, None) for var in vix)
+            index = self.merge_index(index, [])
+            values = np.full((self.index_size(index), len(self)), np.nan)
+            for tindex, tvalues in tables:
+                for phase, vix in tindex.items():
+                    for var, row in vix.items():
+                        dest = values[index[phase][var]]
+                        np.copyto(dest, tvalues[row], where=~np.isnan(tvalues[row]))
+            mask = np.array([[phase in keys for keys in self._keys] for phase in index], dtype=bool).reshape(len(index), len(self))
+            self._schema, self._values, self._mask = TCSchema.get(index), values, mask
+            self._raw, self._keys, self._tables = None, None, {}
+
+    def _table(self, name):
+        """Parse section name of all results. Return index and values."""
+        if name not in self._tables:
+            datas = [parse_icsection(name, sections) if sections else {} for sections in self._raw]
+            index = self.merge_index(OrderedDict(), datas)
+            values = np.full((self.index_size(index), len(datas)), np.nan)
+            for col, data in enumerate(datas):
+                self._fill(index, values, col, data)
+            self._tables[name] = index, values
+        return self._tables[name]
+
+    @staticmethod
+    def _sections_of(phase, var):
+        """Return names of sections possibly holding variable of phase."""
+        if phase == 'bulk':
+            return ('bulk',)
+        elif phase == 'sys':
+            return ('td',)
+        elif '(' in phase:
+            return ('mems',)
+        elif var in ['mode', 'factor']:
+            return (var,)
+        elif var == 'mu':
+            return ('pems', 'td')
+        else:
+            return ('td', 'rbi', 'sf', 'ax')
+
+    def column(self, phase, var):
+        """Get array of values of variable for all results.
+
+        Args:
+            phase (str): Name of phase
+            var (str): Name of variable
+        """
+        if self.lazy:
+            names = self._sections_of(phase, var)
+            if 'csv' in self._tables:
+                names = ('csv',) + names
+            for name in names:
+                index, values = self._table(name)
+                if phase in index and var in index[phase]:
+                    return values[index[phase][var]]
+        return self.values[self.index[phase][var]]
+
+    @property
+    def schema(self):
+        self._materialize()
+        return self._schema
+
+    @property
+    def index(self):
+        return self.schema.index
+
+    @property
+    def values(self):
+        self._materialize()
+        return self._values
+
+    @property
+    def mask(self):
+        self._materialize()
+        return self._mask
+
+    def _subset(self, key):
+        rs = TCResultSet.__new__(TCResultSet)
+        if self.lazy:
+            rs._raw, rs._keys = self._raw[key], self._keys[key]
+            rs._tables = {name: (index, values[:, key]) for name, (index, values) in self._tables.items()}
+        else:
+            rs._schema, rs._values, rs._mask = self._schema, self._values[:, key], self._mask[:, key]
+            rs._raw, rs._keys, rs._tables = None, None, {}
+        rs._set(self.x[key], self.y[key], self.steps[key], self.variances[key], self.ptguesses[key])
+        return rs
+
+    def __getstate__(self):
+        self._materialize()
+        return self.__dict__
+
+    def __setstate__(self, state):
+        if 'results' in state:  # compatibility with 2.2.1
+            self.__init__(state['results'])
+        else:
+            self.__dict__.update(state)
+
+    def __repr__(self):
+        return '{} results'.format(len(self))
+
+    def __len__(self):
+        return len(self.x)
+
+    def __iter__(self):
+        for ix in range(len(self)):
+            yield self[ix]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if self.lazy:
+                if key not in self.phases:
+                    raise IndexError('The index ({}) do not exists.'.format(key))
+                return TCLazyPhaseData(self, key, slice(None))
+            if key not in self._schema.index:
+                raise IndexError('The index ({}) do not exists.'.format(key))
+            return TCPhaseData(self._schema.index[key], self._values)
+        elif isinstance(key, (int, np.integer)):
+            if key < 0 : #Handle negative indices
+                key += len(self)
+            if key < 0 or key >= len(self):
+                raise IndexError('The index ({}) is out of range.'.format(key))
+            if self.lazy:
+                data = {phase: TCLazyPhaseData(self, phase, key) for phase in self._keys[key]}
+                return TCResult(float(self.x[key]), float(self.y[key]),
+                                variance=int(self.variances[key]), step=float(self.steps[key]),
+                                data=data, ptguess=self.ptguesses[key])
+            schema = self._schema
+            if not self._mask[:, key].all():
+                schema = schema.subset({phase for phase, present in zip(schema.index, self._mask[:, key]) if present})
+            return TCResult.from_values(float(self.x[key]), float(self.y[key]),
+                                        int(self.variances[key]), float(self.steps[key]),
+                                        schema, self._values[:, key], self.ptguesses[key])
+        elif isinstance(key, (slice, list, np.ndarray)):
+            return self._subset(key)
+        else:
+            raise TypeError('Invalid argument type.')
+
+    @property
+    def results(self):
+        """list: List of TCResult"""
+        return list(self)
+
+    @property
+    def variance(self):
+        return int(self.variances[0])
+
+    @property
+    def phases(self):
+        if self.lazy:
+            return set(self._keys[0])
+        return {phase for phase, present in zip(self._schema.index, self._mask[:, 0]) if present}
+
+    def ptguess(self, ix):
+        try:
+            return self.ptguesses[ix]
+        except Exception as e:
+            return None
+
+    def rename_phase(self, old, new):
+        self._schema = self.schema.renamed(old, new)
+        for ix, ptguess in enumerate(self.ptguesses):
+            self.ptguesses[ix] = ptguess.renamed(old, new)
+
+    def insert(self, ix, result):
+        index = self.merge_index(OrderedDict((phase, OrderedDict(vix)) for phase, vix in self.index.items()), [result.data])
+        values = np.full((self.index_size(index), len(self)), np.nan)
+        for phase, vix in self._schema.index.items():
+            for var, row in vix.items():
+                values[index[phase][var]] = self._values[row]
+        mask = np.zeros((len(index), len(self)), dtype=bool)
+        mask[:len(self._schema.index)] = self._mask
+        col = np.full(self.index_size(index), np.nan)
+        colmask = np.zeros(len(index), dtype=bool)
+        self._fill(index, col[:, np.newaxis], 0, result.data, colmask[:, np.newaxis])
+        self._schema = TCSchema.get(index)
+        self._values = np.insert(values, ix, col, axis=1)
+        self._mask = np.insert(mask, ix, colmask, axis=1)
+        ptguesses = np.empty(len(self) + 1, dtype=object)
+        ptguesses[:ix], ptguesses[ix], ptguesses[ix + 1:] = self.ptguesses[:ix], result.ptguess, self.ptguesses[ix:]
+        self._set(np.insert(self.x, ix, result.T), np.insert(self.y, ix, result.p),
+                  np.insert(self.steps, ix, result.step), np.insert(self.variances, ix, result.variance),
+                  ptguesses)
+
+
+class Dogmin:
+    def __init__(self, **kwargs):
+        assert 'output' in kwargs, 'Dogmin output must be provided'
+        assert 'resic' in kwargs, 'ic file content must be provided'
+        self.id = kwargs.get('id', 0)
+        self._output = kwargs.get('output')
+        self.resic = kwargs.get('resic')
+        self.x = kwargs.get('x', None)
+        self.y = kwargs.get('y', None)
+
+    @property
+    def output(self):
+        return self._output.split('##########################################################\n')[-1]
+
+    @property
+    def phases(self):
+        return set(self.output.split('phases: ')[1].split('(gmin')[0].split())
 
     @property
     def out(self):
@@ -1534,6 +3623,57 @@ class SectionBase:
                           (self.xrange[0], self.yrange[0])])]
         return bnd, next(polygonize(bnd))
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # library is derived from calculations, _guesses is legacy
+        state.pop('_library', None)
+        state.pop('_guesses', None)
+        return state
+
+    def _guess_sources(self):
+        """Return calculations used to create library of ptguesses."""
+        invs = [(id, inv, inv.results, inv.x, inv.y) for id, inv in self.invpoints.items() if not inv.manual]
+        unis = [(id, uni, uni.results, uni._x, uni._y, uni.used) for id, uni in self.unilines.items() if not uni.manual]
+        return invs, unis
+
+    @staticmethod
+    def _same_sources(old, new):
+        """Check that calculations are the same objects with same used part."""
+        for olds, news in zip(old, new):
+            if len(olds) != len(news):
+                return False
+            for o, n in zip(olds, news):
+                # ids, used slices compared by value, calculations by identity
+                if o[0] != n[0] or o[5:] != n[5:] or any(a is not b for a, b in zip(o[1:5], n[1:5])):
+                    return False
+        return True
+
+    @property
+    def guesses(self):
+        """GuessLibrary: Library of ptguesses of calculated invariant points
+        and used parts of univariant lines.
+
+        Solutions are stored by assemblage and also under keys 'inv' and
+        ('uni', id) used to find seeds (see `GuessLibrary.inv` and
+        `GuessLibrary.uni`).
+
+        Library is derived from current calculations. It is created again
+        whenever invariant points or univariant lines are added, removed,
+        recalculated or trimmed, so it never contains removed solutions.
+        """
+        sources = self._guess_sources()
+        cached = getattr(self, '_library', None)
+        if cached is None or not self._same_sources(cached[0], sources):
+            library = GuessLibrary(scale=(self.xrange[1] - self.xrange[0], self.yrange[1] - self.yrange[0]))
+            for id, inv, results, x, y in sources[0]:
+                library.add_results(frozenset(inv.phases), x, y, results)
+                library.add_results('inv', x, y, results)
+            for id, uni, results, x, y, used in sources[1]:
+                library.add_results(frozenset(uni.phases), x, y, results, used)
+                library.add_results(('uni', id), x, y, results, used)
+            self._library = sources, library
+        return self._library[1]
+
     def add_inv(self, id, inv):
         if inv.manual:
             inv.results = None
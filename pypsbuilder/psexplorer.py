@@ -28,11 +28,15 @@ try:
 except ImportError:
     import pickle
 import gzip
+import hashlib
 import ast
 import time
 import re
+import heapq
+import itertools
 from pathlib import Path
 from collections import OrderedDict
+from concurrent.futures import as_completed
 import warnings
 
 import numpy as np
@@ -43,16 +47,18 @@ from matplotlib.colorbar import ColorbarBase
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from matplotlib import ticker
 
-from shapely.geometry import MultiPoint, Point
+from shapely.geometry import MultiPoint, Point, box
 from descartes import PolygonPatch
 from scipy.interpolate import Rbf, interp1d
 from scipy.linalg import LinAlgWarning
 from scipy.interpolate import griddata, interp2d
-from tqdm import tqdm, trange
+from scipy.spatial import cKDTree
+from tqdm import tqdm
 
 from .psclasses import TCAPI
 from .psclasses import InvPoint, UniLine, PTsection, TXsection, PXsection
 from .psclasses import polymorphs
+from .psclasses import TCWorkerPool, GuessLibrary
 
 
 class PS:
@@ -66,6 +72,10 @@ class PS:
             tolerance (float): if not None, simplification tolerance. Default None
             origwd (bool): If True TCAPI uses original stored working directory
                 Default False.
+            guess_k (int): Number of nearest solutions used to interpolate
+                ptguesses. Default 4.
+            guess_method (str): Method of ptguess interpolation 'idw' or
+                'linear'. Default 'idw'.
         """
         projfiles = [Path(projfile).resolve() for projfile in args if Path(projfile).exists()]
         assert len(projfiles) > 0, 'You have to provide existing filename.'
@@ -73,6 +83,8 @@ class PS:
         # parse kwargs
         tolerance = kwargs.get('tolerance', None)
         origwd = kwargs.get('origwd', False)
+        self.guess_k = kwargs.get('guess_k', 4)
+        self.guess_method = kwargs.get('guess_method', 'idw')
         # individual based (keys are 0, 1...)
         self.projfiles = {}
         self.sections = {}
@@ -80,6 +92,8 @@ class PS:
         self._shapes = {}
         self.unilists = {}
         self._variance = {}
+        self._guesses = {}
+        self._guessed = {}
         # common
         self.tolerance = tolerance
         self.tc = None
@@ -146,6 +160,11 @@ class PS:
             # already gridded?
             if 'grid' in data:
                 self.grids[ix] = data['grid']
+            # library of ptguesses stored with grid
+            if 'guesses' in data:
+                self._guesses[ix] = data['guesses']
+                if ix in self.grids:
+                    self._guessed[ix] = self.grids[ix]
         # union _shapes
         self.shapes = {}
         for shapes in self._shapes.values():
@@ -190,7 +209,8 @@ class PS:
     @property
     def gridxstep(self):
         if self.gridded:
-            v = [grid.xstep for grid in self.grids.values()]
+            # coarse step of adaptive grids, points of finest level are sparse
+            v = [grid.xstep * 2**getattr(grid, 'levels', 0) for grid in self.grids.values()]
         else:
             v = [(self.xrange[1] - self.xrange[0]) / 50]
         return sum(v) / len(v)
@@ -198,7 +218,8 @@ class PS:
     @property
     def gridystep(self):
         if self.gridded:
-            v = [grid.ystep for grid in self.grids.values()]
+            # coarse step of adaptive grids, points of finest level are sparse
+            v = [grid.ystep * 2**getattr(grid, 'levels', 0) for grid in self.grids.values()]
         else:
             v = [(self.yrange[1] - self.yrange[0]) / 50]
         return sum(v) / len(v)
@@ -303,21 +324,813 @@ class PS:
                     data = pickle.load(stream)
                 data['variance'] = self._variance[ix]
                 data['grid'] = self.grids[ix]
+                data['guesses'] = self.guess_library(ix)
                 # do save
                 with gzip.open(str(projfile), 'wb') as stream:
                     pickle.dump(data, stream)
         else:
             print('Not yet gridded...')
 
+    def guess_library(self, ix):
+        """Return GuessLibrary of pseudosection updated with grid solutions.
+
+        Library is created from calculations of section or loaded from
+        project, kept by explorer and saved with grid. Points are added when
+        they are solved, so solutions of grid which were not calculated
+        into library are added only once, when grid masks are created.
+
+        Args:
+            ix (int): Index of pseudosection
+        """
+        library = self._guesses.get(ix)
+        if library is None:
+            # section library is derived from calculations, so use copy
+            section = self.sections[ix].guesses
+            library = GuessLibrary(scale=section.scale)
+            library.update(section)
+            self._guesses[ix] = library
+        library.k, library.method = self.guess_k, self.guess_method
+        grid = self.grids.get(ix)
+        if grid is not None and self._guessed.get(ix) is not grid:
+            for key, mask in grid.masks.items():
+                for r, c in zip(*np.nonzero(mask & (grid.status == 1))):
+                    library.add(key, grid.xg[r, c], grid.yg[r, c], grid.gridcalcs[r, c].ptguess)
+            self._guessed[ix] = grid
+        return library
+
+    def checkpoint_file(self, ix):
+        """Return path of checkpoint file of partially calculated grid.
+
+        Args:
+            ix (int): Index of pseudosection
+        """
+        projfile = self.projfiles[ix]
+        return projfile.with_name(projfile.name + '.grid')
+
+    def fingerprint(self, ix):
+        """Return hash of divariant fields of pseudosection.
+
+        Hash is calculated from range of section and from keys, shapes and
+        bounding univariant lines of all fields, so it changes whenever
+        topology of pseudosection is edited.
+
+        Args:
+            ix (int): Index of pseudosection
+        """
+        ps = self.sections[ix]
+        h = hashlib.sha256(repr((tuple(ps.xrange), tuple(ps.yrange))).encode())
+        for key in sorted(self._shapes[ix], key=sorted):
+            h.update(' '.join(sorted(key)).encode())
+            h.update(self._shapes[ix][key].wkb)
+            h.update(repr(sorted(self.unilists[ix].get(key, []))).encode())
+        return h.hexdigest()
+
+    def save_checkpoint(self, ix, grid):
+        """Save partially calculated grid of pseudosection to checkpoint file.
+
+        Checkpoint stores also `fingerprint` of divariant fields.
+
+        Args:
+            ix (int): Index of pseudosection
+            grid (GridData): Partially calculated grid
+        """
+        ckpfile = self.checkpoint_file(ix)
+        tmpfile = ckpfile.with_name(ckpfile.name + '.tmp')
+        with gzip.open(str(tmpfile), 'wb') as stream:
+            pickle.dump({'grid': grid, 'time': time.time(), 'fingerprint': self.fingerprint(ix)}, stream)
+        # replace old checkpoint only when new one is complete
+        os.replace(str(tmpfile), str(ckpfile))
+
+    def load_checkpoint(self, ix):
+        """Return GridData stored in checkpoint file or None.
+
+        Checkpoint is rejected when it was saved for different divariant
+        fields, e.g. when project was edited meanwhile.
+
+        Args:
+            ix (int): Index of pseudosection
+        """
+        ckpfile = self.checkpoint_file(ix)
+        if ckpfile.exists():
+            try:
+                with gzip.open(str(ckpfile), 'rb') as stream:
+                    data = pickle.load(stream)
+                grid = data['grid']
+            except (OSError, EOFError, pickle.UnpicklingError, KeyError):
+                print('Checkpoint file {} is corrupted...'.format(ckpfile))
+            else:
+                if data.get('fingerprint') == self.fingerprint(ix):
+                    return grid
+                print('Checkpoint file {} was saved for different divariant fields...'.format(ckpfile))
+        return None
+
+    def remove_checkpoints(self):
+        """Remove checkpoint files of all pseudosections."""
+        for ix in self.projfiles:
+            ckpfile = self.checkpoint_file(ix)
+            if ckpfile.exists():
+                ckpfile.unlink()
+
+    def _calculate_grid(self, ix, nx, ny, jobs=None, resume=False, checkpoint=300, columns=False, **kwargs):
+        """Calculate grid of pseudosection.
+
+        Before any grid point calculation, ptguesses are interpolated from
+        already calculated points of same assemblage (see `GuessLibrary`) or,
+        when there are none, updated from nearest invariant point. If
+        calculation fails, nearest solution from univariant line is used to
+        update ptguesses.
+
+        By default, each divariant field is calculated by wavefront growing
+        from its best known solution (see `_grid_wavefront`). Point with most
+        solved neighbours is calculated next and failed points are tried
+        again with ptguesses of neighbours converged later. Fixed order
+        groups grid points by divariant fields and each field is walked from
+        its best known solution in serpentine or nearest-neighbour order (see
+        `_schedule`), so ptguesses are interpolated from previously converged
+        neighbours. Points still failed, e.g. on edges of tiles or refinement
+        levels, are left to `fix_solutions`.
+
+        Partially calculated grid is regularly saved to checkpoint file next
+        to project file (see `checkpoint_file`), so interrupted calculation
+        could be continued with resume option.
+
+        When levels is given, adaptive grid (see `QuadGrid`) with nx x ny
+        coarse cells is calculated. Cells crossing boundaries of divariant
+        fields or with large variation of chosen variables are recursively
+        refined, until maximum level or budget of points is reached.
+
+        When jobs is given, grid is split into tiles calculated concurrently
+        by isolated THERMOCALC workers, each using its own scriptfile and
+        bulk composition (see `grid_points`).
+
+        For sections with compositional axis, fixed orders walk rows (or
+        columns), so bulk composition is changed once per row. Wavefront
+        changes bulk between most points, but it is written to scriptfile
+        together with ptguesses, so no additional update is needed.
+
+        Args:
+            ix (int): Index of pseudosection
+            nx (int): Number of grid points (cells of adaptive grid) along
+                x direction of all sections
+            ny (int): Number of grid points (cells of adaptive grid) along
+                y direction of all sections
+            jobs (int): Number of concurrent THERMOCALC workers. When None,
+                grid is calculated serially. Default None.
+            resume (bool): When True, calculation continues from checkpoint
+                file and already calculated points are not recalculated.
+                Default False.
+            checkpoint (float): Interval in seconds between checkpoints of
+                partial grid. When None, no checkpoints are written.
+                Default 300.
+            columns (bool): When True, fixed orders walk points column by
+                column, otherwise row by row. Wavefront order ignores it.
+                Default False.
+            levels (int): Number of refinement levels of adaptive grid. When
+                zero, regular grid is calculated. Default 0.
+            variables (list): List of (phase, expr) tuples used to
+                refine adaptive grid. Default [].
+            tol (float): Tolerance of variation of variables within cell
+                relative to their range. Default 0.1.
+            budget (int): Maximum number of calculated points of adaptive
+                grid. Default None.
+            order (str): Order in which points of divariant field are
+                calculated. 'wavefront', 'serpentine', 'nearest' or 'raster'.
+                Default 'wavefront'.
+
+        Returns:
+            GridData: Calculated grid
+        """
+        order = kwargs.get('order', 'wavefront')
+        levels = kwargs.get('levels', 0)
+        variables = kwargs.get('variables', [])
+        tol = kwargs.get('tol', 0.1)
+        budget = kwargs.get('budget', None)
+        ps = self.sections[ix]
+        axr, ayr = self.xrange, self.yrange
+        paxr, payr = ps.xrange, ps.yrange
+        nx = round(nx*(paxr[1] - paxr[0])/(axr[1] - axr[0]))
+        ny = round(ny*(payr[1] - payr[0])/(ayr[1] - ayr[0]))
+        if levels > 0:
+            grid = QuadGrid(ps, nx=nx, ny=ny, levels=levels)
+        else:
+            grid = GridData(ps, nx=nx, ny=ny)
+        if resume:
+            saved = self.load_checkpoint(ix)
+            if saved is None:
+                print('No usable checkpoint found. Gridding from start.')
+            elif type(saved) is type(grid) and np.array_equal(saved.xspace, grid.xspace) and np.array_equal(saved.yspace, grid.yspace):
+                grid = saved
+                print('Resuming from checkpoint. {} points already calculated.'.format(np.count_nonzero(~np.isnan(grid.status))))
+            else:
+                print('Checkpoint grid differs. Gridding from start.')
+        engine = self.guess_library(ix)
+        # solutions are added to library when calculated
+        self._guessed[ix] = grid
+        unilists = self.unilists[ix]
+        for r, c in zip(*np.nonzero(grid.status == 1)):
+            k = self.identify(grid.xg[r, c], grid.yg[r, c])
+            if k is not None:
+                engine.add(k, grid.xg[r, c], grid.yg[r, c], grid.gridcalcs[r, c].ptguess)
+        outside = set()
+        boundary = {}
+        # workers are reused by all generations of adaptive grid
+        pool = TCWorkerPool(self.tc, jobs=jobs) if jobs is not None and jobs > 1 else None
+        try:
+            with tqdm(desc='Gridding {}/{}'.format(ix + 1, len(self.sections)), total=0) as pbar:
+                while True:
+                    # status is NaN until point is calculated
+                    points = []
+                    for r, c in sorted(grid.pending(), key=(lambda rc: rc[::-1]) if columns else None):
+                        if (r, c) not in outside:
+                            x, y = grid.xg[r, c], grid.yg[r, c]
+                            k = self.identify(x, y)
+                            if k is not None:
+                                points.append((r, c, k, x, y))
+                            else:
+                                outside.add((r, c))
+                    points = self._schedule(points, engine, order=order, columns=columns)
+                    pbar.total += len(points)
+                    pbar.refresh()
+                    wavefront = order == 'wavefront'
+                    if checkpoint is not None:
+                        self.grid_points(grid, points, engine, unilists, pbar=pbar, wavefront=wavefront, pool=pool,
+                                         checkpoint=lambda: self.save_checkpoint(ix, grid), interval=checkpoint)
+                        self.save_checkpoint(ix, grid)
+                    else:
+                        self.grid_points(grid, points, engine, unilists, pbar=pbar, wavefront=wavefront, pool=pool)
+                    if not isinstance(grid, QuadGrid):
+                        break
+                    if not self._refine_grid(grid, variables, tol, budget, outside, boundary):
+                        break
+        finally:
+            if pool is not None:
+                pool.close()
+        return grid
+
+    def _walk_start(self, key, xy, library, shared=None):
+        """Return index of point closest to the best known solution of field.
+
+        Solutions of field are searched in library and then in shared
+        library. When there are none, invariant points are used.
+
+        Args:
+            key (frozenset): Key of divariant field
+            xy (list): List of x, y coordinates of points
+            library (GuessLibrary): Library of calculated solutions
+            shared (GuessLibrary): Library used read-only when library has
+                no solution of field. Default None.
+        """
+        libraries = [library] if shared is None else [library, shared]
+        anchors = next((lib.points[key] for lib in libraries if lib.points.get(key)), None)
+        if anchors is None:
+            anchors = next((lib.points['inv'] for lib in libraries if lib.points.get('inv')), [])
+        if anchors:
+            scale = np.array(library.scale, dtype=float)
+            anchors = np.array([pt[:2] for pt in anchors]) / scale
+            return int(np.argmin(cKDTree(anchors).query(np.asarray(xy, dtype=float) / scale)[0]))
+        return 0
+
+    def _schedule(self, points, library, order='wavefront', columns=False):
+        """Return grid points ordered for continuous propagation of ptguesses.
+
+        Points are grouped by divariant field and each field is walked from
+        the point closest to the best known solution, i.e. calculated
+        solution of the same assemblage or, when there is none, invariant
+        point. So each calculated point follows already converged neighbour.
+
+        Args:
+            points (list): List of (r, c, key, x, y) of grid points
+            library (GuessLibrary): Library of calculated solutions
+            order (str): 'wavefront' only groups points by field, actual
+                order is decided during calculation (see `_grid_wavefront`).
+                'serpentine' walks rows (columns) in alternating directions,
+                'nearest' always continues to the nearest not yet visited
+                point and 'raster' keeps order of points without grouping.
+                Default 'wavefront'.
+            columns (bool): When True, serpentine walks columns instead of
+                rows. Default False.
+
+        Returns:
+            list: Ordered list of points
+        """
+        assert order in ['wavefront', 'serpentine', 'nearest', 'raster'], 'Order must be wavefront, serpentine, nearest or raster.'
+        if order == 'raster':
+            return points
+        fields = OrderedDict()
+        for pt in points:
+            fields.setdefault(pt[2], []).append(pt)
+        ordered = []
+        for key, pts in fields.items():
+            if order == 'wavefront':
+                # order is decided during calculation
+                ordered.extend(pts)
+                continue
+            rc = np.array([pt[:2] for pt in pts])
+            start = self._walk_start(key, [pt[3:] for pt in pts], library)
+            if order == 'serpentine':
+                lines, steps = (rc[:, 1], rc[:, 0]) if columns else (rc[:, 0], rc[:, 1])
+                lvals = np.unique(lines)
+                if lines[start] - lvals[0] > lvals[-1] - lines[start]:
+                    lvals = lvals[::-1]
+                # first line starts at the end closer to start point
+                forward = np.abs(steps[start] - steps[lines == lvals[0]].min()) <= np.abs(steps[lines == lvals[0]].max() - steps[start])
+                walk = []
+                for lval in lvals:
+                    ix = np.flatnonzero(lines == lval)
+                    ix = ix[np.argsort(steps[ix], kind='stable')]
+                    walk.extend(ix if forward else ix[::-1])
+                    forward = not forward
+            else:
+                left = np.ones(len(pts), dtype=bool)
+                walk = [start]
+                left[start] = False
+                for _ in range(len(pts) - 1):
+                    d = np.sum((rc - rc[walk[-1]])**2, axis=1).astype(float)
+                    d[~left] = np.inf
+                    nxt = int(np.argmin(d))
+                    walk.append(nxt)
+                    left[nxt] = False
+            ordered.extend(pts[ix] for ix in walk)
+        return ordered
+
+    def _refine_grid(self, grid, variables, tol, budget, outside, boundary):
+        """Split cells of QuadGrid which need refinement.
+
+        Cell is split when it crosses boundary of divariant field or when
+        range of any of variables on calculated corners and center of cell
+        exceeds tol fraction of variable range on whole grid. Cells with
+        higher variation and coarser cells are split first, until number of
+        calculated points would exceed budget.
+
+        Args:
+            grid (QuadGrid): Grid to refine
+            variables (list): List of (phase, expr) tuples
+            tol (float): Relative tolerance of variables variation
+            budget (int): Maximum number of calculated points or None
+            outside (set): Set of row, column tuples of points outside of
+                divariant fields
+            boundary (dict): Cache of cells crossing field boundary
+
+        Returns:
+            int: Number of split cells
+        """
+        values = []
+        for phase, expr in variables:
+            vals = np.full(grid.xg.shape, np.nan)
+            for r, c in zip(*np.nonzero(grid.status == 1)):
+                res = grid.gridcalcs[r, c]
+                if phase in res.phases:
+                    vals[r, c] = eval_expr(expr, res[phase])
+            if np.any(np.isfinite(vals)):
+                vrange = np.nanmax(vals) - np.nanmin(vals)
+                if vrange > 0:
+                    values.append(vals / vrange)
+        candidates = []
+        for cell in grid.cells:
+            if cell[0] >= grid.levels:
+                continue
+            if cell not in boundary:
+                xmin, ymin, xmax, ymax = grid.bounds(cell)
+                cellbox = box(xmin, ymin, xmax, ymax)
+                k = self.identify((xmin + xmax) / 2, (ymin + ymax) / 2)
+                if k is not None:
+                    boundary[cell] = not self.shapes[k].contains(cellbox)
+                else:
+                    boundary[cell] = any(shape.intersects(cellbox) for shape in self.shapes.values())
+            score = 1 if boundary[cell] else 0
+            if values:
+                nodes = grid.corners(cell)
+                (r0, c0), (r1, c1) = nodes[0], nodes[-1]
+                nodes.append(((r0 + r1) // 2, (c0 + c1) // 2))
+                rows, cols = zip(*nodes)
+                for vals in values:
+                    v = vals[rows, cols]
+                    v = v[np.isfinite(v)]
+                    if len(v) > 1:
+                        score = max(score, (v.max() - v.min()) / tol)
+            if score >= 1:
+                candidates.append((-score, cell[0], cell))
+        candidates.sort()
+        if budget is not None:
+            left = budget - np.count_nonzero(~np.isnan(grid.status))
+        scheduled = set()
+        nsplit = 0
+        for _, _, cell in candidates:
+            new = {node for child in grid.children(cell) for node in grid.corners(child)
+                   if np.isnan(grid.status[node]) and node not in outside and node not in scheduled}
+            if budget is not None:
+                if len(new) > left:
+                    continue
+                left -= len(new)
+            scheduled.update(new)
+            grid.split(cell)
+            nsplit += 1
+        return nsplit
+
+    def _point_conditions(self, tc, x, y):
+        """Return pressure, temperature and bulk composition at grid point.
+
+        Grid axes are temperature and pressure and bulk is None, i.e. fixed.
+        Sections with other axes override this method.
+        """
+        return y, x, None
+
+    def _calc_point(self, tc, k, x, y):
+        """Calculate assemblage k at grid point.
+
+        Bulk composition must be already set in scriptfile.
+
+        Returns:
+            tuple: (result, delta), where result is TCResult or None and
+            delta is time needed for calculation.
+        """
+        p, T, _ = self._point_conditions(tc, x, y)
+        start_time = time.time()
+        tcout, ans = tc.calc_assemblage(k.difference(tc.excess), p, T)
+        delta = time.time() - start_time
+        status, res, output = tc.parse_logfile()
+        return (None if res is None else res[0]), delta
+
+    def _grid_tile(self, tc, tile, library, unilists, shared=None, wavefront=False):
+        """Calculate grid points sequentially using THERMOCALC API tc.
+
+        Ptguesses are interpolated from library of calculated points or, when
+        there are none, taken from nearest invariant point. When calculation
+        fails, nearest vertex of univariant line bounding field is tried.
+        For compositional sections the bulk of tc scriptfile is updated
+        whenever it changes between points.
+
+        Args:
+            tc (TCAPI): THERMOCALC API used for calculations
+            tile (list): List of (r, c, key, x, y) of grid points
+            library (GuessLibrary): Library updated with calculated points
+            unilists (dict): Dictionary of field keys and lists of ids of
+                univariant lines bounding the field
+            shared (GuessLibrary): Library used read-only when library has
+                no solution of assemblage. It provides also invariant points
+                and univariant lines when given. Default None.
+            wavefront (bool): When True, points of each field are calculated
+                by `_grid_wavefront`. Default False.
+
+        Yields:
+            tuple: (r, c, result, delta), where result is TCResult or None
+        """
+        if wavefront:
+            fields = OrderedDict()
+            for pt in tile:
+                fields.setdefault(pt[2], []).append(pt)
+            for pts in fields.values():
+                yield from self._grid_wavefront(tc, pts, library, unilists, shared)
+            return
+        seeds = library if shared is None else shared
+        last_seed, last_bulk = None, None
+        for r, c, k, x, y in tile:
+            bulk = self._point_conditions(tc, x, y)[2]
+            if bulk is not None and bulk != last_bulk:
+                tc.update_scriptfile(bulk=bulk)
+                last_bulk = bulk
+            guess = library.guess(k, x, y)
+            if guess is None and shared is not None:
+                guess = shared.guess(k, x, y)
+            if guess is not None:
+                # interpolate guesses from calculated points of same assemblage
+                tc.update_scriptfile(guesses=guess)
+                last_seed = guess
+            else:
+                # update guesses from closest inv point or clear them, so
+                # guesses left by previous tile are not used
+                guess = seeds.inv(x, y)
+                if guess is None or guess is not last_seed:
+                    tc.update_scriptfile(guesses=[] if guess is None else guess)
+                    last_seed = guess
+            res, delta = self._calc_point(tc, k, x, y)
+            if res is None:
+                # update guesses from closest uni line point
+                guess = seeds.uni(unilists.get(k, []), x, y)
+                if guess is not None:
+                    tc.update_scriptfile(guesses=guess)
+                    last_seed = guess
+                    res, delta = self._calc_point(tc, k, x, y)
+            if res is not None:
+                library.add(k, x, y, res.ptguess)
+            yield r, c, res, delta
+
+    def _grid_wavefront(self, tc, pts, library, unilists, shared=None):
+        """Calculate grid points of single divariant field by wavefront.
+
+        Calculation starts from point closest to the best known solution and
+        grows outward. Next calculated point is always the one with most
+        already solved neighbours, so ptguess is interpolated from them.
+        When calculation fails, ptguesses of solved neighbours are tried and
+        failed point is queued again whenever another neighbour converges.
+        Neighbours in other tiles or refinement levels are not available, so
+        failed points are left to `fix_solutions`.
+
+        Args:
+            tc (TCAPI): THERMOCALC API used for calculations
+            pts (list): List of (r, c, key, x, y) of grid points of field
+            library (GuessLibrary): Library updated with calculated points
+            unilists (dict): Dictionary of field keys and lists of ids of
+                univariant lines bounding the field
+            shared (GuessLibrary): Library used read-only when library has
+                no solution of assemblage. It provides also invariant points
+                and univariant lines when given. Default None.
+
+        Yields:
+            tuple: (r, c, result, delta). Solved points are yielded when
+            calculated, failed ones when whole field is finished.
+        """
+        n = len(pts)
+        key = pts[0][2]
+        seeds = library if shared is None else shared
+        # neighbours are nearest points on grid, diagonal ones included
+        rc = np.array([pt[:2] for pt in pts], dtype=float)
+        dist, nix = cKDTree(rc).query(rc, k=min(9, n))
+        dist, nix = dist.reshape(n, -1), nix.reshape(n, -1)
+        neighs = [[j for d, j in zip(dist[i, 1:], nix[i, 1:]) if d <= 1.5 * dist[i, 1]] for i in range(n)] if n > 1 else [[]]
+        solved = [None] * n
+        tried = np.zeros(n, dtype=bool)
+        nsolved = np.zeros(n, dtype=int)
+        retry = {}
+        deltas = np.full(n, np.nan)
+        heap, counter = [], itertools.count()
+        last_bulk = None
+
+        def calc(i, guess):
+            nonlocal last_bulk
+            r, c, k, x, y = pts[i]
+            bulk = self._point_conditions(tc, x, y)[2]
+            if bulk == last_bulk:
+                bulk = None
+            else:
+                last_bulk = bulk
+            # wavefront changes bulk whenever it moves to another row or
+            # column, so bulk is written together with guesses. Without seed
+            # guesses are cleared, so guesses left by previous tile are not used
+            tc.update_scriptfile(guesses=[] if guess is None else guess, bulk=bulk)
+            res, deltas[i] = self._calc_point(tc, k, x, y)
+            return res
+
+        while True:
+            if not heap:
+                left = np.flatnonzero(~tried)
+                if len(left) == 0:
+                    break
+                # start (or restart disconnected part) from best known solution
+                i = left[self._walk_start(key, [pts[j][3:] for j in left], library, shared)]
+                heapq.heappush(heap, (-nsolved[i], next(counter), i))
+            prio, _, i = heapq.heappop(heap)
+            if solved[i] is not None or -prio != nsolved[i] or (tried[i] and not retry.get(i)):
+                # outdated entry
+                continue
+            r, c, k, x, y = pts[i]
+            if not tried[i]:
+                tried[i] = True
+                guess = library.guess(k, x, y)
+                if guess is None and shared is not None:
+                    guess = shared.guess(k, x, y)
+                if guess is None:
+                    guess = seeds.inv(x, y)
+                res = calc(i, guess)
+                if res is None:
+                    # closest uni line point and solved neighbours
+                    candidates = [seeds.uni(unilists.get(k, []), x, y)] + [solved[j] for j in neighs[i] if solved[j] is not None]
+                    for guess in candidates:
+                        if guess is not None:
+                            res = calc(i, guess)
+                            if res is not None:
+                                break
+            else:
+                # ptguesses of neighbours converged since last attempt
+                for guess in retry.pop(i):
+                    res = calc(i, guess)
+                    if res is not None:
+                        break
+            if res is not None:
+                solved[i] = res.ptguess
+                library.add(k, x, y, res.ptguess)
+                for j in neighs[i]:
+                    if solved[j] is None:
+                        nsolved[j] += 1
+                        if tried[j]:
+                            retry.setdefault(j, []).append(res.ptguess)
+                        heapq.heappush(heap, (-nsolved[j], next(counter), j))
+                yield r, c, res, deltas[i]
+        for i in range(n):
+            if solved[i] is None:
+                yield pts[i][0], pts[i][1], None, deltas[i]
+
+    def grid_points(self, grid, points, library, unilists, jobs=None, pbar=None, checkpoint=None, interval=300, wavefront=False, pool=None):
+        """Calculate grid points and store results in grid.
+
+        When jobs is given, points are split into rectangular tiles of grid,
+        about four per worker. Each tile is calculated sequentially by one
+        of isolated THERMOCALC workers (see `TCWorkerPool`), so ptguesses
+        are propagated within tile and each worker sets bulk composition
+        in its own scriptfile. Tiles use library of pseudosection
+        read-only and it is updated when all tiles are calculated.
+
+        Args:
+            grid (GridData): Grid to store results
+            points (list): List of (r, c, key, x, y) of grid points
+            library (GuessLibrary): Library of ptguesses, including invariant
+                points and univariant lines (see `SectionBase.guesses`)
+            unilists (dict): Dictionary of field keys and lists of ids of
+                univariant lines bounding the field
+            jobs (int): Number of concurrent THERMOCALC workers. When None,
+                points are calculated serially. Default None.
+            pbar (tqdm): Progress bar updated for each point. Default None.
+            checkpoint (callable): Function called without arguments
+                to save partial grid. Default None.
+            interval (float): Minimal interval in seconds between calls of
+                checkpoint. Default 300.
+            wavefront (bool): When True, points of each field are calculated
+                by `_grid_wavefront`, otherwise in given order. Default False.
+            pool (TCWorkerPool): Pool of workers used instead of jobs. When
+                None, pool is created for this call when jobs is given.
+                Default None.
+        """
+        last_checkpoint = time.time()
+
+        def store(r, c, res, delta):
+            nonlocal last_checkpoint
+            if res is not None:
+                grid.gridcalcs[r, c] = res
+                grid.status[r, c] = 1
+                grid.delta[r, c] = delta
+            else:
+                grid.gridcalcs[r, c] = None
+                grid.status[r, c] = 0
+            if pbar is not None:
+                pbar.update(1)
+            if checkpoint is not None and time.time() - last_checkpoint >= interval:
+                checkpoint()
+                last_checkpoint = time.time()
+
+        if pool is not None:
+            jobs = pool.jobs
+        if jobs is None or jobs < 2 or len(points) < 2:
+            for r, c, res, delta in self._grid_tile(self.tc, points, library, unilists, wavefront=wavefront):
+                store(r, c, res, delta)
+        else:
+            size = max(2, int(np.ceil(np.sqrt(len(points) / (4 * jobs)))))
+            tiles = OrderedDict()
+            for pt in points:
+                tiles.setdefault((pt[2], pt[0] // size, pt[1] // size), []).append(pt)
+            # lookup in shared library must not modify it
+            library.build()
+            local = []
+            owned = pool is None
+            if owned:
+                pool = TCWorkerPool(self.tc, jobs=jobs)
+            try:
+                futures = []
+                for tile in tiles.values():
+                    local.append(GuessLibrary(k=library.k, method=library.method, scale=library.scale))
+                    futures.append(pool.submit(lambda tc, *args: list(self._grid_tile(tc, *args, wavefront=wavefront)),
+                                               tile, local[-1], unilists, library))
+                for future in as_completed(futures):
+                    for r, c, res, delta in future.result():
+                        store(r, c, res, delta)
+            finally:
+                if owned:
+                    pool.close()
+            for tile_library in local:
+                library.update(tile_library)
+
+    def fix_solutions(self, jobs=None):
+        """Method try to find solution for grid points with failed status.
+
+        Ptguess interpolated from nearest successfully calculated points of
+        same assemblage is tried first, then ptguesses are used from
+        successfully calculated neighboring points until solution is find.
+        Otherwise ststus remains failed.
+
+        When jobs is given, failed points are processed concurrently by
+        isolated THERMOCALC workers and all candidate ptguesses of point are
+        calculated at once, first successful calculation wins. Points still
+        failed are tried again with ptguesses of neighbours fixed meanwhile.
+
+        Args:
+            jobs (int): Number of concurrent THERMOCALC workers. When None,
+                failed points are processed serially. Default None.
+        """
+        if self.gridded:
+            for ix, grid in self.grids.items():
+                log = []
+                ri, ci = np.nonzero(grid.status == 0)
+                engine = self.guess_library(ix)
+                failed = []
+                for r, c in zip(ri, ci):
+                    x, y = grid.xg[r, c], grid.yg[r, c]
+                    k = self.identify(x, y)
+                    if k is not None:
+                        failed.append((r, c, k, x, y))
+                with tqdm(total=len(ri), desc='Fix (0/{})'.format(len(ri))) as tq:
+                    tq.update(len(ri) - len(failed))
+                    if jobs is None or jobs < 2:
+                        self._fix_serial(grid, failed, engine, tq)
+                    else:
+                        self._fix_parallel(grid, failed, engine, jobs, tq)
+                for r, c, k, x, y in failed:
+                    if grid.status[r, c] == 0:
+                        log.append('No solution find for {}, {}'.format(x, y))
+                log.append('Fix done. {} empty grid points left.'.format(len(np.flatnonzero(grid.status == 0))))
+                print('\n'.join(log))
+        else:
+            print('Not yet gridded...')
+
+    def _fix_candidates(self, grid, engine, r, c, k, x, y):
+        """Return interpolated ptguess and ptguesses of solved neighbours."""
+        guesses = [grid.gridcalcs[rn, cn].ptguess for rn, cn in grid.neighs(r, c) if grid.status[rn, cn] == 1]
+        guess = engine.guess(k, x, y)
+        if guess is not None:
+            guesses.insert(0, guess)
+        return guesses
+
+    def _fix_calc(self, tc, k, x, y, guess):
+        """Calculate assemblage k at grid point from given ptguess."""
+        bulk = self._point_conditions(tc, x, y)[2]
+        if bulk is not None:
+            tc.update_scriptfile(bulk=bulk)
+        tc.update_scriptfile(guesses=guess)
+        return self._calc_point(tc, k, x, y)
+
+    def _fix_store(self, grid, engine, r, c, k, x, y, res, delta):
+        grid.gridcalcs[r, c] = res
+        grid.status[r, c] = 1
+        grid.delta[r, c] = delta
+        engine.add(k, x, y, res.ptguess)
+
+    def _fix_serial(self, grid, failed, engine, tq):
+        """Try to fix failed points one by one using main THERMOCALC API."""
+        fixed, bulk_changed = 0, False
+        for r, c, k, x, y in failed:
+            bulk_changed = bulk_changed or self._point_conditions(self.tc, x, y)[2] is not None
+            for guess in self._fix_candidates(grid, engine, r, c, k, x, y):
+                res, delta = self._fix_calc(self.tc, k, x, y, guess)
+                if res is not None:
+                    self._fix_store(grid, engine, r, c, k, x, y, res, delta)
+                    fixed += 1
+                    tq.set_description(desc='Fix ({}/{})'.format(fixed, tq.total))
+                    break
+            tq.update(1)
+        if bulk_changed:
+            # restore bulk
+            self.tc.update_scriptfile(bulk=self.bulk)
+
+    def _fix_parallel(self, grid, failed, engine, jobs, tq):
+        """Try to fix failed points concurrently, racing candidate ptguesses."""
+        fixed = 0
+        tried = {pt[:2]: [] for pt in failed}
+        with TCWorkerPool(self.tc, jobs=jobs) as pool:
+            progress = True
+            while progress:
+                progress = False
+                races, rivals, candidates = {}, {}, []
+                for pt in failed:
+                    r, c = pt[:2]
+                    if grid.status[r, c] == 0:
+                        # only ptguesses not tried in previous rounds
+                        guesses = [guess for guess in self._fix_candidates(grid, engine, *pt)
+                                   if not any(guess == old for old in tried[(r, c)])]
+                        tried[(r, c)].extend(guesses)
+                        candidates.extend((order, pt, guess) for order, guess in enumerate(guesses))
+                # first candidates of all points are queued first, so rivals
+                # of already fixed points are mostly cancelled before start
+                candidates.sort(key=lambda cand: cand[0])
+                for _, (r, c, k, x, y), guess in candidates:
+                    future = pool.submit(self._fix_calc, k, x, y, guess)
+                    races[future] = (r, c, k, x, y)
+                    rivals.setdefault((r, c), []).append(future)
+                for future in as_completed(races):
+                    r, c, k, x, y = races[future]
+                    if future.cancelled() or grid.status[r, c] == 1:
+                        continue
+                    res, delta = future.result()
+                    if res is not None:
+                        self._fix_store(grid, engine, r, c, k, x, y, res, delta)
+                        fixed += 1
+                        tq.update(1)
+                        tq.set_description(desc='Fix ({}/{})'.format(fixed, tq.total))
+                        progress = True
+                        # first success wins, not yet started rivals are dropped
+                        for rival in rivals[(r, c)]:
+                            rival.cancel()
+            tq.update(len(failed) - fixed)
+
     def create_masks(self):
         """Update grid masks from existing divariant fields"""
         if self.gridded:
             for ix, grid in self.grids.items():
-                # Create data masks
-                points = MultiPoint(list(zip(grid.xg.flatten(), grid.yg.flatten())))
+                # Create data masks, only calculated points could be inside
+                calculated = ~np.isnan(grid.status)
+                points = MultiPoint(list(zip(grid.xg[calculated], grid.yg[calculated])))
                 shapes = self._shapes[ix]
                 for key in shapes:
-                    grid.masks[key] = np.array(list(map(shapes[key].contains, points))).reshape(grid.xg.shape)
+                    mask = np.zeros(grid.xg.shape, dtype=bool)
+                    mask[calculated] = list(map(shapes[key].contains, points))
+                    grid.masks[key] = mask
         else:
             print('Not yet gridded...')
 
@@ -450,11 +1263,11 @@ class PS:
                         if phase in uni.results.phases:
                             edt = zip(uni._x[uni.used],
                                       uni._y[uni.used],
-                                      uni.results[uni.used],)
-                            for x, y, res in edt:
+                                      eval_expr(expr, uni.results[uni.used][phase]),)
+                            for x, y, val in edt:
                                 if self.shapes[key].intersects(Point(x, y)):
                                     dt['pts'].append((x, y))
-                                    dt['data'].append(eval_expr(expr, res[phase]))
+                                    dt['data'].append(val)
         return dt
 
     def collect_grid_data(self, key, phase, expr):
@@ -1368,7 +2181,7 @@ class PTPS(PS):
         self.section_class = PTsection
         super(PTPS, self).__init__(*args, **kwargs)
 
-    def calculate_composition(self, nx=50, ny=50):
+    def calculate_composition(self, nx=50, ny=50, jobs=None, resume=False, checkpoint=300, **kwargs):
         """Method to calculate compositional variations on grid.
 
         A compositions are calculated for stable assemblages in regular grid
@@ -1376,130 +2189,43 @@ class PTPS(PS):
         from constructed divariant fields. Results are stored in `grid` property
         as `GridData` instance. A property `all_data_keys` is updated.
 
-        Before any grid point calculation, ptguesses are updated from nearest
-        invariant point. If calculation fails, nearest solution from univariant
-        line is used to update ptguesses. Finally, if solution is still not found,
-        the method `fix_solutions` is called and neigbouring grid calculations are
-        used to provide ptguess.
+        Grid is calculated by `_calculate_grid`, where gridding options are
+        described. Failed points are finally passed to `fix_solutions`.
+        Checkpoint files are removed when calculation is finished and project
+        saved.
 
         Args:
             nx (int): Number of grid points along x direction (T)
             ny (int): Number of grid points along y direction (p)
+            jobs (int): Number of concurrent THERMOCALC workers. Default None.
+            resume (bool): Continue from checkpoint file. Default False.
+            checkpoint (float): Interval in seconds between checkpoints or
+                None. Default 300.
+            **kwargs: Options of adaptive grid and order of points passed
+                to `_calculate_grid`.
         """
-        axr = self.xrange
-        ayr = self.yrange
         gpleft = 0
-        for ix, ps in self.sections.items():
-            paxr = ps.xrange
-            payr = ps.yrange
-            grid = GridData(ps,
-                            nx=round(nx*(paxr[1] - paxr[0])/(axr[1] - axr[0])),
-                            ny=round(ny*(payr[1] - payr[0])/(ayr[1] - ayr[0])))
-            last_inv = 0
-            for (r, c) in tqdm(np.ndindex(grid.xg.shape), desc='Gridding {}/{}'.format(ix + 1, len(self.sections)), total=np.prod(grid.xg.shape)):
-                x, y = grid.xg[r, c], grid.yg[r, c]
-                k = self.identify(x, y)
-                if k is not None:
-                    # update guesses from closest inv point
-                    dst = sys.float_info.max
-                    for id_inv, inv in ps.invpoints.items():
-                        d2 = (inv._x - x)**2 + (inv._y - y)**2
-                        if d2 < dst:
-                            dst = d2
-                            id_close = id_inv
-                    if id_close != last_inv and not ps.invpoints[id_close].manual:
-                        self.tc.update_scriptfile(guesses=ps.invpoints[id_close].ptguess())
-                        last_inv = id_close
-                    grid.status[r, c] = 0
-                    start_time = time.time()
-                    tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), y, x)
-                    delta = time.time() - start_time
-                    status, res, output = self.tc.parse_logfile()
-                    if res is not None:
-                        grid.gridcalcs[r, c] = res[0]
-                        grid.status[r, c] = 1
-                        grid.delta[r, c] = delta
-                    else:
-                        # update guesses from closest uni line point
-                        dst = sys.float_info.max
-                        for id_uni in self.unilists[ix][k]:
-                            uni = ps.unilines[id_uni]
-                            if not uni.manual:
-                                for vix in list(range(len(uni._x))[uni.used]):
-                                    d2 = (uni._x[vix] - x)**2 + (uni._y[vix] - y)**2
-                                    if d2 < dst:
-                                        dst = d2
-                                        id_close = id_uni
-                                        vix_close = vix
-                        self.tc.update_scriptfile(guesses=ps.unilines[id_close].ptguess(idx=vix_close))
-                        start_time = time.time()
-                        tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), y, x)
-                        delta = time.time() - start_time
-                        status, res, output = self.tc.parse_logfile()
-                        if res is not None:
-                            grid.gridcalcs[r, c] = res[0]
-                            grid.status[r, c] = 1
-                            grid.delta[r, c] = delta
-                        else:
-                            grid.gridcalcs[r, c] = None
-                            grid.status[r, c] = 0
-                else:
-                    grid.gridcalcs[r, c] = None
+        for ix in self.sections:
+            grid = self._calculate_grid(ix, nx, ny, jobs=jobs, resume=resume, checkpoint=checkpoint, **kwargs)
             print('Grid search done. {} empty points left.'.format(len(np.flatnonzero(grid.status == 0))))
             gpleft += len(np.flatnonzero(grid.status == 0))
             self.grids[ix] = grid
-        if gpleft > 0:
-            self.fix_solutions()
         self.create_masks()
+        if gpleft > 0:
+            # wavefront does not retry across tiles and refinement levels
+            self.fix_solutions(jobs=jobs)
         # save
         self.save()
+        self.remove_checkpoints()
         # update variable lookup table
         self.collect_all_data_keys()
 
-    def fix_solutions(self):
-        """Method try to find solution for grid points with failed status.
-
-        Ptguesses are used from successfully calculated neighboring points until
-        solution is find. Otherwise ststus remains failed.
-        """
-        if self.gridded:
-            for ix, grid in self.grids.items():
-                log = []
-                ri, ci = np.nonzero(grid.status == 0)
-                fixed, ftot = 0, len(ri)
-                tq = trange(ftot, desc='Fix ({}/{})'.format(fixed, ftot))
-                for ind in tq:
-                    r, c = ri[ind], ci[ind]
-                    x, y = grid.xg[r, c], grid.yg[r, c]
-                    k = self.identify(x, y)
-                    if k is not None:
-                        # search already done grid neighs
-                        for rn, cn in grid.neighs(r, c):
-                            if grid.status[rn, cn] == 1:
-                                self.tc.update_scriptfile(guesses=grid.gridcalcs[rn, cn].ptguess)
-                                start_time = time.time()
-                                tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), y, x)
-                                delta = time.time() - start_time
-                                status, res, output = self.tc.parse_logfile()
-                                if res is not None:
-                                    grid.gridcalcs[r, c] = res[0]
-                                    grid.status[r, c] = 1
-                                    grid.delta[r, c] = delta
-                                    fixed += 1
-                                    tq.set_description(desc='Fix ({}/{})'.format(fixed, ftot))
-                                    break
-                    if grid.status[r, c] == 0:
-                        log.append('No solution find for {}, {}'.format(x, y))
-                log.append('Fix done. {} empty grid points left.'.format(len(np.flatnonzero(grid.status == 0))))
-                print('\n'.join(log))
-        else:
-            print('Not yet gridded...')
-
-    def collect_ptpath(self, tpath, ppath, N=100, kind = 'quadratic'):
+    def collect_ptpath(self, tpath, ppath, N=100, kind = 'quadratic', jobs=None):
         """Method to collect THERMOCALC calculations along defined PT path.
 
         PT path is interpolated from provided points using defined method. For
-        each point THERMOCALC seek for solution using ptguess from nearest
+        each point THERMOCALC seek for solution using ptguess interpolated from
+        nearest `GridData` points of same assemblage or from nearest
         `GridData` point.
 
         Args:
@@ -1507,6 +2233,8 @@ class PTPS(PS):
             ppath (numpy.array): 1D array of pressures for given PT path
             N (int): Number of calculation steps. Default 100.
             kind (str): Kind of interpolation. See scipy.interpolate.interp1d
+            jobs (int): Number of concurrent THERMOCALC workers. When None,
+                points are calculated serially. Default None.
 
         Returns:
             PTpath: returns instance of PTpath class storing all calculations
@@ -1521,30 +2249,43 @@ class PTPS(PS):
             splt = interp1d(gpath, tpath, kind=kind)
             splp = interp1d(gpath, ppath, kind=kind)
             err = 0
-            points, results = [], []
-            for step in tqdm(np.linspace(0, 1, N), desc='Calculating'):
+            calcs = []
+            engines = {}
+            for step in np.linspace(0, 1, N):
                 t, p = splt(step), splp(step)
                 key = self.identify(t, p)
                 ix = self.get_section_id(t, p)
                 if ix is not None:
-                    r, c = self.grids[ix].get_indexes(t, p)
-                    calc = None
-                    if self.grids[ix].status[r, c] == 1:
-                        calc = self.grids[ix].gridcalcs[r, c]
-                    else:
-                        for rn, cn in self.grids[ix].neighs(r, c):
-                            if self.grids[ix].status[rn, cn] == 1:
-                                calc = self.grids[ix].gridcalcs[rn, cn]
-                                break
-                    if calc is not None:
-                        self.tc.update_scriptfile(guesses=calc.ptguess)
-                        tcout, ans = self.tc.calc_assemblage(key.difference(self.tc.excess), p, t)
-                        status, res, output = self.tc.parse_logfile()
-                        if res is not None:
-                            points.append((t, p))
-                            results.append(res[0])
+                    if ix not in engines:
+                        engines[ix] = self.guess_library(ix)
+                    guess = engines[ix].guess(key, t, p)
+                    if guess is None:
+                        r, c = self.grids[ix].get_indexes(t, p)
+                        if self.grids[ix].status[r, c] == 1:
+                            guess = self.grids[ix].gridcalcs[r, c].ptguess
+                        else:
+                            for rn, cn in self.grids[ix].neighs(r, c):
+                                if self.grids[ix].status[rn, cn] == 1:
+                                    guess = self.grids[ix].gridcalcs[rn, cn].ptguess
+                                    break
+                    if guess is not None:
+                        calcs.append((key.difference(self.tc.excess), p, t, guess, None))
                     else:
                         err += 1
+            order = {id(calc): ix for ix, calc in enumerate(calcs)}
+            done = []
+            pool = TCWorkerPool(self.tc, jobs=jobs) if jobs is not None and jobs > 1 else None
+            try:
+                for calc, status, res in tqdm(self.tc.calc_assemblages(calcs, pool=pool), desc='Calculating', total=len(calcs)):
+                    if res is not None:
+                        done.append((order[id(calc)], (calc[2], calc[1]), res))
+            finally:
+                if pool is not None:
+                    pool.close()
+            # pool yields results in order of completion
+            done.sort(key=lambda d: d[0])
+            points = [pt for _, pt, _ in done]
+            results = [res for _, _, res in done]
             if err > 0:
                 print('Solution not found on {} points'.format(err))
             return PTpath(points, results)
@@ -1643,7 +2384,7 @@ class TXPS(PS):
         self.section_class = TXsection
         super(TXPS, self).__init__(*args, **kwargs)
 
-    def calculate_composition(self, nx=50, ny=50):
+    def calculate_composition(self, nx=50, ny=50, jobs=None, resume=False, checkpoint=300, **kwargs):
         """Method to calculate compositional variations on grid.
 
         A compositions are calculated for stable assemblages in regular grid
@@ -1651,138 +2392,43 @@ class TXPS(PS):
         from constructed divariant fields. Results are stored in `grid` property
         as `GridData` instance. A property `all_data_keys` is updated.
 
-        Before any grid point calculation, ptguesses are updated from nearest
-        invariant point. If calculation fails, nearest solution from univariant
-        line is used to update ptguesses. Finally, if solution is still not found,
-        the method `fix_solutions` is called and neigbouring grid calculations are
-        used to provide ptguess.
+        Grid is calculated by `_calculate_grid`, where gridding options are
+        described. Failed points are finally passed to `fix_solutions`.
+        Checkpoint files are removed when calculation is finished and project
+        saved.
 
         Args:
             nx (int): Number of grid points along x direction (T)
-            ny (int): Number of grid points along y direction (p)
+            ny (int): Number of grid points along y direction (composition)
+            jobs (int): Number of concurrent THERMOCALC workers. Default None.
+            resume (bool): Continue from checkpoint file. Default False.
+            checkpoint (float): Interval in seconds between checkpoints or
+                None. Default 300.
+            **kwargs: Options of adaptive grid and order of points passed
+                to `_calculate_grid`.
         """
-        axr = self.xrange
-        ayr = self.yrange
         gpleft = 0
-        for ix, ps in self.sections.items():
-            paxr = ps.xrange
-            payr = ps.yrange
-            grid = GridData(ps,
-                            nx=round(nx*(paxr[1] - paxr[0])/(axr[1] - axr[0])),
-                            ny=round(ny*(payr[1] - payr[0])/(ayr[1] - ayr[0])))
-            last_inv = 0
-            with tqdm(desc='Gridding {}/{}'.format(ix + 1, len(self.sections)), total=np.prod(grid.xg.shape)) as pbar:
-                pm = (self.tc.prange[0] + self.tc.prange[1]) / 2
-                for r in range(len(grid.yspace)):
-                    # change bulk
-                    bulk = self.tc.interpolate_bulk(grid.yspace[r])
-                    self.tc.update_scriptfile(bulk=bulk)
-                    for c in range(len(grid.xspace)):
-                        x, y = grid.xg[r, c], grid.yg[r, c]
-                        k = self.identify(x, y)
-                        if k is not None:
-                            # update guesses from closest inv point
-                            dst = sys.float_info.max
-                            for id_inv, inv in ps.invpoints.items():
-                                d2 = (inv._x - x)**2 + (inv._y - y)**2
-                                if d2 < dst:
-                                    dst = d2
-                                    id_close = id_inv
-                            if id_close != last_inv and not ps.invpoints[id_close].manual:
-                                self.tc.update_scriptfile(guesses=ps.invpoints[id_close].ptguess())
-                                last_inv = id_close
-                            grid.status[r, c] = 0
-                            start_time = time.time()
-                            tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), pm, x)
-                            delta = time.time() - start_time
-                            status, res, output = self.tc.parse_logfile()
-                            if res is not None:
-                                grid.gridcalcs[r, c] = res[0]
-                                grid.status[r, c] = 1
-                                grid.delta[r, c] = delta
-                            else:
-                                # update guesses from closest uni line point
-                                dst = sys.float_info.max
-                                for id_uni in self.unilists[ix][k]:
-                                    uni = ps.unilines[id_uni]
-                                    if not uni.manual:
-                                        for vix in list(range(len(uni._x))[uni.used]):
-                                            d2 = (uni._x[vix] - x)**2 + (uni._y[vix] - y)**2
-                                            if d2 < dst:
-                                                dst = d2
-                                                id_close = id_uni
-                                                vix_close = vix
-                                self.tc.update_scriptfile(guesses=ps.unilines[id_close].ptguess(idx=vix_close))
-                                start_time = time.time()
-                                tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), pm, x)
-                                delta = time.time() - start_time
-                                status, res, output = self.tc.parse_logfile()
-                                if res is not None:
-                                    grid.gridcalcs[r, c] = res[0]
-                                    grid.status[r, c] = 1
-                                    grid.delta[r, c] = delta
-                                else:
-                                    grid.gridcalcs[r, c] = None
-                                    grid.status[r, c] = 0
-                        else:
-                            grid.gridcalcs[r, c] = None
-                        pbar.update(1)
+        for ix in self.sections:
+            # fixed orders walk row by row, so bulk is changed once per row
+            grid = self._calculate_grid(ix, nx, ny, jobs=jobs, resume=resume, checkpoint=checkpoint, **kwargs)
             print('Grid search done. {} empty points left.'.format(len(np.flatnonzero(grid.status == 0))))
             gpleft += len(np.flatnonzero(grid.status == 0))
             self.grids[ix] = grid
         # restore bulk
         self.tc.update_scriptfile(bulk=self.bulk)
-        if gpleft > 0:
-            self.fix_solutions()
         self.create_masks()
+        if gpleft > 0:
+            # wavefront does not retry across tiles and refinement levels
+            self.fix_solutions(jobs=jobs)
         # update variable lookup table
         self.collect_all_data_keys()
         # save
         self.save()
+        self.remove_checkpoints()
 
-    def fix_solutions(self):
-        """Method try to find solution for grid points with failed status.
-
-        Ptguesses are used from successfully calculated neighboring points until
-        solution is find. Otherwise ststus remains failed.
-        """
-        if self.gridded:
-            for ix, grid in self.grids.items():
-                log = []
-                ri, ci = np.nonzero(grid.status == 0)
-                fixed, ftot = 0, len(ri)
-                pm = (self.tc.prange[0] + self.tc.prange[1]) / 2
-                tq = trange(ftot, desc='Fix ({}/{})'.format(fixed, ftot))
-                for ind in tq:
-                    r, c = ri[ind], ci[ind]
-                    x, y = grid.xg[r, c], grid.yg[r, c]
-                    k = self.identify(x, y)
-                    if k is not None:
-                        # search already done grid neighs
-                        for rn, cn in grid.neighs(r, c):
-                            if grid.status[rn, cn] == 1:
-                                # change bulk
-                                bulk = self.tc.interpolate_bulk(grid.yspace[rn])
-                                self.tc.update_scriptfile(bulk=bulk, guesses=grid.gridcalcs[rn, cn]['ptguess'])
-                                start_time = time.time()
-                                tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), pm, x)
-                                delta = time.time() - start_time
-                                status, res, output = self.tc.parse_logfile()
-                                if res is not None:
-                                    grid.gridcalcs[r, c] = res[0]
-                                    grid.status[r, c] = 1
-                                    grid.delta[r, c] = delta
-                                    fixed += 1
-                                    tq.set_description(desc='Fix ({}/{})'.format(fixed, ftot))
-                                    break
-                    if grid.status[r, c] == 0:
-                        log.append('No solution find for {}, {}'.format(x, y))
-                log.append('Fix done. {} empty grid points left.'.format(len(np.flatnonzero(grid.status == 0))))
-                print('\n'.join(log))
-            # restore bulk
-            self.tc.update_scriptfile(bulk=self.bulk)
-        else:
-            print('Not yet gridded...')
+    def _point_conditions(self, tc, x, y):
+        pm = (tc.prange[0] + tc.prange[1]) / 2
+        return pm, x, tc.interpolate_bulk(y)
 
 
 class PXPS(PS):
@@ -1792,7 +2438,7 @@ class PXPS(PS):
         self.section_class = PXsection
         super(PXPS, self).__init__(*args, **kwargs)
 
-    def calculate_composition(self, nx=50, ny=50):
+    def calculate_composition(self, nx=50, ny=50, jobs=None, resume=False, checkpoint=300, **kwargs):
         """Method to calculate compositional variations on grid.
 
         A compositions are calculated for stable assemblages in regular grid
@@ -1800,138 +2446,43 @@ class PXPS(PS):
         from constructed divariant fields. Results are stored in `grid` property
         as `GridData` instance. A property `all_data_keys` is updated.
 
-        Before any grid point calculation, ptguesses are updated from nearest
-        invariant point. If calculation fails, nearest solution from univariant
-        line is used to update ptguesses. Finally, if solution is still not found,
-        the method `fix_solutions` is called and neigbouring grid calculations are
-        used to provide ptguess.
+        Grid is calculated by `_calculate_grid`, where gridding options are
+        described. Failed points are finally passed to `fix_solutions`.
+        Checkpoint files are removed when calculation is finished and project
+        saved.
 
         Args:
-            nx (int): Number of grid points along x direction (T)
+            nx (int): Number of grid points along x direction (composition)
             ny (int): Number of grid points along y direction (p)
+            jobs (int): Number of concurrent THERMOCALC workers. Default None.
+            resume (bool): Continue from checkpoint file. Default False.
+            checkpoint (float): Interval in seconds between checkpoints or
+                None. Default 300.
+            **kwargs: Options of adaptive grid and order of points passed
+                to `_calculate_grid`.
         """
-        axr = self.xrange
-        ayr = self.yrange
         gpleft = 0
-        for ix, ps in self.sections.items():
-            paxr = ps.xrange
-            payr = ps.yrange
-            grid = GridData(ps,
-                            nx=round(nx*(paxr[1] - paxr[0])/(axr[1] - axr[0])),
-                            ny=round(ny*(payr[1] - payr[0])/(ayr[1] - ayr[0])))
-            last_inv = 0
-            with tqdm(desc='Gridding', total=np.prod(grid.xg.shape)) as pbar:
-                tm = (self.tc.trange[0] + self.tc.trange[1]) / 2
-                for c in range(len(grid.xspace)):
-                    # change bulk
-                    bulk = self.tc.interpolate_bulk(grid.xspace[c])
-                    self.tc.update_scriptfile(bulk=bulk)
-                    for r in range(len(grid.yspace)):
-                        x, y = grid.xg[r, c], grid.yg[r, c]
-                        k = self.identify(x, y)
-                        if k is not None:
-                            # update guesses from closest inv point
-                            dst = sys.float_info.max
-                            for id_inv, inv in ps.invpoints.items():
-                                d2 = (inv._x - x)**2 + (inv._y - y)**2
-                                if d2 < dst:
-                                    dst = d2
-                                    id_close = id_inv
-                            if id_close != last_inv and not ps.invpoints[id_close].manual:
-                                self.tc.update_scriptfile(guesses=ps.invpoints[id_close].ptguess())
-                                last_inv = id_close
-                            grid.status[r, c] = 0
-                            start_time = time.time()
-                            tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), y, tm)
-                            delta = time.time() - start_time
-                            status, res, output = self.tc.parse_logfile()
-                            if res is not None:
-                                grid.gridcalcs[r, c] = res[0]
-                                grid.status[r, c] = 1
-                                grid.delta[r, c] = delta
-                            else:
-                                # update guesses from closest uni line point
-                                dst = sys.float_info.max
-                                for id_uni in self.unilists[ix][k]:
-                                    uni = ps.unilines[id_uni]
-                                    if not uni.manual:
-                                        for vix in list(range(len(uni._x))[uni.used]):
-                                            d2 = (uni._x[vix] - x)**2 + (uni._y[vix] - y)**2
-                                            if d2 < dst:
-                                                dst = d2
-                                                id_close = id_uni
-                                                vix_close = vix
-                                self.tc.update_scriptfile(guesses=ps.unilines[id_close].ptguess(idx=vix_close))
-                                start_time = time.time()
-                                tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), y, tm)
-                                delta = time.time() - start_time
-                                status, res, output = self.tc.parse_logfile()
-                                if res is not None:
-                                    grid.gridcalcs[r, c] = res[0]
-                                    grid.status[r, c] = 1
-                                    grid.delta[r, c] = delta
-                                else:
-                                    grid.gridcalcs[r, c] = None
-                                    grid.status[r, c] = 0
-                        else:
-                            grid.gridcalcs[r, c] = None
-                        pbar.update(1)
+        for ix in self.sections:
+            # fixed orders walk column by column, so bulk is changed once per column
+            grid = self._calculate_grid(ix, nx, ny, jobs=jobs, resume=resume, checkpoint=checkpoint, columns=True, **kwargs)
             print('Grid search done. {} empty points left.'.format(len(np.flatnonzero(grid.status == 0))))
             gpleft += len(np.flatnonzero(grid.status == 0))
             self.grids[ix] = grid
         # restore bulk
         self.tc.update_scriptfile(bulk=self.bulk)
-        if gpleft > 0:
-            self.fix_solutions()
         self.create_masks()
+        if gpleft > 0:
+            # wavefront does not retry across tiles and refinement levels
+            self.fix_solutions(jobs=jobs)
         # update variable lookup table
         self.collect_all_data_keys()
         # save
         self.save()
+        self.remove_checkpoints()
 
-    def fix_solutions(self):
-        """Method try to find solution for grid points with failed status.
-
-        Ptguesses are used from successfully calculated neighboring points until
-        solution is find. Otherwise ststus remains failed.
-        """
-        if self.gridded:
-            for ix, grid in self.grids.items():
-                log = []
-                ri, ci = np.nonzero(grid.status == 0)
-                fixed, ftot = 0, len(ri)
-                tm = (self.tc.trange[0] + self.tc.trange[1]) / 2
-                tq = trange(ftot, desc='Fix ({}/{})'.format(fixed, ftot))
-                for ind in tq:
-                    r, c = ri[ind], ci[ind]
-                    x, y = grid.xg[r, c], grid.yg[r, c]
-                    k = self.identify(x, y)
-                    if k is not None:
-                        # search already done grid neighs
-                        for rn, cn in grid.neighs(r, c):
-                            if grid.status[rn, cn] == 1:
-                                # change bulk
-                                bulk = self.tc.interpolate_bulk(grid.xspace[cn])
-                                self.tc.update_scriptfile(bulk=bulk, guesses=grid.gridcalcs[rn, cn]['ptguess'])
-                                start_time = time.time()
-                                tcout, ans = self.tc.calc_assemblage(k.difference(self.tc.excess), y, tm)
-                                delta = time.time() - start_time
-                                status, res, output = self.tc.parse_logfile()
-                                if res is not None:
-                                    grid.gridcalcs[r, c] = res[0]
-                                    grid.status[r, c] = 1
-                                    grid.delta[r, c] = delta
-                                    fixed += 1
-                                    tq.set_description(desc='Fix ({}/{})'.format(fixed, ftot))
-                                    break
-                    if grid.status[r, c] == 0:
-                        log.append('No solution find for {}, {}'.format(x, y))
-                log.append('Fix done. {} empty grid points left.'.format(len(np.flatnonzero(grid.status == 0))))
-                print('\n'.join(log))
-            # restore bulk
-            self.tc.update_scriptfile(bulk=self.bulk)
-        else:
-            print('Not yet gridded...')
+    def _point_conditions(self, tc, x, y):
+        tm = (tc.trange[0] + tc.trange[1]) / 2
+        return y, tm, tc.interpolate_bulk(x)
 
 
 class GridData:
@@ -1970,6 +2521,10 @@ class GridData:
         return tmpl.format(len(self.xspace), len(self.yspace),
                            ok, fail, np.prod(self.xg.shape) - ok - fail)
 
+    def pending(self):
+        """Return list of row, column tuples of not yet calculated points."""
+        return list(zip(*np.nonzero(np.isnan(self.status))))
+
     def get_indexes(self, x, y):
         """Return row and column index tuple of nearest grid point
 
@@ -2024,6 +2579,97 @@ class GridData:
                 self.yspace[0] - self.ystep / 2, self.yspace[-1] + self.ystep / 2)
 
 
+class QuadGrid(GridData):
+    """Class to store gridded calculations refined by quadtree.
+
+    Grid starts with nx x ny cells, which could be recursively split into
+    four cells up to given number of levels. Grid points are nodes of regular
+    lattice of the finest level, but only corners of existing cells are
+    calculated. Other points keep NaN status, so QuadGrid could be used
+    everywhere GridData is expected.
+
+    Attributes:
+        levels (int): Maximum number of refinement levels
+        cells (set): Set of (level, row, column) tuples of quadtree leaf cells.
+            Row and column are indexes of cell within given level.
+
+    See also `GridData` attributes.
+
+    """
+    def __init__(self, ps, nx, ny, levels=3):
+        self.levels = levels
+        super(QuadGrid, self).__init__(ps, nx * 2**levels + 1, ny * 2**levels + 1)
+        self.cells = {(0, i, j) for i in range(ny) for j in range(nx)}
+
+    def __repr__(self):
+        tmpl = 'Quadtree grid {}x{} with {} cells on {} levels and ok/failed solutions {}/{}'
+        ok = len(np.flatnonzero(self.status == 1))
+        fail = len(np.flatnonzero(self.status == 0))
+        return tmpl.format(len(self.xspace), len(self.yspace), len(self.cells),
+                           self.levels, ok, fail)
+
+    def corners(self, cell):
+        """Returns list of row, column tuples of corner points of cell.
+
+        Args:
+            cell (tuple): (level, row, column) of cell
+        """
+        level, i, j = cell
+        s = 2**(self.levels - level)
+        return [(i * s, j * s), (i * s, (j + 1) * s), ((i + 1) * s, j * s), ((i + 1) * s, (j + 1) * s)]
+
+    def children(self, cell):
+        """Returns list of four cells created by split of cell."""
+        level, i, j = cell
+        return [(level + 1, 2 * i + di, 2 * j + dj) for di in (0, 1) for dj in (0, 1)]
+
+    def bounds(self, cell):
+        """Returns (xmin, ymin, xmax, ymax) of cell."""
+        (r0, c0), _, _, (r1, c1) = self.corners(cell)
+        return self.xspace[c0], self.yspace[r0], self.xspace[c1], self.yspace[r1]
+
+    def split(self, cell):
+        """Replace cell by its four children."""
+        self.cells.remove(cell)
+        self.cells.update(self.children(cell))
+
+    def pending(self):
+        """Return list of row, column tuples of not yet calculated corners of cells."""
+        nodes = {node for cell in self.cells for node in self.corners(cell)}
+        return sorted(node for node in nodes if np.isnan(self.status[node]))
+
+    def _nearest(self, r, c, n):
+        rows, cols = np.nonzero(~np.isnan(self.status))
+        d = np.hypot((rows - r) * self.ystep / (self.yspace[-1] - self.yspace[0]),
+                     (cols - c) * self.xstep / (self.xspace[-1] - self.xspace[0]))
+        ix = np.argsort(d, kind='stable')[:n]
+        return rows[ix], cols[ix]
+
+    def get_indexes(self, x, y):
+        """Return row and column index tuple of nearest calculated grid point
+
+        Args:
+            x (float): x-coordinate of point
+            y (float): y-coordiante of point
+
+        """
+        r, c = super(QuadGrid, self).get_indexes(x, y)
+        r, c = min(r, len(self.yspace) - 1), min(c, len(self.xspace) - 1)
+        rows, cols = self._nearest(r, c, 1)
+        return (rows[0], cols[0]) if len(rows) > 0 else (r, c)
+
+    def neighs(self, r, c):
+        """Returns list of row, column tuples of eight nearest calculated
+        points on grid.
+
+        Args:
+            r (int): Row index
+            c (int): Column index
+        """
+        rows, cols = self._nearest(r, c, 9)
+        return [(rn, cn) for rn, cn in zip(rows, cols) if (rn, cn) != (r, c)][:8]
+
+
 class PTpath:
     """Class to store THERMOCALC calculations along PT paths.
 
@@ -2046,7 +2692,8 @@ def eval_expr(expr, dt):
 
     Args:
         expr (str): expression to be evaluated
-        dt (dict): dictionary of all available variables and their values
+        dt (dict): dictionary of all available variables and their values.
+            Values could be also arrays, e.g. phase data of TCResultSet.
 
     Returns:
         float: value evaluated from epxression
@@ -2124,11 +2771,35 @@ def ps_grid():
                         help='use stored original working directory')
     parser.add_argument('--tolerance', type=float, default=None,
                         help='tolerance to simplify univariant lines')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of concurrent THERMOCALC workers')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue interrupted gridding from checkpoint')
+    parser.add_argument('--checkpoint', type=float, default=300,
+                        help='interval in seconds between checkpoints')
+    parser.add_argument('--order', type=str, default='wavefront',
+                        choices=['wavefront', 'serpentine', 'nearest', 'raster'],
+                        help='order of points within divariant field')
+    parser.add_argument('--levels', type=int, default=0,
+                        help='number of refinement levels of adaptive grid')
+    parser.add_argument('--var', type=str, nargs=2, action='append', default=[],
+                        metavar=('PHASE', 'EXPR'), help='variable used to refine adaptive grid')
+    parser.add_argument('--tol', type=float, default=0.1,
+                        help='relative tolerance of variables within cell')
+    parser.add_argument('--budget', type=int, default=None,
+                        help='maximum number of points of adaptive grid')
     args = parser.parse_args()
     PSOK = explorers.get(Path(args.project[0]).suffix, None)
     if PSOK is not None:
         ps = PSOK(*args.project, tolerance=args.tolerance, origwd=args.origwd)
-        sys.exit(ps.calculate_composition(nx=args.nx, ny=args.ny))
+        kwargs = {}
+        if args.jobs is not None:
+            kwargs['jobs'] = args.jobs
+        if args.levels > 0:
+            kwargs.update(levels=args.levels, variables=[tuple(v) for v in args.var],
+                          tol=args.tol, budget=args.budget)
+        sys.exit(ps.calculate_composition(nx=args.nx, ny=args.ny, resume=args.resume,
+                                          checkpoint=args.checkpoint, order=args.order, **kwargs))
     else:
         print('Project file not recognized...')
         sys.exit(1)
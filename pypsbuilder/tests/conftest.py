@@ -0,0 +1,52 @@
+import os
+import shutil
+from pathlib import Path
+import pytest
+from shapely.geometry import box
+from pypsbuilder import TCAPI, PTsection, PTPS
+
+TESTDIR = Path(__file__).resolve().parent
+EXAMPLES = TESTDIR.parents[1] / 'examples'
+
+
+def make_stub_workdir(workdir):
+    """Populate workdir with avgpelite project and stand-in THERMOCALC."""
+    shutil.copytree(str(EXAMPLES / 'avgpelite'), str(workdir))
+    exe = Path(workdir) / 'tc350stub'
+    try:
+        exe.symlink_to(TESTDIR / 'tcstub.py')
+    except OSError:
+        shutil.copy(str(TESTDIR / 'tcstub.py'), str(exe))
+    exe.chmod(0o755)
+    return workdir
+
+
+@pytest.fixture
+def stub_tc(tmp_path, monkeypatch):
+    """TCAPI of avgpelite project using stand-in THERMOCALC."""
+    monkeypatch.setenv('PSBSTUB_TEMPLATES', str(EXAMPLES / 'outputs'))
+    tc = TCAPI(make_stub_workdir(tmp_path / 'avgpelite'))
+    assert tc.OK, tc.status
+    return tc
+
+
+@pytest.fixture
+def stub_explorer(stub_tc, tmp_path):
+    """Factory of PTPS of single P-T section using stand-in THERMOCALC.
+
+    Explorer is created without project file. Divariant fields are given
+    as dictionary of keys and shapes, default is single field of
+    g-bi-mu-sph-pa-q-H2O covering whole section.
+    """
+    def make(shapes=None):
+        if shapes is None:
+            shapes = {frozenset({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}): box(400, 7, 700, 16)}
+        explorer = PTPS.__new__(PTPS)
+        explorer.tc = stub_tc
+        explorer.projfiles = {0: tmp_path / 'grid.ptb'}
+        explorer.sections = {0: PTsection(trange=(400., 700.), prange=(7., 16.))}
+        explorer.grids, explorer.unilists, explorer._guesses, explorer._guessed = {}, {0: {}}, {}, {}
+        explorer.shapes, explorer._shapes = shapes, {0: shapes}
+        explorer.guess_k, explorer.guess_method = 4, 'idw'
+        return explorer
+    return make
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Stand-in THERMOCALC executable for tests and benchmarks.
+
+It answers the standard input protocol used by `TCAPI` (initial run,
+`calc_t`, `calc_p`, `calc_pt` and `calc_assemblage`) and writes THERMOCALC
+log and ic files into current directory. Calculations matching recorded
+outputs (by phases and zero mode phases) are replayed from them, all other
+calculations are synthesized. Synthetic results vary smoothly with P and T
+and use variable names of phases found in recorded outputs.
+
+To use it, link or copy this file as tc3xx executable into THERMOCALC
+working directory, e.g. `examples/avgpelite`.
+
+Environment variables:
+    PSBSTUB_LATENCY: Time in seconds each run takes. Default 0.
+    PSBSTUB_FAILURE: Probability that calculation returns nothing in range.
+        Default 0.
+    PSBSTUB_SEED: Seed of failure random generator. When set, failures are
+        reproducible for identical input and ptguess. Default is random.
+    PSBSTUB_TEMPLATES: Directory with recorded outputs. Default is
+        examples/outputs of repository.
+    PSBSTUB_OUTPUTS: Comma separated output files written for synthetic
+        results, ic and/or csv. Default ic,csv. Existing csv file is kept
+        when no csv output is written.
+
+"""
+# author: Ondrej Lexa
+# website: petrol.natur.cuni.cz/~ondro
+
+import sys
+import os
+import math
+import time
+import random
+import zlib
+from pathlib import Path
+
+STUBDIR = Path(__file__).resolve().parent
+TEMPLATES = Path(os.environ.get('PSBSTUB_TEMPLATES', STUBDIR.parents[1] / 'examples' / 'outputs'))
+LATENCY = float(os.environ.get('PSBSTUB_LATENCY', 0))
+FAILURE = float(os.environ.get('PSBSTUB_FAILURE', 0))
+SEED = os.environ.get('PSBSTUB_SEED', None)
+OUTPUTS = os.environ.get('PSBSTUB_OUTPUTS', 'ic,csv').split(',')
+
+BLOCK_START = '-' * 68
+IC_SEPARATOR = '=' * 59
+OXIDES = ['H2O', 'SiO2', 'Al2O3', 'CaO', 'MgO', 'FeO', 'K2O', 'Na2O', 'TiO2', 'MnO', 'O']
+PURE = {'q', 'H2O', 'sph', 'ru', 'ab', 'sill', 'and', 'ky', 'coe', 'cz', 'law', 'zo', 'ilm', 'mt', 'heme'}
+CHOOSE = 'g  L  pl  ksp  ep  ma  mu  pa  bi  sa  cd  st  chl  ctd  ilmm  ab  ru  sill  and  ky  q  H2O  sph  cz'
+EM_HEAD = 'ideal       gamma    activity        prop          µ0     RT ln a'
+
+
+def frac(*keys):
+    """Deterministic pseudo-random number from 0 to 1."""
+    return zlib.crc32(' '.join(str(k) for k in keys).encode()) / 2**32
+
+
+def wave(p, T, *keys):
+    """Smooth deterministic function of P and T from 0.1 to 0.9."""
+    a, b, c = frac('a', *keys), frac('b', *keys), frac('c', *keys)
+    return 0.5 + 0.4 * math.sin(0.3 * a * p + 0.01 * b * T + 6.28 * c)
+
+
+class Project:
+    """Settings of working directory and catalog of recorded outputs."""
+    def __init__(self):
+        self.name = 'stub'
+        self.excess = []
+        self.bulk = [1.0] * len(OXIDES)
+        self.guesses = []
+        for line in Path('tc-prefs.txt').read_text(encoding='mac-roman').splitlines():
+            kw = line.split('%')[0].split()
+            if kw and kw[0] == 'scriptfile':
+                self.name = kw[1]
+        scriptfile = Path('tc-{}.txt'.format(self.name))
+        if scriptfile.exists():
+            for line in scriptfile.read_text(encoding='mac-roman').splitlines():
+                kw = line.split('%')[0].split()
+                if kw == ['*']:
+                    break
+                if kw and kw[0] == 'setexcess':
+                    self.excess = [ph for ph in kw[1:] if ph not in ['no', 'yes', 'ask']]
+                if kw and kw[0] in ['ptguess', 'xyzguess']:
+                    self.guesses.append(' '.join(kw))
+                if kw and kw[0] == 'setbulk':
+                    vals = [v for v in kw[1:] if v not in ['yes', 'no']]
+                    if len(vals) >= len(OXIDES):
+                        self.bulk = [float(v) for v in vals[:len(OXIDES)]]
+        # recorded outputs
+        self.recorded = {}
+        self.catalog = {}
+        for logfile in sorted(TEMPLATES.glob('*-log.txt')):
+            icfile = logfile.with_name(logfile.name.replace('-log.txt', '-ic.txt'))
+            if icfile.exists():
+                log = logfile.read_text(encoding='mac-roman')
+                ic = icfile.read_text(encoding='mac-roman')
+                phases = log.split('which phases :')[1].split('\n')[0].split()
+                out = log.split('which to set :')[1].split('\n')[0].split()
+                self.recorded[(frozenset(phases), frozenset(out))] = (log, ic)
+                for block in ic.split('\n' + IC_SEPARATOR + '\n\n')[1:]:
+                    self.add_catalog(block)
+
+    def add_catalog(self, block):
+        """Collect names of variables of phases from ic block."""
+        sections = block.split('\n\n')
+        ax, sf = sections[1].split('\n'), sections[2].split('\n')
+        for head in ax[::2]:
+            phase, *names = head.split()
+            self.catalog.setdefault(phase, {})['ax'] = names
+        for head in sf[1::2]:
+            phase, *names = head.split()
+            self.catalog[phase]['sf'] = names
+        mems = [sec for sec in sections[9:-1]]
+        if mems:
+            mems[0] = mems[0].split('\n', maxsplit=1)[1]
+        for mem in mems:
+            rows = mem.split('\n')
+            phase = rows[0].split()[0]
+            self.catalog[phase]['ems'] = [rows[0].split()[1]] + [row.split()[0] for row in rows[1:]]
+
+    def names(self, phase):
+        """Return ax, site fraction and end-member names of phase."""
+        if phase in self.catalog:
+            c = self.catalog[phase]
+            return c['ax'], c['sf'], c['ems']
+        return (['x({})'.format(phase), 'y({})'.format(phase)], ['xA', 'xB'],
+                ['{}1'.format(phase), '{}2'.format(phase)])
+
+
+class Result:
+    """Synthetic THERMOCALC result."""
+    def __init__(self, project, phases, out, p, T, variance, step=1):
+        self.project = project
+        self.phases = phases
+        self.out = out
+        self.p = p
+        self.T = T
+        self.variance = variance
+        self.step = step
+        self.solutions = [ph for ph in phases if ph not in PURE]
+        self.pures = [ph for ph in phases if ph in PURE]
+
+    def modes(self):
+        w = [0 if ph in self.out else 0.2 + wave(self.p, self.T, ph, 'mode') for ph in self.phases]
+        return [v / sum(w) for v in w]
+
+    def xyz(self):
+        return [(name, wave(self.p, self.T, ph, name)) for ph in self.solutions
+                for name in self.project.names(ph)[0]]
+
+    def logblock(self):
+        lines = [BLOCK_START,
+                 ' P(kbar)     T(°C)  ' + ' '.join('{:>9}'.format(name) for name, _ in self.xyz()),
+                 '{:8.4f}  {:8.3f}  '.format(self.p, self.T) + ' '.join('{:9.5f}'.format(v) for _, v in self.xyz()),
+                 '',
+                 ' mode ' + ' '.join('{:>9}'.format(ph) for ph in self.phases),
+                 '      ' + ' '.join('{:9.5f}'.format(v) for v in self.modes()),
+                 '',
+                 '% --------------------------------------------------------',
+                 '% at P = {:.1f}, T = {:.0f}, for: {}  with {}'.format(self.p, self.T, ' '.join(self.phases),
+                                                                         ', '.join('{} = 0'.format(ph) for ph in self.out)),
+                 '% --------------------------------------------------------',
+                 'ptguess {:.1f} {:.0f}'.format(self.p, self.T),
+                 '% --------------------------------------------------------']
+        lines.extend('xyzguess {:<10} {:12g}'.format(name, v) for name, v in self.xyz())
+        lines.extend(['% --------------------------------------------------------', ''])
+        return '\n'.join(lines)
+
+    def csvnames(self):
+        return (['P(kbar)', 'T(°C)', 'var', 'step'] + [name for name, _ in self.xyz()] +
+                ['mode({})'.format(ph) for ph in self.phases])
+
+    def csvrow(self):
+        return (['{:.4f}'.format(self.p), '{:.3f}'.format(self.T), str(self.variance), '{:g}'.format(self.step)] +
+                ['{:.5f}'.format(v) for _, v in self.xyz()] + ['{:.8f}'.format(v) for v in self.modes()])
+
+    def icblock(self):
+        p, T = self.p, self.T
+        secs = ['{}  {{{:.4f}, {:.3f}}}  kbar/°C\novar = 4; var = {} (seen)'.format(' '.join(self.phases), p, T, self.variance)]
+        rows = []
+        for ph in self.solutions:
+            names = self.project.names(ph)[0]
+            rows.append('{:<6}'.format(ph) + ''.join('{:>10}'.format(n) for n in names))
+            rows.append('      ' + ''.join('{:10.5f}'.format(wave(p, T, ph, n)) for n in names))
+        secs.append('\n'.join(rows))
+        rows = [' site fractions']
+        for ph in self.solutions:
+            names = self.project.names(ph)[1]
+            rows.append('{:<6}'.format(ph) + ''.join('{:>10}'.format(n) for n in names))
+            rows.append('      ' + ''.join('{:10.5f}'.format(wave(p, T, ph, n)) for n in names))
+        secs.append('\n'.join(rows))
+        secs.append(' oxide compositions\n      ' + ''.join('{:>12}'.format(ox) for ox in OXIDES) +
+                    '\nbulk  ' + ''.join('{:12.4f}'.format(v) for v in self.project.bulk) + '  step {:g}'.format(self.step))
+        secs.append('\n'.join('{:<6}'.format(ph) + ''.join('{:12.6f}'.format(3 * wave(p, T, ph, ox)) for ox in OXIDES)
+                              for ph in self.phases))
+        secs.append(' mode  ' + ''.join('{:>12}'.format(ph) for ph in self.phases) +
+                    '\n      ' + ''.join('{:12.8f}'.format(v) for v in self.modes()))
+        secs.append(' factor' + ''.join('{:>12}'.format(ph) for ph in self.phases) +
+                    '\n      ' + ''.join('{:12.8f}'.format(0.1 + wave(p, T, ph, 'factor')) for ph in self.phases))
+        td = ['                 G           H           S           V         rho']
+        for ph in self.phases:
+            w = wave(p, T, ph, 'td')
+            td.append('{:<6}{:16.5f}{:12.4f}{:12.4f}{:12.5f}{:12.5f}'.format(ph, -6000 * w - 900, -5500 * w - 800, w, 15 * w, 2 + w))
+        secs.append('\n'.join(td))
+        w = wave(p, T, 'sys')
+        secs.append('sys   {:16.5f}{:12.5f}{:12.5f}{:12.5f}{:12.5f}'.format(-660 * w, -570 * w, 0.1 * w, 2 * w, 2 + w))
+        mems = []
+        for ph in self.solutions:
+            rows = []
+            for ix, em in enumerate(self.project.names(ph)[2]):
+                w = wave(p, T, ph, em)
+                rows.append('{:<6}{:<8}{:12.6g}{:12.6g}{:12.6g}{:12.6g}{:12.4f}{:12.4f}'.format(ph if ix == 0 else '', em, w, 1 + w, w * w, w, -6000 * w, -20 * w))
+            mems.append('\n'.join(rows))
+        if mems:
+            mems[0] = ' ' * 20 + EM_HEAD + '\n' + mems[0]
+        secs.extend(mems)
+        secs.append('\n'.join('{:<6}{:>58.4f}'.format(ph, -1000 * wave(p, T, ph, 'mu')) for ph in self.pures) + '\n')
+        return '\n\n'.join(secs)
+
+
+def header(project):
+    return ('THERMOCALC 3.50 running at 10.36 on Tue 17 Mar,2020\n'
+            'using tc-ds62.txt produced at 20.08 on Mon 6 Feb,2012\n'
+            'with axfile and scriptfile tc-{}.txt (stand-in)\n\n'
+            'choose from: {}\n').format(project.name, CHOOSE)
+
+
+def calculate(project, lines):
+    """Return list of results for standard input lines."""
+    phases = lines[0].split()
+    phases += [ph for ph in project.excess if ph not in phases]
+    if lines[2].strip() == '':
+        # calc_assemblage
+        p, T = float(lines[3]), float(lines[4])
+        return [Result(project, phases, [], p, T, max(len(OXIDES) + 2 - len(phases), 1))]
+    out = lines[2].split()
+    h1, h2, h3 = frac('T', *sorted(phases), *out), frac('p', *sorted(phases), *out), frac('s', *sorted(phases), *out)
+    if lines[3] in ['y', 'n'] and lines[4].strip():
+        # calc_t or calc_p
+        r1, r2 = [float(v) for v in lines[4].split()], [float(v) for v in lines[5].split()]
+        step = float(lines[6])
+        prange, trange = (r1, r2) if lines[3] == 'y' else (r2, r1)
+        nsteps = int(round((r1[1] - r1[0]) / step))
+        results = []
+        for ix in range(nsteps + 1):
+            if lines[3] == 'y':
+                p = r1[0] + ix * step
+                T = trange[0] + (trange[1] - trange[0]) * (0.25 + 0.5 * h1 + (h3 - 0.5) * (p - prange[0]) / (prange[1] - prange[0]))
+            else:
+                T = r1[0] + ix * step
+                p = prange[0] + (prange[1] - prange[0]) * (0.25 + 0.5 * h2 + (h3 - 0.5) * (T - trange[0]) / (trange[1] - trange[0]))
+            if trange[0] <= T <= trange[1] and prange[0] <= p <= prange[1]:
+                results.append(Result(project, phases, out, p, T, 1))
+        return results
+    elif len(lines[3].split()) == 4:
+        # calc_pt
+        tlo, thi, plo, phi = [float(v) for v in lines[3].split()]
+        return [Result(project, phases, out, plo + (phi - plo) * h2, tlo + (thi - tlo) * h1, 0)]
+    return []
+
+
+def main():
+    instr = sys.stdin.read()
+    lines = instr.split('\n') + [''] * 8
+    project = Project()
+    logfile = Path('tc-log.txt')
+    icfile = Path('tc-{}-ic.txt'.format(project.name))
+    csvfile = Path('tc-{}-csv.txt'.format(project.name))
+    # phases and guesses are sorted, as their order depends on set ordering
+    seed = [SEED, ' '.join(sorted(lines[0].split()))] + lines[1:] + sorted(project.guesses)
+    rng = random.Random(None if SEED is None else '\n'.join(seed))
+    if LATENCY > 0:
+        time.sleep(LATENCY)
+    if not lines[0].split() or lines[0].strip().isdigit():
+        # initial run or dogmin
+        output = header(project)
+        logfile.write_text(output, encoding='mac-roman')
+        sys.stdout.write(output)
+        return
+    phases = lines[0].split() + [ph for ph in project.excess if ph not in lines[0].split()]
+    out = lines[2].split()
+    recorded = project.recorded.get((frozenset(phases), frozenset(out)), None)
+    if rng.random() < FAILURE:
+        results, recorded = [], None
+    elif recorded is None:
+        results = calculate(project, lines)
+    csv = ''
+    if recorded is not None:
+        log, ic = recorded
+    else:
+        log = header(project) + '\n' + ''.join(res.logblock() + '\n' for res in results)
+        ic = ''
+        if 'ic' in OUTPUTS:
+            ic = ''.join('\n' + IC_SEPARATOR + '\n\n' + res.icblock() for res in results)
+        if 'csv' in OUTPUTS and results:
+            csv = ''.join(','.join(row) + '\n' for row in [results[0].csvnames()] + [res.csvrow() for res in results])
+    log += '\nmore phase diagram calculations ? no\nall done - hit return to exit ? yes\n'
+    logfile.write_text(log, encoding='mac-roman')
+    if ic:
+        icfile.write_text(ic, encoding='mac-roman')
+    elif icfile.exists():
+        icfile.unlink()
+    if csv:
+        csvfile.write_text(csv, encoding='mac-roman')
+    sys.stdout.write(log)
+
+
+if __name__ == "__main__":
+    main()
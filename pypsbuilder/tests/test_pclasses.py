@@ -1,5 +1,9 @@
+import shutil
 import pytest
 from pypsbuilder import TCAPI, InvPoint, UniLine, PTsection
+import pickle
+import numpy as np
+from pypsbuilder.psclasses import ScriptFile, TCGuess, GuessLibrary
 
 pytest.ps = PTsection(trange=(400., 700.), prange=(7., 16.))
 
@@ -35,7 +39,7 @@ def test_parse_ini1(mock_tc):
     assert res[0].T == 530.136, 'Wrong temperature'
     assert len(res) == 1, 'Wrong results length'
     assert type(res[0].data) == dict, 'Wrong data type data'
-    assert type(res[0].ptguess) == list, 'Wrong data type of ptguess'
+    assert isinstance(res[0].ptguess, TCGuess), 'Wrong data type of ptguess'
 
 
 def test_parse_ini2(mock_tc):
@@ -66,7 +70,7 @@ def test_parse_ini2(mock_tc):
     assert res[0].T == 504.062, 'Wrong temperature'
     assert len(res) == 1, 'Wrong results length'
     assert type(res[0].data) == dict, 'Wrong data type data'
-    assert type(res[0].ptguess) == list, 'Wrong data type of ptguess'
+    assert isinstance(res[0].ptguess, TCGuess), 'Wrong data type of ptguess'
 
 def test_parse_ini3(mock_tc):
     test = 'inv3'
@@ -96,7 +100,7 @@ def test_parse_ini3(mock_tc):
     assert res[0].T == 561.425, 'Wrong temperature'
     assert len(res) == 1, 'Wrong results length'
     assert type(res[0].data) == dict, 'Wrong data type data'
-    assert type(res[0].ptguess) == list, 'Wrong data type of ptguess'
+    assert isinstance(res[0].ptguess, TCGuess), 'Wrong data type of ptguess'
 
 def test_parse_uni1(mock_tc):
     test = 'uni1'
@@ -128,7 +132,7 @@ def test_parse_uni1(mock_tc):
     assert res[15].T == 526.322, 'Wrong temperature'
     assert len(res) == 29, 'Wrong results length'
     assert type(res[0].data) == dict, 'Wrong data type data'
-    assert type(res[0].ptguess) == list, 'Wrong data type of ptguess'
+    assert isinstance(res[0].ptguess, TCGuess), 'Wrong data type of ptguess'
 
 def test_parse_uni2(mock_tc):
     test = 'uni2'
@@ -160,7 +164,7 @@ def test_parse_uni2(mock_tc):
     assert res[25].T == 550.0, 'Wrong temperature'
     assert len(res) == 51, 'Wrong results length'
     assert type(res[0].data) == dict, 'Wrong data type data'
-    assert type(res[0].ptguess) == list, 'Wrong data type of ptguess'
+    assert isinstance(res[0].ptguess, TCGuess), 'Wrong data type of ptguess'
 
 def test_parse_uni3(mock_tc):
     test = 'uni3'
@@ -192,7 +196,7 @@ def test_parse_uni3(mock_tc):
     assert res[14].T == 543.12, 'Wrong temperature'
     assert len(res) == 28, 'Wrong results length'
     assert type(res[0].data) == dict, 'Wrong data type data'
-    assert type(res[0].ptguess) == list, 'Wrong data type of ptguess'
+    assert isinstance(res[0].ptguess, TCGuess), 'Wrong data type of ptguess'
 
 def test_contains_inv():
     for uni in pytest.ps.unilines.values():
@@ -249,3 +253,233 @@ def test_create_shapes():
     akey = frozenset({'pa', 'ep', 'g', 'q', 'bi', 'mu', 'H2O', 'sph'})
     assert len(shapes) == 1, 'Wrong number of areas created'
     assert akey in shapes, 'Wrong key for constructed area'
+
+def test_scriptfile(tmp_path):
+    scriptfile = tmp_path / 'tc-avgpelite.txt'
+    shutil.copy('./examples/avgpelite/tc-avgpelite.txt', str(scriptfile))
+    sc = ScriptFile(scriptfile)
+    with scriptfile.open('r', encoding=sc.encoding) as f:
+        assert sc.text() == f.read(), 'Scriptfile not reconstructed'
+    assert set(sc.blocks) == {'GUESS', 'DOGMIN', 'BULK'}, 'Wrong blocks parsed'
+    assert not sc.set_block('BULK', sc.get_block('BULK')), 'Unchanged block marked as changed'
+    assert not sc.sync(), 'Unchanged scriptfile written'
+    assert sc.set_block('BULK', ['setbulk yes 1 2 3\n']), 'Changed block not detected'
+    assert sc.sync(), 'Changed scriptfile not written'
+    assert ScriptFile(scriptfile).get_block('BULK') == ['setbulk yes 1 2 3\n'], 'Block not written'
+
+
+def test_scriptfile_symlink(tmp_path):
+    target = tmp_path / 'scripts' / 'tc-avgpelite.txt'
+    target.parent.mkdir()
+    shutil.copy('./examples/avgpelite/tc-avgpelite.txt', str(target))
+    target.chmod(0o640)
+    scriptfile = tmp_path / 'tc-avgpelite.txt'
+    try:
+        scriptfile.symlink_to(target)
+    except OSError:
+        pytest.skip('Symlinks not supported')
+    sc = ScriptFile(scriptfile)
+    sc.set_block('BULK', ['setbulk yes 1 2 3\n'])
+    assert sc.sync(), 'Changed scriptfile not written'
+    assert scriptfile.is_symlink(), 'Symlink replaced'
+    assert ScriptFile(target).get_block('BULK') == ['setbulk yes 1 2 3\n'], 'Target not written'
+    assert target.stat().st_mode & 0o777 == 0o640, 'Permissions not kept'
+    assert not sc.set_block('BULK', sc.get_block('BULK')), 'Scriptfile reloaded'
+
+
+def test_streaming_parser(mock_tc):
+    import io
+    from pypsbuilder.psclasses import iter_icblocks, iter_logblocks
+    icfile = mock_tc.workdir / 'uni1-ic.txt'
+    ofile = mock_tc.workdir / 'uni1-log.txt'
+    with icfile.open('r', encoding=mock_tc.TCenc) as f:
+        resic = f.read()
+    blocks = resic.split('\n' + '=' * 59 + '\n\n')[1:]
+    assert list(iter_icblocks(io.StringIO(resic))) == blocks, 'Wrong ic blocks'
+    with ofile.open('r', encoding=mock_tc.TCenc) as f:
+        logblocks = list(iter_logblocks(f))
+    assert len(logblocks) == len(blocks), 'Wrong number of log blocks'
+    assert all(ptguess[3].startswith('ptguess') for _, ptguess in logblocks), 'Wrong ptguess'
+
+
+def test_columnar_resultset(mock_tc):
+    ofile = mock_tc.workdir / 'uni1-log.txt'
+    icfile = mock_tc.workdir / 'uni1-ic.txt'
+    with ofile.open('r', encoding=mock_tc.TCenc) as f:
+        output = f.read()
+    with icfile.open('r', encoding=mock_tc.TCenc) as f:
+        resic = f.read()
+    status, res, output = mock_tc.parse_logfile_new(output=output, resic=resic, lazy=False)
+    part = res[2:5]
+    assert np.shares_memory(part.values, res.values), 'Slice is not view'
+    assert np.allclose(part['g']['mode'], [r['g']['mode'] for r in res[2:5]]), 'Wrong column data'
+    res.insert(1, res[3])
+    assert res[1]['g']['mode'] == res[4]['g']['mode'], 'Wrong inserted data'
+    assert res[1].ptguess == res[4].ptguess, 'Wrong inserted ptguess'
+
+
+def test_lazy_resultset(mock_tc):
+    ofile = mock_tc.workdir / 'uni2-log.txt'
+    icfile = mock_tc.workdir / 'uni2-ic.txt'
+    with ofile.open('r', encoding=mock_tc.TCenc) as f:
+        output = f.read()
+    with icfile.open('r', encoding=mock_tc.TCenc) as f:
+        resic = f.read()
+    _, eager, _ = mock_tc.parse_logfile_new(output=output, resic=resic, lazy=False)
+    _, lazy, _ = mock_tc.parse_logfile_new(output=output, resic=resic, lazy=True)
+    assert lazy.lazy, 'Results parsed eagerly'
+    assert lazy.phases == eager.phases, 'Wrong phases'
+    assert all(lazy['g']['mode'] == eager['g']['mode']), 'Wrong lazy column'
+    assert lazy[3]['bulk']['SiO2'] == eager[3]['bulk']['SiO2'], 'Wrong lazy bulk'
+    assert lazy.lazy, 'Results parsed by single variable access'
+    assert lazy.index == eager.index, 'Wrong index'
+    assert not lazy.lazy, 'Results not parsed'
+
+
+def test_compact_result(mock_tc):
+    ofile = mock_tc.workdir / 'uni3-log.txt'
+    icfile = mock_tc.workdir / 'uni3-ic.txt'
+    with ofile.open('r', encoding=mock_tc.TCenc) as f:
+        output = f.read()
+    with icfile.open('r', encoding=mock_tc.TCenc) as f:
+        resic = f.read()
+    _, res, _ = mock_tc.parse_logfile_new(output=output, resic=resic)
+    rows = pickle.loads(pickle.dumps([res[0], res[1]]))
+    assert rows[0].schema is rows[1].schema, 'Schema not shared'
+    assert rows[1]['g']['mode'] == res[1]['g']['mode'], 'Wrong stored data'
+    assert not hasattr(rows[0], '__dict__'), 'Result is not compact'
+
+
+def test_structured_ptguess(mock_tc):
+    ofile = mock_tc.workdir / 'uni1-log.txt'
+    icfile = mock_tc.workdir / 'uni1-ic.txt'
+    with ofile.open('r', encoding=mock_tc.TCenc) as f:
+        output = f.read()
+    with icfile.open('r', encoding=mock_tc.TCenc) as f:
+        resic = f.read()
+    _, res, _ = mock_tc.parse_logfile_new(output=output, resic=resic)
+    guess = res[0].ptguess
+    assert guess.layout is res[1].ptguess.layout, 'Layout not shared'
+    assert (guess.p, guess.T) == (6.6, 499), 'Wrong ptguess p and T'
+    assert guess.values[0] == 0.907744, 'Wrong xyzguess value'
+    assert TCGuess.from_lines(guess.lines()) == guess, 'Wrong rendered lines'
+    assert guess.renamed('g', 'gt').names[0] == 'x(gt)', 'Wrong renamed guess'
+
+
+def test_guess_library(stub_tc):
+    key = frozenset({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'})
+    library = GuessLibrary(k=4, scale=(10, 0.5))
+    for p in [7, 8]:
+        for T in [540, 560]:
+            stub_tc.calc_assemblage(key.difference(stub_tc.excess), p, T)
+            status, res, output = stub_tc.parse_logfile()
+            library.add(key, T, p, res[0].ptguess)
+    assert library.guess(frozenset({'g'}), 550, 7.5) is None, 'Guess for unknown assemblage'
+    assert library.guess(key, 540, 7) == library.points[key][0][2], 'Wrong guess at solution'
+    vals = np.array([g.values for _, _, g in library.points[key]])
+    guess = library.guess(key, 550, 7.5)
+    assert guess.layout is library.points[key][0][2].layout, 'Wrong guess layout'
+    assert np.allclose(guess.values, vals.mean(axis=0), atol=1e-5), 'Wrong idw guess'
+    assert (guess.p, guess.T) == (7.5, 550), 'Wrong guess p and T'
+    library.method = 'linear'
+    guess = library.guess(key, 550, 7.5)
+    assert np.allclose(guess.values, vals.mean(axis=0), atol=1e-5), 'Wrong linear guess'
+    assert 'ptguess 7.5 550' in guess.lines(), 'Wrong rendered guess'
+    library.add(key, 540, 7, library.points[key][1][2])
+    assert len(library) == 4, 'Solution not replaced'
+    library = pickle.loads(pickle.dumps(library))
+    assert library.closest(541, 7.1) is library.points[key][0][2], 'Wrong closest solution'
+    for T in np.linspace(500, 600, 100):
+        library.add(key, T, 9, library.points[key][0][2])
+    assert np.isclose(library.nearest(key, 552, 9)[0][1], 500 + 51 * 100 / 99), 'Wrong nearest solution'
+    assert library.closest(552, 9, [frozenset({'g'})]) is None, 'Wrong closest solution'
+
+
+def test_section_guesses():
+    ps = pickle.loads(pickle.dumps(pytest.ps))
+    library = ps.guesses
+    assert ps.guesses is library, 'Library created again without change'
+    assert '_library' not in pickle.loads(pickle.dumps(ps)).__dict__, 'Library pickled with section'
+    uni = ps.unilines[2]
+    n = len(library)
+    # trimmed vertices are removed
+    uni.used = slice(uni.used.start + 2, uni.used.stop)
+    # vertices are stored by assemblage and by line
+    assert len(ps.guesses) == n - 4, 'Trimmed solutions kept'
+    # recalculated line replaces old solutions
+    library = ps.guesses
+    uni.results = uni.results[:]
+    assert ps.guesses is not library, 'Recalculated solutions ignored'
+    # removed line is removed from library
+    n, uni = len(ps.guesses), ps.unilines[3]
+    del ps.unilines[3]
+    assert len(ps.guesses) == n - 2 * len(range(len(uni._x))[uni.used]), 'Removed solutions kept'
+
+
+def test_library_seeds():
+    ps = pytest.ps
+    shapes, unilists, log = ps.create_shapes()
+    library = ps.guesses
+    inv = ps.invpoints[1]
+    assert library.inv(inv._x + 1, inv._y) is inv.ptguess(), 'Wrong closest invariant point'
+    key = next(key for key, ids in unilists.items() if 1 in ids)
+    uni = ps.unilines[1]
+    vix = uni.used.start + 2
+    assert library.uni(unilists[key], uni._x[vix], uni._y[vix]) is uni.ptguess(idx=vix), 'Wrong closest uniline vertex'
+    assert library.uni([], 500, 10) is None, 'Wrong seed of unknown field'
+    assert GuessLibrary().inv(500, 10) is None, 'Wrong seed of empty library'
+
+
+def test_schedule():
+    from pypsbuilder.psexplorer import PTPS
+    key1, key2 = frozenset({'a'}), frozenset({'b'})
+    points = [(r, c, key1 if c < 3 else key2, 400 + 50 * c, 7 + 2 * r) for r in range(4) for c in range(6)]
+    explorer = PTPS.__new__(PTPS)
+    library = GuessLibrary(scale=(300, 9))
+    assert explorer._schedule(points, library, order='raster') == points, 'Wrong raster order'
+    for order in ['serpentine', 'nearest']:
+        ordered = explorer._schedule(points, library, order=order)
+        assert sorted(ordered) == sorted(points), 'Wrong scheduled points'
+        assert [pt[2] for pt in ordered] == 12 * [key1] + 12 * [key2], 'Points not grouped by field'
+        steps = [abs(a[0] - b[0]) + abs(a[1] - b[1]) for a, b in zip(ordered[:12], ordered[1:12])]
+        assert max(steps) == 1, 'Walk is not continuous'
+    # walk starts at known solution of field
+    library.points[key2] = [(650, 13, None)]
+    ordered = explorer._schedule(points, library, order='serpentine')
+    assert ordered[12][:2] == (3, 5), 'Wrong start of walk'
+    ordered = explorer._schedule(points, library)
+    assert [pt[2] for pt in ordered] == 12 * [key1] + 12 * [key2], 'Wavefront points not grouped by field'
+
+
+def test_grid_wavefront():
+    from types import SimpleNamespace
+    from pypsbuilder.psexplorer import PTPS
+
+    class FakeTC:
+        guess = None
+
+        def update_scriptfile(self, guesses=None, bulk=None):
+            if guesses is not None:
+                self.guess = guesses
+
+    attempts = {}
+
+    def calc_point(tc, k, x, y):
+        # converges only from start or on retry with ptguess of adjacent point
+        attempts[(x, y)] = attempts.get((x, y), 0) + 1
+        ok = (x, y) == (0, 0) or (attempts[(x, y)] > 1 and tc.guess is not None and
+                                  max(abs(tc.guess[0] - x), abs(tc.guess[1] - y)) <= 1)
+        if (x, y) == (1, 1):
+            # converges only from neighbour solved later
+            ok = tc.guess == (2, 0)
+        return (SimpleNamespace(ptguess=(x, y)) if ok else None), 0.1
+
+    explorer = PTPS.__new__(PTPS)
+    explorer._calc_point = calc_point
+    key = frozenset({'a'})
+    points = [(r, c, key, c, r) for r in range(4) for c in range(5)]
+    done = list(explorer._grid_wavefront(FakeTC(), points, GuessLibrary(), {}))
+    assert sorted((r, c) for r, c, res, delta in done) == sorted(pt[:2] for pt in points), 'Wrong yielded points'
+    assert all(res is not None for r, c, res, delta in done), 'Failed points left'
+    assert done[0][:2] == (0, 0), 'Wrong start of wavefront'
+    assert attempts[(1, 1)] > 2, 'Failed point not queued again'
@@ -0,0 +1,431 @@
+import os
+import numpy as np
+from pypsbuilder import TCWorkerPool, TCCache
+
+
+def test_stub_recorded(stub_tc):
+    stub_tc.calc_pt({'g', 'bi', 'chl', 'ep', 'mu', 'sph', 'pa', 'q', 'H2O'}, {'ep', 'chl'})
+    status, res, output = stub_tc.parse_logfile()
+    assert status == 'ok', 'Wrong status'
+    assert res[0].p == 12.2438, 'Wrong pressure'
+    assert res[0].T == 530.136, 'Wrong temperature'
+
+
+def test_stub_synthetic(stub_tc):
+    stub_tc.calc_t({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}, {'pa'}, steps=20)
+    status, res, output = stub_tc.parse_logfile()
+    assert status == 'ok', 'Wrong status'
+    assert len(res) > 10, 'Wrong results length'
+    assert res[0]['pa']['mode'] == 0, 'Wrong zero mode phase'
+    assert res.ptguess(0)[3].startswith('ptguess'), 'Wrong ptguess'
+
+
+def test_stub_failure(stub_tc, monkeypatch):
+    monkeypatch.setenv('PSBSTUB_FAILURE', '1')
+    stub_tc.calc_assemblage({'g', 'bi', 'mu', 'sph', 'pa'}, 8, 550)
+    status, res, output = stub_tc.parse_logfile()
+    assert status == 'nir', 'Wrong status'
+
+
+def test_stub_pool(stub_tc, monkeypatch):
+    monkeypatch.setenv('PSBSTUB_LATENCY', '0.05')
+    jobs = [({'g', 'bi', 'mu', 'sph', 'pa'}, p, 550, None, None) for p in range(6, 12)]
+    with TCWorkerPool(stub_tc, jobs=2) as pool:
+        done = list(stub_tc.calc_assemblages(jobs, pool=pool))
+    assert sorted(res.p for job, status, res in done) == list(range(6, 12)), 'Wrong results'
+    assert stub_tc.stats.calls['calc_assemblage']['compute'] >= 6 * 0.05, 'Wrong latency'
+
+
+def test_stub_csv(stub_tc, monkeypatch):
+    assert not stub_tc.csv, 'csv output should be opt-in'
+    stub_tc.csv = True
+    stub_tc.calc_t({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}, {'pa'}, steps=20)
+    status, res, output = stub_tc.parse_logfile(csv=False)
+    status, rescsv, output = stub_tc.parse_logfile()
+    assert np.allclose(rescsv['g']['x'], res['g']['x']), 'Wrong csv values'
+    assert np.allclose(rescsv['g']['xMgX'], res['g']['xMgX']), 'Wrong ic values'
+    monkeypatch.setenv('PSBSTUB_OUTPUTS', 'csv')
+    stub_tc.calc_t({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}, {'pa'}, steps=20)
+    status, rescsv, output = stub_tc.parse_logfile()
+    assert status == 'ok', 'Wrong status'
+    assert np.allclose(rescsv.x, res.x), 'Wrong temperatures'
+    assert np.allclose(rescsv['pa']['mode'], 0), 'Wrong zero mode phase'
+
+
+def test_stub_csv_stale(stub_tc, monkeypatch):
+    stub_tc.csv = True
+    stub_tc.calc_t({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}, {'pa'}, steps=20)
+    stale = stub_tc.csvfile.read_text(encoding=stub_tc.TCenc)
+    # csv not written by run is kept, but ignored
+    monkeypatch.setenv('PSBSTUB_OUTPUTS', 'ic')
+    stub_tc.calc_t({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}, {'pa'}, steps=10)
+    assert stub_tc.csvfile.read_text(encoding=stub_tc.TCenc) == stale, 'csv file modified'
+    assert not stub_tc.csvfile_fresh(), 'Stale csv used'
+    status, res, output = stub_tc.parse_logfile()
+    assert len(res) == 11 and 'csv' not in res._tables, 'Stale csv used'
+    # csv of other calculation written by run falls back to ic
+    monkeypatch.setenv('PSBSTUB_OUTPUTS', 'ic,csv')
+    stub_tc.calc_t({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}, {'pa'}, steps=20)
+    stub_tc.csvfile.write_text(stale.replace(',', ',0', 2), encoding=stub_tc.TCenc)
+    status, res, output = stub_tc.parse_logfile()
+    assert status == 'ok' and 'csv' not in res._tables, 'Inconsistent csv used'
+    assert np.allclose(res['g']['x'], stub_tc.parse_logfile(csv=False)[1]['g']['x']), 'Wrong ic values'
+
+
+def test_csv_consistent():
+    from pypsbuilder.psclasses import csv_consistent
+    names = ['P(kbar)', 'T(°C)', 'x(g)', 'mode(g)', 'mode(bi)']
+    rows = [[8.0, 550.0, 0.8, 0.1, 0.2], [8.0, 560.0, 0.79, 0.1, np.nan]]
+    heads = [(8.0, 550.0, ['g', 'bi']), (8.0, 560.0, ['g'])]
+    assert csv_consistent(names, rows, heads), 'Wrong check'
+    assert csv_consistent(names, rows, [(p, T, None) for p, T, _ in heads]), 'Wrong check without phases'
+    assert not csv_consistent(names, rows, heads[:1]), 'Wrong number of rows'
+    assert not csv_consistent(names, rows, [(8.0, 550.0, ['g']), (8.0, 560.0, ['g'])]), 'Wrong phases'
+    assert not csv_consistent(names, rows, [(8.0, 550.0, ['g', 'bi']), (9.0, 560.0, ['g'])]), 'Wrong pressure'
+    assert not csv_consistent(names[1:], [row[1:] for row in rows], heads), 'Missing pressure'
+
+
+def test_stub_grid(stub_explorer):
+    from pypsbuilder.psexplorer import GridData
+    from pypsbuilder.psclasses import GuessLibrary
+    explorer = stub_explorer()
+    ps = explorer.sections[0]
+    key = frozenset({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'})
+    grids = []
+    for jobs in [None, 2]:
+        grid = GridData(ps, nx=4, ny=3)
+        points = [(r, c, key, grid.xg[r, c], grid.yg[r, c]) for r, c in np.ndindex(grid.xg.shape)]
+        library = GuessLibrary(scale=(300, 9))
+        explorer.grid_points(grid, points, library, {}, jobs=jobs)
+        assert len(library) == 12, 'Wrong library size'
+        grids.append(grid)
+    assert np.all(grids[0].status == grids[1].status), 'Wrong parallel status'
+    assert all(res.p == grids[1].gridcalcs[rc].p for rc, res in np.ndenumerate(grids[0].gridcalcs)), 'Wrong parallel results'
+
+
+def test_stub_guess_library(stub_explorer, monkeypatch):
+    from pypsbuilder.psclasses import GuessLibrary
+    explorer = stub_explorer()
+    explorer.grids[0] = grid = explorer._calculate_grid(0, 4, 3, checkpoint=None)
+    explorer.create_masks()
+    added = []
+    add = GuessLibrary.add
+    monkeypatch.setattr(GuessLibrary, 'add', lambda self, *args: added.append(args) or add(self, *args))
+    library = explorer.guess_library(0)
+    assert not added, 'Calculated solutions added again'
+    # grid not calculated into library is added only once
+    explorer._guesses, explorer._guessed = {}, {}
+    library = explorer.guess_library(0)
+    assert len(added) == 12 and len(library.points[next(iter(grid.masks))]) == 12, 'Grid solutions not added'
+    assert explorer.guess_library(0) is library and len(added) == 12, 'Grid solutions added again'
+
+
+def test_stub_grid_bulk(stub_tc):
+    from pypsbuilder import TXsection, TXPS
+    from pypsbuilder.psexplorer import GridData
+    from pypsbuilder.psclasses import GuessLibrary
+    ps = TXsection(trange=(400., 700.))
+    explorer = TXPS.__new__(TXPS)
+    explorer.tc = stub_tc
+    b1 = stub_tc.bulk[0]
+    stub_tc.bulk = [b1, ['{:g}'.format(2 * float(v)) for v in b1]]
+    key = frozenset({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'})
+    grid = GridData(ps, nx=3, ny=4)
+    points = [(r, c, key, grid.xg[r, c], grid.yg[r, c]) for r, c in np.ndindex(grid.xg.shape)]
+    explorer.grid_points(grid, points, GuessLibrary(), {}, jobs=2)
+    assert np.all(grid.status == 1), 'Wrong status'
+    for (r, c), res in np.ndenumerate(grid.gridcalcs):
+        assert np.isclose(res['bulk']['SiO2'], float(b1[1]) * (1 + grid.yspace[r])), 'Wrong bulk of row'
+
+
+def test_stub_grid_resume(stub_tc, stub_explorer):
+    explorer = stub_explorer()
+    grid = explorer._calculate_grid(0, 4, 3, checkpoint=0)
+    assert explorer.checkpoint_file(0).exists(), 'Missing checkpoint file'
+    # checkpoint of interrupted calculation
+    grid.status[1:, :] = np.nan
+    grid.gridcalcs[1:, :] = None
+    explorer.save_checkpoint(0, grid)
+    stub_tc.stats.reset()
+    grid = explorer._calculate_grid(0, 4, 3, resume=True, checkpoint=None)
+    assert np.all(grid.status == 1), 'Wrong resumed status'
+    assert stub_tc.stats.calls['calc_assemblage']['count'] == 8, 'Finished points recalculated'
+    # checkpoint of edited fields is rejected
+    explorer.save_checkpoint(0, grid)
+    key = next(iter(explorer.shapes))
+    explorer.unilists[0] = {key: [1]}
+    assert explorer.load_checkpoint(0) is None, 'Checkpoint of other fields accepted'
+    explorer.unilists[0] = {}
+    explorer._shapes[0] = {key: explorer.shapes[key].buffer(-1)}
+    assert explorer.load_checkpoint(0) is None, 'Checkpoint of other fields accepted'
+    explorer.remove_checkpoints()
+    assert not explorer.checkpoint_file(0).exists(), 'Checkpoint file not removed'
+
+
+def test_stub_grid_adaptive(stub_explorer):
+    from shapely.geometry import box
+    from pypsbuilder.psexplorer import QuadGrid
+    key1 = frozenset({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'})
+    key2 = frozenset({'g', 'bi', 'mu', 'sph', 'q', 'H2O'})
+    explorer = stub_explorer({key1: box(400, 7, 530, 16), key2: box(530, 7, 700, 16)})
+    grid = explorer._calculate_grid(0, 2, 1, checkpoint=None, levels=2)
+    assert isinstance(grid, QuadGrid), 'Wrong grid type'
+    # only cells crossing field boundary are refined
+    for cell in grid.cells:
+        xmin, ymin, xmax, ymax = grid.bounds(cell)
+        if xmin < 530 < xmax:
+            assert cell[0] == 2, 'Boundary not refined'
+        if xmin > 540:
+            assert cell[0] == 0, 'Interior refined'
+    assert np.all(grid.status[~np.isnan(grid.status)] == 1), 'Wrong status'
+    budget = np.count_nonzero(grid.status == 1) + 10
+    grid = explorer._calculate_grid(0, 2, 1, checkpoint=None, levels=3, variables=[('g', 'x')], tol=0.05, budget=budget)
+    assert np.count_nonzero(grid.status == 1) <= budget, 'Budget exceeded'
+    explorer.grids[0] = grid
+    explorer.create_masks()
+    dt = explorer.collect_grid_data(key2, 'g', 'x')
+    assert len(dt['pts']) == np.count_nonzero(grid.masks[key2]), 'Wrong grid data'
+    # steps of coarse cells are used for isopleths and common grid
+    xmin, ymin, xmax, ymax = grid.bounds((0, 0, 0))
+    assert np.isclose(explorer.gridxstep, xmax - xmin) and np.isclose(explorer.gridystep, ymax - ymin), 'Wrong grid step'
+
+
+def test_stub_grid_adaptive_pool(stub_explorer, monkeypatch):
+    from shapely.geometry import box
+    import pypsbuilder.psexplorer as psexplorer
+    key1 = frozenset({'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'})
+    key2 = frozenset({'g', 'bi', 'mu', 'sph', 'q', 'H2O'})
+    explorer = stub_explorer({key1: box(400, 7, 530, 16), key2: box(530, 7, 700, 16)})
+    pools, calls = [], []
+    grid_points = explorer.grid_points
+
+    def pool(*args, **kwargs):
+        pools.append(TCWorkerPool(*args, **kwargs))
+        return pools[-1]
+
+    def points(*args, **kwargs):
+        calls.append(kwargs['pool'])
+        grid_points(*args, **kwargs)
+
+    monkeypatch.setattr(psexplorer, 'TCWorkerPool', pool)
+    monkeypatch.setattr(explorer, 'grid_points', points)
+    grid = explorer._calculate_grid(0, 2, 1, jobs=2, checkpoint=None, levels=2)
+    assert len(calls) > 1, 'Grid not refined'
+    assert len(pools) == 1 and all(pl is pools[0] for pl in calls), 'Pool not shared by refinement levels'
+    assert not pools[0].basedir.exists(), 'Pool not closed'
+    assert np.all(grid.status[~np.isnan(grid.status)] == 1), 'Wrong status'
+
+
+def test_stub_composition_fix(stub_explorer, monkeypatch):
+    # reproducible failures, so some points are left to fix_solutions
+    monkeypatch.setenv('PSBSTUB_FAILURE', '0.5')
+    monkeypatch.setenv('PSBSTUB_SEED', '1')
+    explorer = stub_explorer()
+    calls = []
+    fix_solutions = explorer.fix_solutions
+
+    def fix(jobs=None):
+        calls.append((jobs, np.count_nonzero(explorer.grids[0].status == 0)))
+        fix_solutions(jobs=jobs)
+
+    monkeypatch.setattr(explorer, 'fix_solutions', fix)
+    # explorer has no project file and no invariant points
+    monkeypatch.setattr(explorer, 'save', lambda: None)
+    monkeypatch.setattr(explorer, 'collect_all_data_keys', lambda: None)
+    # serial wavefront, so failed points do not depend on scheduling
+    explorer.calculate_composition(4, 3, checkpoint=None)
+    assert len(calls) == 1 and calls[0][0] is None, 'Failed points of wavefront not passed to fix_solutions'
+    assert calls[0][1] > 0, 'No failed points'
+
+
+def test_stub_fix_parallel(stub_tc, stub_explorer, monkeypatch):
+    # reproducible failures of some ptguesses
+    monkeypatch.setenv('PSBSTUB_FAILURE', '0.4')
+    monkeypatch.setenv('PSBSTUB_SEED', '2')
+    explorer = stub_explorer()
+    explorer.grids[0] = grid = explorer._calculate_grid(0, 4, 3, checkpoint=None)
+    explorer.create_masks()
+    grid.status[1, :] = 0
+    grid.gridcalcs[1, :] = None
+    failed = np.count_nonzero(grid.status == 0)
+    stub_tc.stats.reset()
+    explorer.fix_solutions(jobs=2)
+    stats = stub_tc.stats.calls['calc_assemblage']
+    fixed = failed - np.count_nonzero(grid.status == 0)
+    assert fixed > 0, 'No point fixed'
+    assert stats['nir'] > 0, 'No candidate failed'
+    assert stats['ok'] >= fixed, 'Wrong number of successful candidates'
+    ok = grid.status == 1
+    assert all(res.p == grid.yg[rc] for rc, res in np.ndenumerate(grid.gridcalcs) if ok[rc]), 'Wrong fixed results'
+
+
+def test_pool_sandbox(stub_tc):
+    key = {'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}
+    b1 = stub_tc.bulk[0]
+    script = stub_tc.scriptfile.read_bytes()
+
+    def calc(tc, scale):
+        # each worker changes bulk in its own scriptfile
+        tc.update_scriptfile(bulk=[['{:g}'.format(scale * float(v)) for v in b1]])
+        tc.calc_assemblage(key.difference(tc.excess), 8, 550)
+        status, res, output = tc.parse_logfile()
+        return tc.workdir, res[0]['bulk']['SiO2']
+
+    with TCWorkerPool(stub_tc, jobs=2) as pool:
+        assert {tc.workdir.parent for tc in pool.workers} == {pool.basedir}, 'Worker outside of pool directory'
+        assert len({tc.workdir for tc in pool.workers}) == 2, 'Shared worker directory'
+        done = list(pool.map(calc, [1, 2, 3, 4]))
+    assert all(workdir != stub_tc.workdir for workdir, _ in done), 'Calculated in original directory'
+    assert np.allclose([v for _, v in done], [s * float(b1[1]) for s in [1, 2, 3, 4]]), 'Wrong bulk of worker'
+    assert stub_tc.scriptfile.read_bytes() == script, 'Original scriptfile modified'
+    assert not pool.basedir.exists(), 'Sandboxes not removed'
+
+
+def test_cache_key(stub_tc, tmp_path):
+    phases = {'g', 'bi', 'mu', 'sph', 'pa'}
+    cache = TCCache(tmp_path / 'cache')
+    instr = stub_tc._ans_calc_assemblage(phases, 8, 550)
+    key = cache.key(stub_tc, instr)
+    assert TCCache(tmp_path / 'other').key(stub_tc, instr) == key, 'Key depends on cache'
+    os.utime(str(stub_tc.axfile), (0, 0))
+    assert cache.key(stub_tc, instr) == key, 'Key depends on modification time'
+    assert cache.key(stub_tc, stub_tc._ans_calc_assemblage(phases, 9, 550)) != key, 'Key ignores input'
+    stub_tc.update_scriptfile(guesses=['ptguess 8 550'])
+    assert cache.key(stub_tc, instr) != key, 'Key ignores scriptfile'
+
+
+def test_cache_hit(stub_tc, monkeypatch):
+    phases = {'g', 'bi', 'mu', 'sph', 'pa'}
+    cache = stub_tc.use_cache()
+    stub_tc.calc_assemblage(phases, 8, 550)
+    status, res, output = stub_tc.parse_logfile()
+    stub_tc.logfile.unlink()
+    stub_tc.icfile.unlink()
+    # real run would fail
+    monkeypatch.setenv('PSBSTUB_FAILURE', '1')
+    stub_tc.calc_assemblage(phases, 8, 550)
+    status, cached, output = stub_tc.parse_logfile()
+    assert status == 'ok', 'Outputs not restored'
+    assert cached[0].T == res[0].T and cached[0]['g']['x'] == res[0]['g']['x'], 'Wrong restored results'
+    assert cache.hits == 1 and stub_tc.stats.calls['calc_assemblage']['cached'] == 1, 'Wrong cache hits'
+
+
+def test_cache_eviction(stub_tc, tmp_path):
+    stub_tc.calc_assemblage({'g', 'bi', 'mu', 'sph', 'pa'}, 8, 550)
+    cache = TCCache(tmp_path / 'cache')
+    for key in 'abc':
+        cache.store(stub_tc, key, 'tcout ' + key)
+    cache.restore(stub_tc, 'a')
+    # room for two entries only
+    cache.maxsize = 2.5 * cache._entries['a'] / 2**20
+    cache.store(stub_tc, 'd', 'tcout d')
+    assert list(cache._entries) == ['a', 'd'], 'Wrong evicted entries'
+    assert sorted(entry.stem for entry in cache.cachedir.glob('*.tcrun')) == ['a', 'd'], 'Evicted files left'
+    assert set(TCCache(tmp_path / 'cache')._entries) == {'a', 'd'}, 'Wrong reopened cache'
+
+
+def test_cache_corrupted(stub_tc, tmp_path):
+    cache = TCCache(tmp_path / 'cache')
+    cache.store(stub_tc, 'a', 'tcout')
+    (cache.cachedir / 'a.tcrun').write_bytes(b'garbage')
+    assert cache.restore(stub_tc, 'a') is None, 'Corrupted entry restored'
+    assert cache.misses == 1, 'Wrong cache misses'
+    assert 'a' not in cache._entries, 'Corrupted entry kept'
+    assert not (cache.cachedir / 'a.tcrun').exists(), 'Corrupted file kept'
+    assert cache.restore(stub_tc, 'b') is None and cache.misses == 2, 'Wrong missing entry'
+
+
+def test_probe_cache(stub_tc):
+    from pypsbuilder import TCAPI
+    assert stub_tc.probefile.exists(), 'Probe not stored'
+    tc = TCAPI(stub_tc.workdir)
+    assert tc.OK and 'probe' not in tc.stats.calls, 'Stored probe not used'
+    assert tc.phases == stub_tc.phases, 'Wrong phases of stored probe'
+    # pypsbuilder blocks do not invalidate probe
+    tc.update_scriptfile(guesses=['ptguess 8 550'])
+    assert 'probe' not in TCAPI(stub_tc.workdir).stats.calls, 'Probe invalidated by guesses'
+    with stub_tc.scriptfile.open('a', encoding=stub_tc.TCenc) as f:
+        f.write('% edited\n')
+    tc = TCAPI(stub_tc.workdir)
+    assert tc.OK and tc.stats.calls['probe']['count'] == 1, 'Probe not invalidated by scriptfile'
+    assert 'probe' not in TCAPI(stub_tc.workdir).stats.calls, 'New probe not stored'
+    stub_tc.probefile.write_text('garbage')
+    tc = TCAPI(stub_tc.workdir)
+    assert tc.OK and tc.stats.calls['probe']['count'] == 1, 'Corrupted probe used'
+
+
+def test_stats(stub_tc, monkeypatch):
+    import json
+    phases = {'g', 'bi', 'mu', 'sph', 'pa'}
+    stub_tc.stats.reset()
+    stub_tc.update_scriptfile(guesses=['ptguess 8 550'])
+    stub_tc.calc_assemblage(phases, 8, 550)
+    stub_tc.parse_logfile()
+    monkeypatch.setenv('PSBSTUB_FAILURE', '1')
+    stub_tc.calc_assemblage(phases, 9, 550)
+    stub_tc.parse_logfile()
+    stub_tc.calc_t(phases, {'pa'})
+    stub_tc.parse_logfile()
+    row = stub_tc.stats.calls['calc_assemblage']
+    assert (row['count'], row['ok'], row['nir'], row['cached']) == (2, 1, 1, 0), 'Wrong counters'
+    assert all(row[stage] > 0 for stage in ['scriptfile', 'spawn', 'compute', 'parse']), 'Stage not timed'
+    assert stub_tc.stats.calls['calc_t']['count'] == 1, 'Wrong call type'
+    table = {row['call']: row for row in stub_tc.stats.table()}
+    assert table['calc_assemblage']['ok_rate'] == 0.5, 'Wrong outcome rate'
+    assert np.isclose(table['calc_assemblage']['total'], sum(row[stage] for stage in stub_tc.stats.stages)), 'Wrong total'
+    assert json.loads(stub_tc.stats.to_json())[0]['count'] == 2, 'Wrong JSON export'
+    assert stub_tc.stats.to_csv().splitlines()[1].startswith('calc_assemblage,2,1,1,0,'), 'Wrong CSV export'
+    stub_tc.stats.reset()
+    assert not stub_tc.stats.calls, 'Statistics not reset'
+
+
+def test_calc_assemblages(stub_tc, monkeypatch):
+    monkeypatch.setenv('PSBSTUB_FAILURE', '0.5')
+    monkeypatch.setenv('PSBSTUB_SEED', '1')
+    phases = {'g', 'bi', 'mu', 'sph', 'pa'}
+    jobs = [(phases, p, 550, None, None) for p in range(6, 14)]
+    serial = list(stub_tc.calc_assemblages(jobs))
+    assert [job for job, status, res in serial] == jobs, 'Wrong serial order'
+    failed = {job[1] for job, status, res in serial if res is None}
+    assert 0 < len(failed) < len(jobs), 'Failures not simulated'
+    assert all(status == 'nir' for job, status, res in serial if res is None), 'Wrong status of failure'
+    with TCWorkerPool(stub_tc, jobs=2) as pool:
+        done = list(stub_tc.calc_assemblages(iter(jobs), pool=pool))
+    assert sorted(job[1] for job, status, res in done) == list(range(6, 14)), 'Jobs lost'
+    assert {job[1] for job, status, res in done if res is None} == failed, 'Wrong failures'
+    assert all(res.p == job[1] for job, status, res in done if res is not None), 'Result of other job'
+
+
+def test_async_calc(stub_tc, monkeypatch):
+    import asyncio
+    monkeypatch.setenv('PSBSTUB_LATENCY', '0.02')
+    phases = {'g', 'bi', 'mu', 'sph', 'pa', 'q', 'H2O'}
+    stub_tc.stats.reset()
+
+    async def calc():
+        # interleaved calls of different types in one working directory
+        return await asyncio.gather(stub_tc.acalc_t(phases, {'pa'}, steps=20),
+                                    *[stub_tc.acalc_assemblage(phases, p, 550) for p in [7, 8, 9]])
+
+    (status, res, output, ans), *done = asyncio.run(calc())
+    assert status == 'ok' and len(res) > 10, 'Wrong calc_t results'
+    assert [res[0].p for status, res, output, ans in done] == [7, 8, 9], 'Outputs of other call parsed'
+    assert done[0][3] == stub_tc._ans_calc_assemblage(phases, 7, 550), 'Wrong input'
+    calls = stub_tc.stats.calls
+    assert (calls['calc_t']['count'], calls['calc_t']['ok']) == (1, 1), 'Wrong calc_t statistics'
+    assert (calls['calc_assemblage']['count'], calls['calc_assemblage']['ok']) == (3, 3), 'Wrong calc_assemblage statistics'
+
+
+def test_async_pool(stub_tc, monkeypatch):
+    import asyncio
+    monkeypatch.setenv('PSBSTUB_LATENCY', '0.02')
+    jobs = [({'g', 'bi', 'mu', 'sph', 'pa'}, p, 550, None, None) for p in range(6, 12)]
+
+    async def calc(pool):
+        return await asyncio.gather(*[pool.acalc_job(job) for job in jobs])
+
+    with TCWorkerPool(stub_tc, jobs=2) as pool:
+        done = asyncio.run(calc(pool))
+        assert len(pool._aidle) == 2, 'Worker not returned'
+    assert [res.p for status, res in done] == list(range(6, 12)), 'Wrong results'
+    assert stub_tc.stats.calls['calc_assemblage']['ok'] == 6, 'Wrong statistics'